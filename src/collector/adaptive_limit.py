@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Limite adaptativo de concorrência por roteador (AIMD)
+Substitui o semáforo fixo de MAX_CONCURRENT_COMMANDS por host
+
+Cada roteador aprende quantos comandos simultâneos suporta: o limite cresce
+aditivamente enquanto a latência fica próxima da linha de base e cai
+multiplicativamente em timeouts, latência alta ou cpu-load acima do limiar.
+Os limites aprendidos são persistidos em JSON entre reinícios.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-adaptive-limit')
+
+
+class AdaptiveLimiter:
+    """Limite de comandos em andamento de um roteador (host:porta)"""
+
+    def __init__(self, router: str, initial_limit: float, min_limit: int, max_limit: int,
+                 backoff_ratio: float = 0.7, latency_tolerance: float = 2.0,
+                 cpu_threshold: float = 80.0, cooldown: float = 1.0):
+        self.router = router
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial_limit)))
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.cpu_threshold = cpu_threshold
+        self.cooldown = cooldown
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self.cpu_load: Optional[float] = None
+        self.last_cpu_sample = 0.0
+        self._last_decrease = 0.0
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+        self.stats = {
+            'samples': 0,
+            'timeouts': 0,
+            'increases': 0,
+            'decreases': 0,
+            'waits': 0
+        }
+
+    @property
+    def current_limit(self) -> int:
+        """Limite inteiro em vigor"""
+        return max(self.min_limit, int(self.limit))
+
+    def _can_admit(self, weight: int) -> bool:
+        """Cabe no limite (um bloco maior que o limite entra sozinho)"""
+        return self.in_flight == 0 or self.in_flight + weight <= self.current_limit
+
+    def acquire(self, weight: int = 1, timeout: Optional[float] = None) -> bool:
+        """Reserva 'weight' comandos, aguardando vaga (uso em threads)"""
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self.condition:
+            if not self._can_admit(weight):
+                self.stats['waits'] += 1
+
+            while not self._can_admit(weight):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+
+            self.in_flight += weight
+            return True
+
+    async def acquire_async(self, weight: int = 1):
+        """Reserva 'weight' comandos sem bloquear o event loop"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self.condition:
+                if self._can_admit(weight):
+                    self.in_flight += weight
+                    return
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+                self.stats['waits'] += 1
+
+            await future
+
+    def release(self, weight: int = 1, latency: Optional[float] = None, timeout: bool = False):
+        """
+        Libera a reserva e registra a amostra AIMD
+
+        Args:
+            weight: Comandos liberados
+            latency: Latência observada (segundos, já sem o tempo esperado do comando)
+            timeout: O comando expirou ou a conexão caiu
+        """
+        with self.condition:
+            if timeout or latency is not None:
+                self._record_sample(weight, latency, timeout)
+
+            self.in_flight -= weight
+            self.condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake_future, future)
+
+    def _record_sample(self, weight: int, latency: Optional[float], timeout: bool):
+        """Aumento aditivo / redução multiplicativa (com lock adquirido)"""
+        self.stats['samples'] += 1
+
+        if timeout:
+            self.stats['timeouts'] += 1
+            self._decrease()
+            return
+
+        self.last_latency = latency
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            # Deriva lenta para cima: acompanha mudanças reais de rota/carga
+            self.baseline_latency += (latency - self.baseline_latency) * 0.01
+
+        if latency > self.baseline_latency * self.latency_tolerance + 0.05:
+            self._decrease()
+        elif self.cpu_load is not None and self.cpu_load >= self.cpu_threshold:
+            # CPU alta (já reduzida em record_cpu_load): não cresce
+            return
+        elif self.in_flight >= self.limit / 2 and self.limit < self.max_limit:
+            # Só cresce quando o limite está de fato sendo usado (~+1 por janela)
+            self.limit = min(self.max_limit, self.limit + weight / self.limit)
+            self.stats['increases'] += 1
+
+    def _decrease(self):
+        """Redução multiplicativa, no máximo uma por cooldown (com lock adquirido)"""
+        now = time.time()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        self.stats['decreases'] += 1
+
+    def cpu_sample_due(self, interval: float) -> bool:
+        """Indica (e reserva) a próxima leitura de cpu-load"""
+        if interval <= 0:
+            return False
+        with self.condition:
+            now = time.time()
+            if now - self.last_cpu_sample < interval:
+                return False
+            self.last_cpu_sample = now
+            return True
+
+    def record_cpu_load(self, cpu_load: Optional[float]):
+        """Registra cpu-load de /system/resource; acima do limiar reduz o limite"""
+        if cpu_load is None:
+            return
+        with self.condition:
+            self.cpu_load = float(cpu_load)
+            if self.cpu_load >= self.cpu_threshold:
+                self._decrease()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado do limitador"""
+        with self.condition:
+            return {
+                'limit': self.current_limit,
+                'limit_float': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'baseline_latency_ms': round(self.baseline_latency * 1000, 2)
+                if self.baseline_latency is not None else None,
+                'last_latency_ms': round(self.last_latency * 1000, 2)
+                if self.last_latency is not None else None,
+                'cpu_load': self.cpu_load,
+                **self.stats
+            }
+
+
+def _wake_future(future: asyncio.Future):
+    """Acorda um waiter asyncio (executado no loop dono do future)"""
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimitRegistry:
+    """Limitadores por roteador com persistência dos limites aprendidos"""
+
+    def __init__(self, initial_limit: int = 100, min_limit: int = 2, max_limit: int = 200,
+                 state_file: str = '', save_interval: float = 60.0,
+                 cpu_threshold: float = 80.0):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.state_file = state_file
+        self.save_interval = save_interval
+        self.cpu_threshold = cpu_threshold
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+        self.lock = threading.Lock()
+        self._saved_state: Optional[Dict[str, Any]] = None
+        self._last_save = time.time()
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Carrega limites persistidos (uma vez por processo)"""
+        if self._saved_state is not None:
+            return self._saved_state
+
+        self._saved_state = {}
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self._saved_state = json.load(f).get('limits', {})
+                logger.info(f"Limites adaptativos carregados de {self.state_file}: "
+                            f"{len(self._saved_state)} roteadores")
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"Ignorando limites adaptativos de {self.state_file}: {e}")
+        return self._saved_state
+
+    def get(self, host: str, port: int) -> AdaptiveLimiter:
+        """Obtém (ou cria) o limitador de host:porta"""
+        router = f"{host}:{port}"
+        limiter = self.limiters.get(router)
+        if limiter is None:
+            with self.lock:
+                limiter = self.limiters.get(router)
+                if limiter is None:
+                    saved = self._load_state().get(router, {})
+                    limiter = AdaptiveLimiter(
+                        router,
+                        initial_limit=saved.get('limit', self.initial_limit),
+                        min_limit=self.min_limit,
+                        max_limit=self.max_limit,
+                        cpu_threshold=self.cpu_threshold
+                    )
+                    limiter.baseline_latency = saved.get('baseline_latency')
+                    self.limiters[router] = limiter
+        return limiter
+
+    def maybe_save(self):
+        """Persiste os limites se o intervalo de gravação passou"""
+        if not self.state_file or time.time() - self._last_save < self.save_interval:
+            return
+        self.save()
+
+    def save(self):
+        """Grava os limites aprendidos (escrita atômica)"""
+        if not self.state_file:
+            return
+
+        with self.lock:
+            self._last_save = time.time()
+            limits = dict(self._load_state())
+            for router, limiter in self.limiters.items():
+                limits[router] = {
+                    'limit': round(limiter.limit, 2),
+                    'baseline_latency': limiter.baseline_latency
+                }
+
+        tmp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'limits': limits}, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning(f"Erro ao salvar limites adaptativos em {self.state_file}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Limites aprendidos por roteador"""
+        with self.lock:
+            limiters = list(self.limiters.items())
+
+        return {
+            'initial_limit': self.initial_limit,
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'state_file': self.state_file,
+            'routers': {router: limiter.get_stats() for router, limiter in limiters}
+        }
+
+
+# Instância global dos limitadores adaptativos
+adaptive_limits = AdaptiveLimitRegistry(
+    initial_limit=config.ADAPTIVE_INITIAL_LIMIT,
+    min_limit=config.ADAPTIVE_MIN_LIMIT,
+    max_limit=config.MAX_CONCURRENT_COMMANDS,
+    state_file=config.ADAPTIVE_LIMITS_FILE,
+    cpu_threshold=config.ADAPTIVE_CPU_THRESHOLD
+)
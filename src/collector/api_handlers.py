@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Handlers da API independentes de framework
+Regras de validação e contratos JSON dos endpoints, compartilhados pelo
+servidor Flask/gunicorn (sentinel_api_server.py) e pelo modo ASGI (asgi_app.py)
+
+Cada handler recebe o corpo JSON já decodificado e retorna a tupla
+(payload, status HTTP). Os handlers assíncronos são aguardados direto no
+event loop do ASGI ou enviados ao loop persistente pelo Flask.
+
+As operações do conector passam por broker_client: com BROKER_SOCKET vão ao
+broker de conexões do nó, sem ele executam no conector do próprio worker.
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sentinel_config import config
+from connection_broker import broker_client
+
+try:
+    from . import __version__
+except ImportError:
+    __version__ = "2.1.0"
+
+logger = logging.getLogger('sentinel-collector')
+
+Response = Tuple[Dict[str, Any], int]
+
+# Estatísticas globais da aplicação
+app_stats = {
+    'start_time': datetime.now(),
+    'total_requests': 0,
+    'successful_requests': 0,
+    'failed_requests': 0,
+    'active_requests': 0,
+    'avg_response_time': 0.0,
+    'total_response_time': 0.0,
+    'peak_concurrent_requests': 0
+}
+
+# Lock para estatísticas thread-safe
+stats_lock = threading.RLock()
+
+
+def request_started():
+    """Conta a requisição como ativa"""
+    with stats_lock:
+        app_stats['active_requests'] += 1
+        if app_stats['active_requests'] > app_stats['peak_concurrent_requests']:
+            app_stats['peak_concurrent_requests'] = app_stats['active_requests']
+
+
+def request_finished(execution_time: float, success: bool):
+    """Atualiza estatísticas da aplicação de forma thread-safe"""
+    with stats_lock:
+        app_stats['active_requests'] -= 1
+        app_stats['total_requests'] += 1
+        if success:
+            app_stats['successful_requests'] += 1
+        else:
+            app_stats['failed_requests'] += 1
+
+        app_stats['total_response_time'] += execution_time
+        app_stats['avg_response_time'] = (
+            app_stats['total_response_time'] / app_stats['total_requests']
+        )
+
+
+def _error(endpoint: str, error: Exception) -> Response:
+    logger.error(f"Erro no endpoint {endpoint}: {str(error)}")
+    return {
+        'status': 'error',
+        'error': str(error),
+        'timestamp': datetime.now().isoformat()
+    }, 500
+
+
+def _missing_field(data: Optional[Dict[str, Any]], required_fields) -> Optional[Response]:
+    """Resposta 400 se o corpo estiver vazio ou faltar campo obrigatório"""
+    if not data:
+        return {'error': 'JSON body required'}, 400
+    for field in required_fields:
+        if field not in data:
+            return {'error': f'Campo obrigatório: {field}'}, 400
+    return None
+
+
+# ===== HEALTH E ESTATÍSTICAS =====
+
+def health() -> Response:
+    """Health check da aplicação"""
+    uptime = datetime.now() - app_stats['start_time']
+
+    return {
+        'status': 'healthy',
+        'service': 'TriplePlay-Sentinel Collector',
+        'version': __version__,
+        'uptime_seconds': uptime.total_seconds(),
+        'timestamp': datetime.now().isoformat(),
+        'performance': {
+            'total_requests': app_stats['total_requests'],
+            'active_requests': app_stats['active_requests'],
+            'success_rate_percent': (
+                (app_stats['successful_requests'] / max(1, app_stats['total_requests'])) * 100
+            ),
+            'avg_response_time_seconds': app_stats['avg_response_time']
+        }
+    }, 200
+
+
+async def stats(extra: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Estatísticas completas do sistema
+
+    Args:
+        extra: Seções próprias do modo de execução (ex.: event_loop)
+    """
+    try:
+        app_uptime = datetime.now() - app_stats['start_time']
+
+        payload = {
+            'application': {
+                'service': 'TriplePlay-Sentinel Collector',
+                'version': '2.1.0',
+                'uptime_seconds': app_uptime.total_seconds(),
+                'start_time': app_stats['start_time'].isoformat(),
+                'total_requests': app_stats['total_requests'],
+                'successful_requests': app_stats['successful_requests'],
+                'failed_requests': app_stats['failed_requests'],
+                'active_requests': app_stats['active_requests'],
+                'peak_concurrent_requests': app_stats['peak_concurrent_requests'],
+                'success_rate_percent': (
+                    (app_stats['successful_requests'] / max(1, app_stats['total_requests'])) * 100
+                ),
+                'avg_response_time_seconds': app_stats['avg_response_time']
+            },
+            'mikrotik_connector': await broker_client.call('get_stats')
+        }
+        if broker_client.enabled:
+            payload['broker_client'] = broker_client.get_stats()
+        payload.update(extra or {})
+        payload['configuration'] = {
+            'max_concurrent_hosts': config.MAX_CONCURRENT_HOSTS,
+            'max_concurrent_commands': config.MAX_CONCURRENT_COMMANDS,
+            'max_connections_per_host': config.MAX_CONNECTIONS_PER_HOST,
+            'cache_ttl_seconds': config.CACHE_TTL,
+            'mikrotik_timeout': config.MIKROTIK_API_TIMEOUT
+        }
+        payload['timestamp'] = datetime.now().isoformat()
+        return payload, 200
+
+    except Exception as e:
+        return _error('stats', e)
+
+
+async def clear_cache() -> Response:
+    """Limpa cache do sistema"""
+    try:
+        removed = await broker_client.call('clear_cache')
+        return {
+            'status': 'success',
+            'message': 'Cache limpo com sucesso',
+            'entries_removed': removed,
+            'timestamp': datetime.now().isoformat()
+        }, 200
+    except Exception as e:
+        logger.error(f"Erro ao limpar cache: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }, 500
+
+
+async def test_connection(data: Optional[Dict[str, Any]]) -> Response:
+    """Testa conectividade com MikroTik via API (bloqueante: roda no executor do conector)"""
+    try:
+        invalid = _missing_field(data, ['host', 'username', 'password'])
+        if invalid:
+            return invalid
+
+        result = await broker_client.call(
+            'test_connection',
+            host=data['host'],
+            username=data['username'],
+            password=data['password'],
+            port=int(data.get('port', 8728)),
+            use_ssl=data.get('use_ssl')
+        )
+        return result, 200
+
+    except Exception as e:
+        return _error('test-connection', e)
+
+
+# ===== PROBES E COMANDOS =====
+
+async def ping(data: Optional[Dict[str, Any]]) -> Response:
+    """Ping em targets via API MikroTik (batch multiplexado)"""
+    try:
+        invalid = _missing_field(data, ['host', 'username', 'password', 'targets'])
+        if invalid:
+            return invalid
+
+        host = data['host']
+        targets = data['targets']
+        count = data.get('count', 4)
+        port = int(data.get('port', 8728))
+        use_cache = data.get('use_cache', True)
+
+        if not isinstance(targets, list) or not targets:
+            return {'error': 'Targets deve ser uma lista não vazia'}, 400
+
+        # Executa todos os pings em paralelo via API
+        batch_results = await broker_client.call(
+            'execute_batch_ping',
+            host=host,
+            username=data['username'],
+            password=data['password'],
+            targets=targets,
+            count=count,
+            use_cache=use_cache and count <= 4,  # Cache apenas para pings pequenos
+            port=port,
+            use_ssl=data.get('use_ssl')
+        )
+
+        # Processa resultados
+        ping_results = {}
+        total_execution_time = 0
+        successful_pings = 0
+
+        for i, result in enumerate(batch_results):
+            target = targets[i]
+            if result['status'] == 'success':
+                successful_pings += 1
+                ping_results[target] = {
+                    'status': 'success',
+                    'data': result.get('data', {}),
+                    'execution_time_seconds': result.get('execution_time_seconds', 0),
+                    'cached': result.get('cached', False),
+                    'coalesced': result.get('coalesced', False)
+                }
+                if result.get('cached'):
+                    ping_results[target]['stale'] = result.get('stale', False)
+                    ping_results[target]['cache_age_seconds'] = result.get('cache_age_seconds', 0)
+            else:
+                ping_results[target] = {
+                    'status': 'error',
+                    'error': result.get('error', 'Erro desconhecido'),
+                    'execution_time_seconds': result.get('execution_time_seconds', 0)
+                }
+                if result.get('negative'):
+                    # Falha recente servida do cache negativo
+                    ping_results[target]['negative'] = result['negative']
+                    ping_results[target]['negative_retry_in_seconds'] = result.get('negative_retry_in_seconds', 0)
+
+            total_execution_time += result.get('execution_time_seconds', 0)
+
+        return {
+            'status': 'completed',
+            'method': 'BATCH_PROCESSING',
+            'host': host,
+            'targets_requested': len(targets),
+            'targets_successful': successful_pings,
+            'total_execution_time_seconds': max(
+                total_execution_time / len(targets),  # Média devido ao paralelismo
+                max(r.get('execution_time_seconds', 0) for r in batch_results)
+            ),
+            'results': ping_results,
+            'timestamp': datetime.now().isoformat()
+        }, 200
+
+    except Exception as e:
+        return _error('ping', e)
+
+
+async def command(data: Optional[Dict[str, Any]]) -> Response:
+    """Comando genérico via API MikroTik"""
+    try:
+        invalid = _missing_field(data, ['host', 'username', 'password', 'command'])
+        if invalid:
+            return invalid
+
+        result = await broker_client.call(
+            'execute_single_command',
+            host=data['host'],
+            username=data['username'],
+            password=data['password'],
+            command=data['command'],
+            parameters=data.get('parameters', {}),
+            use_cache=data.get('use_cache', True),
+            port=int(data.get('port', 8728)),
+            use_ssl=data.get('use_ssl')
+        )
+        return result, 200
+
+    except Exception as e:
+        return _error('command', e)
+
+
+async def batch(data: Optional[Dict[str, Any]]) -> Response:
+    """Múltiplos comandos em paralelo no mesmo MikroTik"""
+    try:
+        invalid = _missing_field(data, ['host', 'username', 'password', 'commands'])
+        if invalid:
+            return invalid
+
+        commands = data['commands']
+        if not isinstance(commands, list) or not commands:
+            return {'error': 'Commands deve ser uma lista não vazia'}, 400
+
+        max_concurrent = min(
+            data.get('max_concurrent', config.MAX_CONCURRENT_COMMANDS),
+            config.MAX_CONCURRENT_COMMANDS
+        )
+
+        results = await broker_client.call(
+            'execute_batch_commands',
+            host=data['host'],
+            username=data['username'],
+            password=data['password'],
+            commands=commands,
+            max_concurrent=max_concurrent,
+            port=int(data.get('port', 8728)),
+            use_ssl=data.get('use_ssl')
+        )
+
+        # Calcula estatísticas
+        successful_commands = sum(1 for r in results if r.get('status') == 'success')
+        total_execution_time = max(r.get('execution_time_seconds', 0) for r in results)
+
+        return {
+            'status': 'completed',
+            'method': 'BATCH_PARALLEL',
+            'commands_requested': len(commands),
+            'commands_successful': successful_commands,
+            'max_concurrent': max_concurrent,
+            'total_execution_time_seconds': total_execution_time,
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        }, 200
+
+    except Exception as e:
+        return _error('batch', e)
+
+
+async def multi_host(data: Optional[Dict[str, Any]]) -> Response:
+    """Mesmo comando em múltiplos MikroTiks simultaneamente"""
+    try:
+        invalid = _missing_field(data, ['hosts', 'command'])
+        if invalid:
+            return invalid
+
+        hosts = data['hosts']
+        if not isinstance(hosts, list) or not hosts:
+            return {'error': 'Hosts deve ser uma lista não vazia'}, 400
+
+        command_text = data['command']
+        max_concurrent_hosts = min(
+            data.get('max_concurrent_hosts', config.MAX_CONCURRENT_HOSTS),
+            config.MAX_CONCURRENT_HOSTS
+        )
+
+        results = await broker_client.call(
+            'execute_multiple_hosts',
+            hosts_config=hosts,
+            command=command_text,
+            parameters=data.get('parameters', {}),
+            max_concurrent_hosts=max_concurrent_hosts
+        )
+
+        # Calcula estatísticas
+        successful_hosts = sum(1 for r in results.values() if r.get('status') == 'success')
+
+        return {
+            'status': 'completed',
+            'method': 'MULTI_HOST_PARALLEL',
+            'hosts_requested': len(hosts),
+            'hosts_successful': successful_hosts,
+            'max_concurrent_hosts': max_concurrent_hosts,
+            'command': command_text,
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        }, 200
+
+    except Exception as e:
+        return _error('multi-host', e)
+
+
+async def batch_test(data: Optional[Dict[str, Any]]) -> Response:
+    """Testes de conectividade em batch (formato do dashboard)"""
+    try:
+        invalid = _missing_field(
+            data, ['mikrotik_host', 'mikrotik_user', 'mikrotik_password', 'test_type', 'targets']
+        )
+        if invalid:
+            return invalid
+
+        targets = data['targets']
+        if not isinstance(targets, list) or not targets:
+            return {'error': 'Targets deve ser uma lista não vazia'}, 400
+
+        if data['test_type'] != 'ping':
+            return {'error': f'Tipo de teste não suportado: {data["test_type"]}'}, 400
+
+        host = data['mikrotik_host']
+        batch_id = f"batch-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+        batch_results = await broker_client.call(
+            'execute_batch_ping',
+            host=host,
+            username=data['mikrotik_user'],
+            password=data['mikrotik_password'],
+            targets=targets,
+            count=data.get('count', 4),
+            use_cache=True,
+            port=int(data.get('mikrotik_port', 8728)),
+            use_ssl=data.get('mikrotik_use_ssl')
+        )
+
+        # Reformata para o formato esperado pelo dashboard
+        formatted_results = {}
+        for target, result in zip(targets, batch_results):
+            formatted_results[target] = {
+                'status': result.get('status', 'error'),
+                'test_type': 'ping',
+                'mikrotik_host': host,
+                'target': target,
+                'timestamp': datetime.now().isoformat(),
+                'results': result,
+                'batch_id': batch_id
+            }
+
+        return {
+            'status': 'completed',
+            'batch_id': batch_id,
+            'test_type': data['test_type'],
+            'targets_tested': len(targets),
+            'targets_successful': sum(1 for r in formatted_results.values() if r['status'] == 'success'),
+            'results': formatted_results,
+            'timestamp': datetime.now().isoformat()
+        }, 200
+
+    except Exception as e:
+        logger.error(f"Erro no batch test: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }, 500
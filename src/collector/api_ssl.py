@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - API-SSL (porta 8729)
+Contexto TLS e cache de sessões TLS por roteador
+
+Reconexões reaproveitam a sessão TLS anterior do roteador (resumption), o que
+evita o handshake completo - caro em CPUs RouterOS de baixo custo - durante
+tempestades de reconexão após quedas de rede.
+"""
+
+import logging
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-api-ssl')
+
+
+def resolve_use_ssl(port: int, use_ssl: Optional[bool] = None) -> bool:
+    """SSL explícito ou, se não informado, deduzido pela porta API-SSL"""
+    if use_ssl is None:
+        return port == config.MIKROTIK_API_SSL_PORT
+    return bool(use_ssl)
+
+
+class TLSSessionCache:
+    """Contexto TLS compartilhado e última sessão TLS de cada roteador"""
+
+    def __init__(self, verify: bool = False, ca_file: str = ''):
+        self.verify = verify
+        self.ca_file = ca_file
+        self._context: Optional[ssl.SSLContext] = None
+        self.sessions: Dict[str, ssl.SSLSession] = {}
+        self.lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def context(self) -> ssl.SSLContext:
+        """Contexto TLS criado sob demanda"""
+        if self._context is None:
+            self._context = self._build_context()
+        return self._context
+
+    def _build_context(self) -> ssl.SSLContext:
+        """Cria o contexto TLS (com ou sem verificação de certificado)"""
+        if self.verify:
+            return ssl.create_default_context(cafile=self.ca_file or None)
+
+        # RouterOS sem certificado em /ip/service api-ssl negocia apenas ADH (TLS 1.2)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        context.maximum_version = ssl.TLSVersion.TLSv1_2
+        try:
+            context.set_ciphers('DEFAULT:ADH:@SECLEVEL=0')
+        except ssl.SSLError:
+            logger.warning("OpenSSL sem suporte a ADH: API-SSL exige certificado no roteador")
+        return context
+
+    def _get_session(self, router: str) -> Optional[ssl.SSLSession]:
+        """Sessão TLS ainda válida do roteador"""
+        with self.lock:
+            session = self.sessions.get(router)
+            if session is not None and session.time + session.timeout < time.time():
+                del self.sessions[router]
+                session = None
+            return session
+
+    def wrapper(self, host: str, port: int) -> Callable[[socket.socket], ssl.SSLSocket]:
+        """ssl_wrapper para librouteros.connect que tenta retomar a sessão anterior"""
+        router = f"{host}:{port}"
+
+        def wrap(sock: socket.socket) -> ssl.SSLSocket:
+            session = self._get_session(router)
+            start_time = time.perf_counter()
+            ssl_sock = self.context.wrap_socket(
+                sock,
+                server_hostname=host if self.verify else None,
+                session=session
+            )
+            self.record_handshake(host, port, time.perf_counter() - start_time, ssl_sock.session_reused)
+            return ssl_sock
+
+        return wrap
+
+    def store(self, host: str, port: int, ssl_sock: Any):
+        """Guarda a sessão de uma conexão autenticada (após o login chegam os tickets TLS 1.3)"""
+        session = getattr(ssl_sock, 'session', None)
+        if session is None:
+            return
+        with self.lock:
+            self.sessions[f"{host}:{port}"] = session
+
+    def invalidate(self, host: str, port: int):
+        """Descarta a sessão (falha de handshake/conexão)"""
+        with self.lock:
+            self.sessions.pop(f"{host}:{port}", None)
+
+    def record_handshake(self, host: str, port: int, seconds: float, resumed: bool):
+        """Registra tempo de handshake TLS (separado do connect TCP e do login)"""
+        router = f"{host}:{port}"
+        with self.lock:
+            stats = self.stats.setdefault(router, {
+                'full_handshakes': 0,
+                'resumed_handshakes': 0,
+                'full_handshake_time': 0.0,
+                'resumed_handshake_time': 0.0,
+                'last_handshake_ms': 0.0
+            })
+            kind = 'resumed' if resumed else 'full'
+            stats[f'{kind}_handshakes'] += 1
+            stats[f'{kind}_handshake_time'] += seconds
+            stats['last_handshake_ms'] = round(seconds * 1000, 2)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Handshakes completos vs retomados e tempo médio por roteador"""
+        with self.lock:
+            routers = {}
+            for router, stats in self.stats.items():
+                full = stats['full_handshakes']
+                resumed = stats['resumed_handshakes']
+                routers[router] = {
+                    'full_handshakes': full,
+                    'resumed_handshakes': resumed,
+                    'resumption_rate_percent': round(resumed / (full + resumed) * 100, 2)
+                    if full + resumed else 0,
+                    'avg_full_handshake_ms': round(stats['full_handshake_time'] / full * 1000, 2)
+                    if full else 0,
+                    'avg_resumed_handshake_ms': round(stats['resumed_handshake_time'] / resumed * 1000, 2)
+                    if resumed else 0,
+                    'last_handshake_ms': stats['last_handshake_ms']
+                }
+
+            return {
+                'verify_certificates': self.verify,
+                'cached_sessions': len(self.sessions),
+                'routers': routers
+            }
+
+
+# Instância global do cache de sessões TLS
+tls_sessions = TLSSessionCache(
+    verify=config.MIKROTIK_API_SSL_VERIFY,
+    ca_file=config.MIKROTIK_API_SSL_CA_FILE
+)
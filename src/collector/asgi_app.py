@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel Collector - Modo ASGI
+Serve as mesmas rotas e contratos JSON do servidor Flask (api_handlers.py),
+aguardando as corrotinas do conector direto no event loop do servidor, sem o
+salto greenlet -> loop asyncio -> thread a cada requisição.
+
+Produção (reaproveita gunicorn.conf.py: hooks de snapshot e pré-aquecimento):
+    gunicorn --config=gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+    (ou ./start.sh asgi)
+
+Desenvolvimento:
+    python3 asgi_app.py
+
+O dashboard HTML continua apenas no modo Flask.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sentinel_config import config
+from mikrotik_connector import mikrotik_connector, prewarm_from_inventory
+from cache import cache
+import api_handlers
+
+logger = logging.getLogger('sentinel-collector')
+
+Response = Tuple[Dict[str, Any], int]
+
+
+async def _stats() -> Response:
+    """Estatísticas com a seção do loop do servidor ASGI"""
+    loop = asyncio.get_running_loop()
+    return await api_handlers.stats({'event_loop': {
+        'mode': 'asgi',
+        'running': loop.is_running(),
+        'pending_tasks': len(asyncio.all_tasks(loop))
+    }})
+
+
+# (método, caminho) -> (handler, recebe corpo JSON, assíncrono)
+ROUTES: Dict[Tuple[str, str], Tuple[Callable[..., Any], bool, bool]] = {
+    ('GET', '/health'): (api_handlers.health, False, False),
+    ('GET', '/api/health'): (api_handlers.health, False, False),
+    ('POST', '/api/v2/mikrotik/ping'): (api_handlers.ping, True, True),
+    ('POST', '/api/v2/mikrotik/command'): (api_handlers.command, True, True),
+    ('POST', '/api/v2/mikrotik/batch'): (api_handlers.batch, True, True),
+    ('POST', '/api/v2/mikrotik/multi-host'): (api_handlers.multi_host, True, True),
+    ('POST', '/api/v2/test-connection'): (api_handlers.test_connection, True, True),
+    ('GET', '/api/v2/stats'): (_stats, False, True),
+    ('POST', '/api/v2/cache/clear'): (api_handlers.clear_cache, False, True),
+    ('POST', '/api/batch-test'): (api_handlers.batch_test, True, True),
+}
+
+_CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+]
+
+
+async def _read_json(receive: Callable[[], Awaitable[Dict[str, Any]]]) -> Optional[Any]:
+    """Corpo da requisição como JSON (None se vazio ou inválido, como get_json(silent=True))"""
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body = b''.join(chunks)
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+async def _send_json(send: Callable[[Dict[str, Any]], Awaitable[None]], payload: Any, status: int):
+    body = json.dumps(payload, default=str, sort_keys=True).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ] + _CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _dispatch(method: str, path: str, receive) -> Response:
+    """Executa o handler da rota (com prazo ASYNC_REQUEST_TIMEOUT nos assíncronos)"""
+    route = ROUTES.get((method, path))
+    if route is None:
+        if any(route_path == path for _, route_path in ROUTES):
+            return {'error': f'Método {method} não permitido'}, 405
+        return {'error': f'Rota não encontrada: {path}'}, 404
+
+    handler, with_body, is_async = route
+    args = [await _read_json(receive)] if with_body else []
+    if is_async:
+        timeout = config.ASYNC_REQUEST_TIMEOUT
+        try:
+            return await asyncio.wait_for(handler(*args), timeout if timeout > 0 else None)
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout no endpoint {path}: excedeu {timeout}s")
+            return {
+                'status': 'error',
+                'error': f"Operação excedeu {timeout}s e foi cancelada",
+                'timestamp': datetime.now().isoformat()
+            }, 504
+    return handler(*args)
+
+
+async def _lifespan(receive, send):
+    """Startup/shutdown do servidor ASGI"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Fecha as conexões no mesmo loop que as usou
+            try:
+                await mikrotik_connector.close_all_connections()
+            except Exception as e:
+                logger.error(f"Erro ao encerrar conexões: {e}")
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope: Dict[str, Any], receive, send):
+    """Aplicação ASGI do collector"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method']
+    if method == 'OPTIONS':
+        # Preflight CORS (equivalente ao flask_cors com padrões)
+        await send({'type': 'http.response.start', 'status': 200, 'headers': _CORS_HEADERS + [
+            (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+            (b'access-control-allow-headers', b'*'),
+            (b'content-length', b'0'),
+        ]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    start_time = time.monotonic()
+    api_handlers.request_started()
+    status = 500
+    try:
+        try:
+            payload, status = await _dispatch(method, scope['path'], receive)
+        except Exception as e:
+            logger.error(f"Erro no endpoint {scope['path']}: {str(e)}")
+            payload = {'status': 'error', 'error': str(e), 'timestamp': datetime.now().isoformat()}
+            status = 500
+        await _send_json(send, payload, status)
+    finally:
+        api_handlers.request_finished(time.monotonic() - start_time, 200 <= status < 400)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.info("Iniciando TriplePlay-Sentinel Collector v2.1.0 (ASGI)")
+    cache.restore_snapshot()
+    prewarm_from_inventory()
+    uvicorn.run(app, host=config.API_HOST, port=config.API_PORT, log_level=config.LOG_LEVEL.lower())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Event loop asyncio persistente por worker
+Os handlers Flask são síncronos e o conector é asyncio: em vez de criar um
+event loop por requisição (e nunca fechá-lo, vazando seletores e descritores),
+cada processo mantém um único loop rodando em uma thread dedicada.
+
+Os handlers enviam a corrotina com run_coroutine_threadsafe e aguardam com
+prazo (ASYNC_REQUEST_TIMEOUT); ao estourar, a corrotina é cancelada no loop.
+Estado ligado ao loop (semáforos, conexões nativas asyncio) pode então
+sobreviver entre requisições.
+
+A thread é iniciada sob demanda por processo: com preload_app o módulo é
+importado no master e threads não sobrevivem ao fork. Pelo mesmo motivo o
+lock da instância é um lock real no worker gevent (criado antes do monkey
+patching): nada que ceda o greenlet (iniciar a thread, esperar) roda com ele.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Dict, Optional
+
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-background-loop')
+
+
+class LoopTimeoutError(TimeoutError):
+    """Corrotina não terminou dentro do prazo (e foi cancelada)"""
+
+
+class BackgroundLoop:
+    """Um event loop por processo, rodando em thread daemon"""
+
+    def __init__(self, name: str = 'asyncio-loop'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'loops_started': 0
+        }
+
+    def _current_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Loop deste processo, rodando ou ainda iniciando (None se herdado do fork ou encerrado)"""
+        loop = self._loop
+        if self._pid == os.getpid() and loop is not None and not loop.is_closed():
+            return loop
+        return None
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Inicia o loop neste processo (reinicia se herdado do fork ou encerrado)"""
+        loop = self._current_loop()
+        if loop is not None:
+            return loop
+
+        with self._lock:
+            loop = self._current_loop()
+            if loop is not None:
+                return loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run, args=(loop,), name=self.name, daemon=True)
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            self._stats['loops_started'] += 1
+
+        # Fora do lock: no gevent start() cede o greenlet. Corrotinas enviadas
+        # antes do run_forever ficam na fila do loop (call_soon_threadsafe)
+        thread.start()
+        return loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            # Cancela o que restou e fecha seletor/descritores do loop
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Agenda a corrotina no loop e retorna um concurrent.futures.Future"""
+        loop = self._ensure_started()
+        with self._lock:
+            self._stats['submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Executa a corrotina no loop e aguarda o resultado (chamada síncrona)
+
+        Args:
+            coro: Corrotina a executar
+            timeout: Prazo em segundos (padrão ASYNC_REQUEST_TIMEOUT; 0 = sem prazo)
+
+        Raises:
+            LoopTimeoutError: Prazo esgotado (a corrotina é cancelada)
+        """
+        if timeout is None:
+            timeout = config.ASYNC_REQUEST_TIMEOUT
+        future = self.submit(coro)
+
+        try:
+            result = future.result(timeout if timeout > 0 else None)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise LoopTimeoutError(f"Operação excedeu {timeout}s e foi cancelada")
+        except BaseException:
+            with self._lock:
+                self._stats['failed'] += 1
+            raise
+
+        with self._lock:
+            self._stats['completed'] += 1
+        return result
+
+    def stop(self, timeout: float = 5.0):
+        """Para o loop deste processo (tarefas pendentes são canceladas)"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid():
+                return
+            self._loop = None
+            self._thread = None
+            self._pid = None
+
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)  # Também vale para loop ainda iniciando
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def is_running(self) -> bool:
+        """Loop ativo neste processo"""
+        return self._pid == os.getpid() and self._loop is not None and self._loop.is_running()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores e tarefas em andamento no loop"""
+        with self._lock:
+            stats = dict(self._stats)
+        loop = self._loop if self.is_running() else None
+        stats['running'] = loop is not None
+        stats['pending_tasks'] = len(asyncio.all_tasks(loop)) if loop is not None else 0
+        stats['in_flight'] = stats['submitted'] - stats['completed'] - stats['failed'] - stats['timed_out']
+        return stats
+
+
+# Loop global do processo
+background_loop = BackgroundLoop()
+
+
+if __name__ == "__main__":
+    # Soak: loop por requisição (padrão antigo, sem close) vs loop persistente
+    def open_fds() -> int:
+        return len(os.listdir('/proc/self/fd'))
+
+    async def request_work():
+        await asyncio.sleep(0)
+        return 1
+
+    requests_count = 5000
+    print("=== Soak: event loop por requisição vs loop persistente ===")
+
+    fds_before = open_fds()
+    leaked = []
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(request_work())
+        leaked.append(loop)  # Referência mantida como pelo set_event_loop/threads do servidor
+    per_request_us = (time.perf_counter() - start) / requests_count * 1e6
+    print(f"new_event_loop: {per_request_us:7.1f} us/req | FDs {fds_before} -> {open_fds()}")
+    for loop in leaked:
+        loop.close()
+    asyncio.set_event_loop(None)
+
+    fds_before = open_fds()
+    background_loop.run(request_work())  # Inicia a thread fora da medição
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        background_loop.run(request_work())
+    per_request_us = (time.perf_counter() - start) / requests_count * 1e6
+    print(f"persistente:    {per_request_us:7.1f} us/req | FDs {fds_before} -> {open_fds()}")
+    background_loop.stop()
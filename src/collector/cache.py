@@ -2,214 +2,770 @@
 """
 TriplePlay-Sentinel - Sistema de Cache Inteligente
 Sistema de Monitoramento Centralizado MikroTik-Zabbix via HTTP Agent (PULL)
+
+Motor TTL+LRU com custo O(1) por operação:
+    - recência em OrderedDict (move_to_end no hit, popitem na remoção do LRU)
+    - expiração em roda de tempo (timing wheel): baldes por tick de
+      CACHE_WHEEL_RESOLUTION segundos, varridos por uma thread em background
+    - chaves em tupla (host, tipo, target, parâmetros), sem json/md5
+    - orçamento em bytes (CACHE_MAX_BYTES) além do número de entradas; os
+      resultados ficam em forma compacta (CompactResult) e o TestResult é
+      reconstruído apenas na leitura
+
+Abaixo do dicionário do processo (L1) podem existir camadas externas
+(cache_backend.CacheBackend), consultadas em ordem em um miss e promovidas
+para as camadas acima no hit; set() grava em todas:
+    - CACHE_SHARED_FILE: memória compartilhada entre os workers do nó (shared_cache.py)
+    - REDIS_ENABLED: Redis compartilhado entre os nós do collector (redis_cache.py),
+      que também oferece locks para single-flight entre nós
+
+Com CACHE_SNAPSHOT_FILE o conteúdo é gravado em disco periodicamente e no
+encerramento, e recarregado (apenas entradas ainda válidas) ao iniciar.
+
+Com stale-while-revalidate (CACHE_STALE_WHILE_REVALIDATE) a entrada vencida
+continua disponível via lookup(allow_stale=True) por até CACHE_MAX_STALENESS
+segundos, enquanto o chamador atualiza o resultado em background.
 """
 
+import math
+import os
+import sys
 import threading
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Optional, List
-from models import TestResult, CacheEntry
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Optional, List, Set, Tuple
+from models import TestResult, CacheEntry, CompactResult
 from sentinel_config import config
+from cache_snapshot import SnapshotError, read_snapshot, write_snapshot
+from cache_backend import BackendItem, CacheBackend
+from shared_cache import SharedMemoryCache
+from redis_cache import RedisCacheBackend
 
 logger = logging.getLogger('sentinel-cache')
 
 
+# Custo fixo aproximado por entrada: CacheEntry, nó do OrderedDict, roda e índice de ticks
+_ENTRY_OVERHEAD = 240
+
+
+def approximate_size(value: Any) -> int:
+    """Bytes aproximados de um valor e do que ele contém (dict/list/tuple)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approximate_size(k) + approximate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approximate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _entry_size(cache_key: Hashable, result: CompactResult) -> int:
+    """Bytes aproximados de uma entrada (strings internadas não são contadas)"""
+    return (_ENTRY_OVERHEAD + approximate_size(cache_key) + sys.getsizeof(result)
+            + approximate_size(result.results) + approximate_size(result.texts)
+            + sys.getsizeof(result.timestamp) + sys.getsizeof(result.error_message))
+
+
+def _freeze(value: Any) -> Hashable:
+    """Converte parâmetros (dict/list aninhados) em valor hashable para a chave"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class TimingWheel:
+    """
+    Roda de tempo para expiração
+
+    Cada chave fica no balde do tick em que expira; advance() devolve os baldes
+    cujo tick já passou. Inserção e remoção são O(1) e a varredura custa apenas
+    os ticks decorridos mais as chaves efetivamente vencidas.
+    """
+
+    def __init__(self, resolution: float = 1.0):
+        self.resolution = resolution
+        self._buckets: Dict[int, Set[Hashable]] = {}
+        self._current_tick = self.tick_for(time.monotonic())
+
+    def tick_for(self, instant: float) -> int:
+        """Tick (arredondado para cima) que contém o instante"""
+        return math.ceil(instant / self.resolution)
+
+    def add(self, key: Hashable, expires_at: float) -> int:
+        tick = max(self.tick_for(expires_at), self._current_tick + 1)
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = set()
+        bucket.add(key)
+        return tick
+
+    def discard(self, key: Hashable, tick: int):
+        bucket = self._buckets.get(tick)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[tick]
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Remove e retorna as chaves dos ticks já vencidos"""
+        target = self.tick_for(now)
+        expired = []
+        if target - self._current_tick > len(self._buckets):
+            # Salto longo (thread parada, relógio suspenso): percorre só os baldes existentes
+            for tick in [t for t in self._buckets if t <= target]:
+                expired.extend(self._buckets.pop(tick))
+        else:
+            for tick in range(self._current_tick + 1, target + 1):
+                bucket = self._buckets.pop(tick, None)
+                if bucket:
+                    expired.extend(bucket)
+        self._current_tick = max(self._current_tick, target)
+        return expired
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
 class SentinelCache:
     """
     Sistema de cache inteligente com TTL automático e limpeza de entradas expiradas
     """
-    
-    def __init__(self):
-        self._cache: Dict[str, CacheEntry] = {}
-        self._timestamps: Dict[str, datetime] = {}
-        self._lock = threading.RLock()
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None,
+                 cleanup_interval: Optional[float] = None, max_staleness: Optional[float] = None,
+                 max_bytes: Optional[int] = None, backends: Optional[List[CacheBackend]] = None):
+        self.max_size = max_size if max_size is not None else config.MAX_CACHE_SIZE
+        self.backends = list(backends or [])  # Camadas abaixo do L1, da mais próxima à mais distante
+        self._lock_backend = next((b for b in self.backends if b.supports_locks), None)
+        # Leituras/gravações/locks fazem I/O de rede bloqueante (Redis)
+        self.remote_io = any(b.remote for b in self.backends)
+        self.max_bytes = max_bytes if max_bytes is not None else config.CACHE_MAX_BYTES
+        self.compress_min = config.CACHE_COMPRESS_MIN_BYTES
+        self._bytes = 0
+        self.ttl = ttl if ttl is not None else config.CACHE_TTL
+        if max_staleness is None:
+            max_staleness = config.CACHE_MAX_STALENESS if config.CACHE_STALE_WHILE_REVALIDATE else 0
+        self.max_staleness = max_staleness
+        self.snapshot_file = config.CACHE_SNAPSHOT_FILE
+        self.snapshot_interval = config.CACHE_SNAPSHOT_INTERVAL
+        self.cleanup_interval = (cleanup_interval if cleanup_interval is not None
+                                 else config.CACHE_CLEANUP_INTERVAL)
+        self._cache: 'OrderedDict[Hashable, CacheEntry]' = OrderedDict()
+        self._ticks: Dict[Hashable, int] = {}
+        self._wheel = TimingWheel(config.CACHE_WHEEL_RESOLUTION)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper_pid: Optional[int] = None
+        self._snapshot_pid: Optional[int] = None  # Processo que carregou (e regrava) o snapshot
         self._stats = {
             'hits': 0,
+            'stale_hits': 0,
             'misses': 0,
             'evictions': 0,
-            'cleanups': 0
+            'expirations': 0,
+            'cleanups': 0,
+            'oversized_rejected': 0,
+            'snapshots_saved': 0,
+            'snapshot_entries_restored': 0
         }
-    
+        self._class_stats: Dict[str, Dict[str, int]] = {}
+        self._backend_hits = {backend.name: 0 for backend in self.backends}
+
     def get(self, mikrotik_host: str, test_type: str, target: str, **kwargs) -> Optional[TestResult]:
         """
         Recupera resultado do cache se ainda válido
-        
+
         Args:
             mikrotik_host: Host do MikroTik
             test_type: Tipo do teste (ping, tcp, traceroute)
             target: Alvo do teste
             **kwargs: Parâmetros adicionais do teste
-            
+
         Returns:
             TestResult se encontrado e válido, None caso contrário
         """
-        cache_key = self._generate_cache_key(mikrotik_host, test_type, target, **kwargs)
-        
+        found = self.lookup(mikrotik_host, test_type, target, **kwargs)
+        return found[0] if found is not None else None
+
+    def lookup(self, mikrotik_host: str, test_type: str, target: str, allow_stale: bool = False,
+               cache_class: Optional[str] = None, **kwargs) -> Optional[Tuple[TestResult, float, bool]]:
+        """
+        Recupera resultado do cache com sua idade
+
+        Args:
+            allow_stale: Aceita entrada vencida dentro da janela de staleness
+            cache_class: Classe da política de TTL (hit rate por classe; padrão test_type)
+
+        Returns:
+            Tupla (resultado, idade em segundos, vencida) ou None
+        """
+        return self.lookup_many(mikrotik_host, test_type, [target], allow_stale=allow_stale,
+                                cache_class=cache_class, **kwargs).get(target)
+
+    def lookup_many(self, mikrotik_host: str, test_type: str, targets: List[str],
+                    allow_stale: bool = False, cache_class: Optional[str] = None,
+                    track: bool = True, **kwargs) -> Dict[str, Tuple[TestResult, float, bool]]:
+        """
+        Recupera vários targets do mesmo host/tipo/parâmetros
+
+        Os misses do L1 são buscados nas camadas externas com uma única
+        chamada por camada (MGET no Redis).
+
+        Args:
+            track: Conta hits/misses nas estatísticas (False para consultas de espera)
+
+        Returns:
+            Tupla (resultado, idade em segundos, vencida) por target encontrado
+        """
+        keys = {target: self._generate_cache_key(mikrotik_host, test_type, target, **kwargs)
+                for target in targets}
+        now = time.monotonic()
+        entries: Dict[Hashable, CacheEntry] = {}
+
         with self._lock:
-            entry = self._cache.get(cache_key)
-            
-            if entry is None:
-                self._stats['misses'] += 1
-                logger.debug(f"Cache MISS para chave: {cache_key}")
-                return None
-            
-            if entry.is_expired():
-                # Remove entrada expirada
-                del self._cache[cache_key]
-                del self._timestamps[cache_key]
-                self._stats['misses'] += 1
-                self._stats['evictions'] += 1
-                logger.debug(f"Cache EXPIRADO para chave: {cache_key}")
-                return None
-            
-            # Cache hit válido
-            self._stats['hits'] += 1
-            logger.debug(f"Cache HIT para chave: {cache_key}")
-            
-            # Marca como cache hit
-            result = entry.result
-            result.cache_hit = True
-            return result
-    
-    def set(self, mikrotik_host: str, test_type: str, target: str, result: TestResult, **kwargs):
+            for cache_key in keys.values():
+                entry = self._cache.get(cache_key)
+                if entry is None:
+                    continue
+                if entry.is_expired(now) and not (allow_stale and entry.is_servable_stale(now)):
+                    if now >= entry.stale_until:
+                        # Vencida antes da varredura: remove já
+                        self._remove(cache_key)
+                        self._stats['expirations'] += 1
+                    continue
+                # Cache hit: passa a ser a entrada mais recente
+                self._cache.move_to_end(cache_key)
+                entries[cache_key] = entry
+
+        missing = [cache_key for cache_key in keys.values() if cache_key not in entries]
+        if missing and self.backends:
+            entries.update(self._lookup_backends(missing, now, allow_stale))
+
+        if track:
+            with self._lock:
+                class_stats = self._class_stats.get(cache_class or test_type)
+                if class_stats is None:
+                    class_stats = self._class_stats[cache_class or test_type] = {
+                        'hits': 0, 'stale_hits': 0, 'misses': 0
+                    }
+                for cache_key in keys.values():
+                    entry = entries.get(cache_key)
+                    if entry is None:
+                        outcome = 'misses'
+                    else:
+                        outcome = 'stale_hits' if entry.is_expired(now) else 'hits'
+                    self._stats[outcome] += 1
+                    class_stats[outcome] += 1
+
+        found = {}
+        for target, cache_key in keys.items():
+            entry = entries.get(cache_key)
+            if entry is not None:
+                # Reconstrói fora do lock (descompressão do texto bruto)
+                result = entry.result.to_result()
+                result.cache_hit = True
+                found[target] = (result, now - entry.stored_at, entry.is_expired(now))
+        return found
+
+    def set(self, mikrotik_host: str, test_type: str, target: str, result: TestResult,
+            ttl: Optional[float] = None, **kwargs):
         """
         Armazena resultado no cache
-        
+
         Args:
             mikrotik_host: Host do MikroTik
             test_type: Tipo do teste
             target: Alvo do teste
             result: Resultado do teste para armazenar
+            ttl: TTL desta entrada em segundos (padrão CACHE_TTL)
             **kwargs: Parâmetros adicionais do teste
         """
+        self._ensure_sweeper()
         cache_key = self._generate_cache_key(mikrotik_host, test_type, target, **kwargs)
-        expiry = datetime.now() + timedelta(seconds=config.CACHE_TTL)
-        
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        stale_until = expires_at + self.max_staleness
+        entry = self._build_entry(cache_key, result, expires_at, now, stale_until)
+
+        with self._lock:
+            self._insert(cache_key, entry)
+
+        if self.backends:
+            offset = time.time() - now  # Camadas externas usam relógio de parede
+            self._write_backends(self.backends, [(cache_key, result.to_dict(), expires_at + offset,
+                                                  stale_until + offset, now + offset)])
+
+    def set_many(self, mikrotik_host: str, test_type: str, items: List[Tuple[str, TestResult]],
+                 ttl: Optional[float] = None, **kwargs):
+        """
+        Armazena vários targets do mesmo host/tipo/parâmetros
+
+        Uma única escrita por camada externa (pipeline no Redis).
+
+        Args:
+            items: Pares (target, resultado)
+        """
+        if not items:
+            return
+        self._ensure_sweeper()
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        stale_until = expires_at + self.max_staleness
+        built = [(self._generate_cache_key(mikrotik_host, test_type, target, **kwargs), result)
+                 for target, result in items]
+        entries = [(cache_key, self._build_entry(cache_key, result, expires_at, now, stale_until))
+                   for cache_key, result in built]
+
         with self._lock:
-            # Verifica se precisa fazer limpeza por tamanho
-            if len(self._cache) >= config.MAX_CACHE_SIZE:
-                self._cleanup_oldest_entries()
-            
-            # Armazena entrada
-            self._cache[cache_key] = CacheEntry(result=result, expiry=expiry)
-            self._timestamps[cache_key] = datetime.now()
-            
-            logger.debug(f"Resultado armazenado no cache: {cache_key}")
-    
+            for cache_key, entry in entries:
+                self._insert(cache_key, entry)
+
+        if self.backends:
+            offset = time.time() - now
+            self._write_backends(self.backends, [
+                (cache_key, result.to_dict(), expires_at + offset, stale_until + offset, now + offset)
+                for cache_key, result in built
+            ])
+
+    def acquire_locks(self, mikrotik_host: str, test_type: str, targets: List[str],
+                      ttl: float, **kwargs) -> Dict[str, str]:
+        """
+        Trava os targets entre nós (single-flight distribuído)
+
+        Sem camada com locks (Redis) todos os targets são concedidos.
+
+        Returns:
+            Token por target travado; os ausentes estão sendo executados por outro nó
+        """
+        if self._lock_backend is None:
+            return {target: '' for target in targets}
+        keys = {self._generate_cache_key(mikrotik_host, test_type, target, **kwargs): target
+                for target in targets}
+        tokens = self._lock_backend.acquire_locks(list(keys), ttl)
+        return {keys[cache_key]: token for cache_key, token in tokens.items()}
+
+    def release_locks(self, mikrotik_host: str, test_type: str, tokens: Dict[str, str], **kwargs):
+        """Libera os targets travados por acquire_locks"""
+        if self._lock_backend is None or not tokens:
+            return
+        self._lock_backend.release_locks({
+            self._generate_cache_key(mikrotik_host, test_type, target, **kwargs): token
+            for target, token in tokens.items()
+        })
+
     def clear(self) -> int:
         """
         Limpa todo o cache
-        
+
         Returns:
             Número de entradas removidas
         """
         with self._lock:
             count = len(self._cache)
             self._cache.clear()
-            self._timestamps.clear()
-            logger.info(f"Cache limpo: {count} entradas removidas")
-            return count
-    
+            self._ticks.clear()
+            self._wheel.clear()
+            self._bytes = 0
+
+        for backend in self.backends:
+            try:
+                count = max(count, backend.clear())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Erro ao limpar o cache {backend.name}: {e}")
+
+        # Snapshot vazio não é gravado: remove o antigo para as entradas não voltarem
+        if self.owns_snapshot() and self.snapshot_file and os.path.exists(self.snapshot_file):
+            try:
+                os.unlink(self.snapshot_file)
+            except OSError as e:
+                logger.warning(f"Erro ao remover snapshot {self.snapshot_file}: {e}")
+        logger.info(f"Cache limpo: {count} entradas removidas")
+        return count
+
     def cleanup_expired(self) -> int:
         """
-        Remove entradas expiradas do cache
-        
+        Remove entradas expiradas do cache (baldes vencidos da roda de tempo)
+
         Returns:
             Número de entradas removidas
         """
+        now = time.monotonic()
+        removed = 0
+
         with self._lock:
-            expired_keys = []
-            now = datetime.now()
-            
-            for key, entry in self._cache.items():
-                if entry.expiry <= now:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
+            for key in self._wheel.advance(now):
+                entry = self._cache.get(key)
+                if entry is None:
+                    continue
+                if now < entry.stale_until:
+                    # Expira ainda dentro do tick atual: volta para a roda
+                    self._ticks[key] = self._wheel.add(key, entry.stale_until)
+                    continue
                 del self._cache[key]
-                del self._timestamps[key]
-            
-            if expired_keys:
+                del self._ticks[key]
+                self._bytes -= entry.size
+                removed += 1
+
+            if removed:
                 self._stats['cleanups'] += 1
-                self._stats['evictions'] += len(expired_keys)
-                logger.debug(f"Limpeza automática: {len(expired_keys)} entradas expiradas removidas")
-            
-            return len(expired_keys)
-    
+                self._stats['expirations'] += removed
+                logger.debug(f"Limpeza automática: {removed} entradas expiradas removidas")
+
+        return removed
+
     def get_stats(self) -> Dict:
         """Retorna estatísticas do cache"""
         with self._lock:
-            total_requests = self._stats['hits'] + self._stats['misses']
-            hit_rate = (self._stats['hits'] / total_requests * 100) if total_requests > 0 else 0
-            
+            hit_rate = self._hit_rate(self._stats)
+
             return {
                 'size': len(self._cache),
-                'max_size': config.MAX_CACHE_SIZE,
-                'ttl_seconds': config.CACHE_TTL,
+                'max_size': self.max_size,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'oversized_rejected': self._stats['oversized_rejected'],
+                'ttl_seconds': self.ttl,
+                'max_staleness_seconds': self.max_staleness,
                 'hits': self._stats['hits'],
+                'stale_hits': self._stats['stale_hits'],
                 'misses': self._stats['misses'],
-                'hit_rate_percent': round(hit_rate, 2),
+                'hit_rate_percent': hit_rate,
                 'evictions': self._stats['evictions'],
-                'cleanups': self._stats['cleanups']
+                'expirations': self._stats['expirations'],
+                'cleanups': self._stats['cleanups'],
+                'snapshots_saved': self._stats['snapshots_saved'],
+                'snapshot_entries_restored': self._stats['snapshot_entries_restored'],
+                'wheel_buckets': len(self._wheel),
+                'backends': {
+                    backend.name: dict(backend.get_stats(), promoted_hits=self._backend_hits[backend.name])
+                    for backend in self.backends
+                },
+                'classes': {
+                    name: dict(counts, hit_rate_percent=self._hit_rate(counts))
+                    for name, counts in self._class_stats.items()
+                }
             }
-    
+
     def get_entries_info(self) -> List[Dict]:
         """Retorna informações detalhadas das entradas do cache"""
         with self._lock:
+            now = time.monotonic()
             entries = []
-            now = datetime.now()
-            
+
+            # Do menos para o mais usado recentemente
             for key, entry in self._cache.items():
-                age = (now - self._timestamps.get(key, now)).total_seconds()
-                expires_in = (entry.expiry - now).total_seconds()
-                
                 entries.append({
-                    'key': key,
+                    'key': ':'.join(str(part) for part in key[:3]),
                     'test_type': entry.result.test_type,
                     'mikrotik_host': entry.result.mikrotik_host,
                     'target': entry.result.target,
-                    'age_seconds': round(age, 2),
-                    'expires_in_seconds': max(0, round(expires_in, 2)),
+                    'age_seconds': round(now - entry.stored_at, 2),
+                    'expires_in_seconds': max(0, round(entry.expires_at - now, 2)),
+                    'size_bytes': entry.size,
                     'timestamp': entry.result.timestamp
                 })
-            
-            return sorted(entries, key=lambda x: x['age_seconds'], reverse=True)
-    
-    def _generate_cache_key(self, mikrotik_host: str, test_type: str, target: str, **kwargs) -> str:
+
+            return entries
+
+    def owns_snapshot(self) -> bool:
+        """
+        Este processo responde pelo snapshot (foi ele que chamou restore_snapshot)
+
+        O master do gunicorn (preload_app) e os workers no modo broker nunca
+        alimentam o cache: se gravassem, sobrescreveriam o snapshot real com um vazio.
+        """
+        return self._snapshot_pid == os.getpid()
+
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Grava as entradas ainda servíveis em disco (CACHE_SNAPSHOT_FILE)
+
+        Só grava no processo dono do snapshot (owns_snapshot) e nunca substitui
+        um snapshot existente por um vazio.
+
+        Returns:
+            Número de entradas gravadas
+        """
+        path = path or self.snapshot_file
+        if not path or not self.owns_snapshot():
+            return 0
+
+        now = time.monotonic()
+        offset = time.time() - now  # Converte o relógio monotônico para relógio de parede
+
+        with self._lock:
+            items = [(key, entry) for key, entry in self._cache.items() if entry.stale_until > now]
+
+        # Do menos para o mais usado recentemente: a recarga preserva a ordem LRU
+        entries = [{
+            'key': key,
+            'result': entry.result.to_result().to_dict(),
+            'expires_at': entry.expires_at + offset,
+            'stale_until': entry.stale_until + offset,
+            'stored_at': entry.stored_at + offset
+        } for key, entry in items]
+
+        if not entries and os.path.exists(path):
+            logger.debug(f"Cache vazio: snapshot {path} mantido")
+            return 0
+
+        try:
+            size = write_snapshot(path, entries)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Erro ao gravar snapshot do cache em {path}: {e}")
+            return 0
+
+        with self._lock:
+            self._stats['snapshots_saved'] += 1
+        logger.debug(f"Snapshot do cache: {len(entries)} entradas ({size} bytes) em {path}")
+        return len(entries)
+
+    def restore_snapshot(self, path: Optional[str] = None, time_budget: Optional[float] = None) -> int:
+        """
+        Recarrega do snapshot as entradas que ainda não expiraram
+
+        Args:
+            path: Arquivo do snapshot (padrão CACHE_SNAPSHOT_FILE)
+            time_budget: Tempo máximo de carga em segundos (padrão CACHE_SNAPSHOT_LOAD_TIMEOUT)
+
+        Returns:
+            Número de entradas recarregadas
+        """
+        path = path or self.snapshot_file
+        if not path:
+            return 0
+        self._snapshot_pid = os.getpid()
+        if not os.path.exists(path):
+            return 0
+
+        budget = config.CACHE_SNAPSHOT_LOAD_TIMEOUT if time_budget is None else time_budget
+        start = time.monotonic()
+        offset = time.time() - start
+        restored = 0
+
+        try:
+            for raw in read_snapshot(path):
+                now = time.monotonic()
+                if now - start > budget:
+                    logger.warning(f"Carga do snapshot interrompida após {budget}s ({restored} entradas)")
+                    break
+
+                stale_until = raw['stale_until'] - offset
+                if stale_until <= now:
+                    continue
+
+                entry = self._build_entry(raw['key'], TestResult(**raw['result']),
+                                          raw['expires_at'] - offset, raw['stored_at'] - offset,
+                                          stale_until)
+                with self._lock:
+                    self._insert(raw['key'], entry)
+                restored += 1
+        except (SnapshotError, KeyError, TypeError) as e:
+            logger.warning(f"Snapshot do cache ignorado: {e}")
+
+        with self._lock:
+            self._stats['snapshot_entries_restored'] += restored
+        if restored:
+            self._ensure_sweeper()
+            logger.info(f"Cache restaurado do snapshot {path}: {restored} entradas "
+                        f"em {time.monotonic() - start:.3f}s")
+        return restored
+
+    def stop(self):
+        """Interrompe a varredura em background"""
+        self._stop.set()
+        self._sweeper_pid = None
+
+    @staticmethod
+    def _hit_rate(counts: Dict[str, int]) -> float:
+        """Hit rate (%) contando hits vencidos como acertos"""
+        hits = counts['hits'] + counts['stale_hits']
+        total_requests = hits + counts['misses']
+        return round(hits / total_requests * 100, 2) if total_requests > 0 else 0
+
+    def _generate_cache_key(self, mikrotik_host: str, test_type: str, target: str,
+                            **kwargs) -> Tuple[Hashable, ...]:
         """Gera chave única para o cache"""
-        import hashlib
-        import json
-        
-        key_data = {
-            'host': mikrotik_host,
-            'type': test_type,
-            'target': target,
-            **kwargs
-        }
-        
-        key_string = json.dumps(key_data, sort_keys=True)
-        return hashlib.md5(key_string.encode()).hexdigest()
-    
-    def _cleanup_oldest_entries(self):
-        """Remove as entradas mais antigas quando cache atinge tamanho máximo"""
-        # Remove 20% das entradas mais antigas
-        entries_to_remove = max(1, len(self._cache) // 5)
-        
-        # Ordena por timestamp (mais antigo primeiro)
-        sorted_entries = sorted(
-            self._timestamps.items(),
-            key=lambda x: x[1]
-        )
-        
-        for key, _ in sorted_entries[:entries_to_remove]:
-            if key in self._cache:
-                del self._cache[key]
-            if key in self._timestamps:
-                del self._timestamps[key]
-        
-        self._stats['evictions'] += entries_to_remove
-        logger.debug(f"Limpeza por tamanho: {entries_to_remove} entradas antigas removidas")
+        if not kwargs:
+            return (mikrotik_host, test_type, target)
+        return (mikrotik_host, test_type, target, _freeze(kwargs))
+
+    def _lookup_backends(self, cache_keys: List[Hashable], now: float,
+                         allow_stale: bool) -> Dict[Hashable, CacheEntry]:
+        """
+        Busca os misses do L1 camada a camada e promove o que encontrar
+
+        A entrada promovida mantém a expiração de quem gravou; vai para o L1
+        e para as camadas acima daquela em que foi encontrada.
+        """
+        offset = time.time() - now
+        found: Dict[Hashable, CacheEntry] = {}
+        missing = cache_keys
+
+        for index, backend in enumerate(self.backends):
+            try:
+                records = backend.get_many(missing)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Erro ao ler o cache {backend.name}: {e}")
+                continue
+
+            promoted: List[BackendItem] = []
+            for cache_key, (raw, expires_at, stale_until, stored_at) in records.items():
+                if now + offset >= expires_at and not allow_stale:
+                    continue
+                try:
+                    found[cache_key] = self._build_entry(cache_key, TestResult(**raw), expires_at - offset,
+                                                         stored_at - offset, stale_until - offset)
+                except TypeError:
+                    continue
+                promoted.append((cache_key, raw, expires_at, stale_until, stored_at))
+
+            if promoted:
+                with self._lock:
+                    for item in promoted:
+                        self._insert(item[0], found[item[0]])
+                    self._backend_hits[backend.name] += len(promoted)
+                self._write_backends(self.backends[:index], promoted)
+                missing = [cache_key for cache_key in missing if cache_key not in found]
+            if not missing:
+                break
+
+        return found
+
+    @staticmethod
+    def _write_backends(backends: List[CacheBackend], items: List[BackendItem]):
+        """Grava nas camadas externas (falha de uma camada não afeta o L1)"""
+        for backend in backends:
+            try:
+                backend.set_many(items)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Erro ao gravar no cache {backend.name}: {e}")
+
+    def _build_entry(self, cache_key: Hashable, result: TestResult, expires_at: float,
+                     stored_at: float, stale_until: float) -> CacheEntry:
+        """Converte o resultado para a forma compacta e mede a entrada (fora do lock)"""
+        compact = CompactResult(result, self.compress_min)
+        return CacheEntry(result=compact, expires_at=expires_at, stored_at=stored_at,
+                          stale_until=stale_until, size=_entry_size(cache_key, compact))
+
+    def _insert(self, cache_key: Hashable, entry: CacheEntry):
+        """Insere/substitui a entrada como a mais recente (lock já adquirido)"""
+        if cache_key in self._cache:
+            self._remove(cache_key)
+
+        if 0 < self.max_bytes < entry.size:
+            # Sozinha já estoura o orçamento: não vale esvaziar o cache por ela
+            self._stats['oversized_rejected'] += 1
+            return
+
+        # Remove as menos usadas recentemente até caber a nova entrada
+        while self._cache and (
+            len(self._cache) >= self.max_size > 0
+            or 0 < self.max_bytes < self._bytes + entry.size
+        ):
+            self._remove(next(iter(self._cache)))
+            self._stats['evictions'] += 1
+
+        self._cache[cache_key] = entry
+        self._ticks[cache_key] = self._wheel.add(cache_key, entry.stale_until)
+        self._bytes += entry.size
+
+    def _remove(self, cache_key: Hashable):
+        """Remove a entrada do dicionário e da roda (lock já adquirido)"""
+        self._bytes -= self._cache.pop(cache_key).size
+        self._wheel.discard(cache_key, self._ticks.pop(cache_key))
+
+    def _ensure_sweeper(self):
+        """Inicia a varredura neste processo (threads não sobrevivem ao fork)"""
+        if self._sweeper_pid == os.getpid() or self.cleanup_interval <= 0:
+            return
+
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._sweeper_pid = os.getpid()
+
+        # Fora do lock: no worker gevent ele é um lock real (criado no master) e start() cede o greenlet
+        threading.Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True).start()
+
+    def _sweep_loop(self):
+        """Varre os baldes vencidos a cada cleanup_interval e grava snapshots periódicos"""
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while not self._stop.wait(self.cleanup_interval):
+            try:
+                self.cleanup_expired()
+            except Exception as e:
+                logger.error(f"Erro na varredura do cache: {e}")
+
+            if self.snapshot_file and self.snapshot_interval > 0 and time.monotonic() >= next_snapshot:
+                self.save_snapshot()
+                next_snapshot = time.monotonic() + self.snapshot_interval
+
+
+def _build_backends() -> List[CacheBackend]:
+    """Camadas externas habilitadas na configuração (memória compartilhada, depois Redis)"""
+    backends: List[CacheBackend] = []
+    if config.CACHE_SHARED_FILE:
+        backends.append(SharedMemoryCache(
+            config.CACHE_SHARED_FILE,
+            slots=config.CACHE_SHARED_SLOTS,
+            slot_size=config.CACHE_SHARED_SLOT_SIZE
+        ))
+    if config.REDIS_ENABLED:
+        try:
+            backends.append(RedisCacheBackend(
+                host=config.REDIS_HOST,
+                port=config.REDIS_PORT,
+                db=config.REDIS_DB,
+                password=config.REDIS_PASSWORD,
+                prefix=config.REDIS_KEY_PREFIX,
+                socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+                retry_interval=config.REDIS_RETRY_INTERVAL
+            ))
+        except ImportError:
+            logger.error("REDIS_ENABLED exige o pacote redis; cache Redis desativado")
+    return backends
 
 
 # Instância global do cache
-cache = SentinelCache()
\ No newline at end of file
+cache = SentinelCache(backends=_build_backends())
+
+
+if __name__ == "__main__":
+    # Benchmark: custo de get/set deve ficar estável de 1k a 1M entradas
+    print("=== Benchmark SentinelCache (get/set por operação) ===")
+
+    sample = TestResult(status='success', test_type='ping', timestamp=datetime.now().isoformat(),
+                        cache_hit=False, cache_ttl=config.CACHE_TTL, mikrotik_host='10.0.0.1',
+                        target='8.8.8.8', results={})
+    operations = 100000
+
+    for size in (1000, 10000, 100000, 1000000):
+        bench = SentinelCache(max_size=size, ttl=3600, cleanup_interval=0, max_bytes=0)
+        for i in range(size):
+            bench.set('10.0.0.1', 'ping', f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}", sample,
+                      port=8728, count=4)
+
+        targets = [f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}" for i in range(0, size, max(1, size // operations))]
+        targets = (targets * (operations // len(targets) + 1))[:operations]
+
+        start = time.perf_counter()
+        for target in targets:
+            bench.get('10.0.0.1', 'ping', target, port=8728, count=4)
+        get_ns = (time.perf_counter() - start) / operations * 1e9
+
+        # Cache cheio: cada set também remove a entrada LRU
+        start = time.perf_counter()
+        for i in range(operations):
+            bench.set('10.0.0.2', 'ping', str(i), sample, port=8728, count=4)
+        set_ns = (time.perf_counter() - start) / operations * 1e9
+
+        print(f"{size:>9} entradas: get {get_ns:7.0f} ns/op | set {set_ns:7.0f} ns/op")
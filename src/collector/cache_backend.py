@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Interface das camadas externas do SentinelCache
+O dicionário do processo (L1) fica em cache.py; as camadas abaixo dele
+implementam CacheBackend:
+
+    shared_cache.SharedMemoryCache - memória compartilhada entre os workers do nó
+    redis_cache.RedisCacheBackend  - Redis compartilhado entre os nós do collector
+
+Cada registro é a tupla (resultado, expires_at, stale_until, stored_at), com o
+resultado em dict (TestResult.to_dict) e os instantes em relógio de parede
+(time.time), que é comum a processos e, com NTP, a máquinas diferentes.
+"""
+
+import json
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# (resultado, expires_at, stale_until, stored_at)
+BackendRecord = Tuple[Dict[str, Any], float, float, float]
+# (chave, resultado, expires_at, stale_until, stored_at)
+BackendItem = Tuple[Hashable, Dict[str, Any], float, float, float]
+
+
+def encode_key(cache_key: Hashable) -> bytes:
+    """Serialização estável da chave (hash() do Python muda entre processos)"""
+    return json.dumps(cache_key, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class CacheBackend:
+    """
+    Camada de cache abaixo do L1
+
+    get_many/set_many têm implementação padrão item a item; backends remotos
+    sobrescrevem para usar uma única ida e volta. Locks distribuídos são
+    opcionais (supports_locks). Backends com I/O de rede (remote) não são
+    chamados diretamente do event loop.
+    """
+
+    name = 'backend'
+    supports_locks = False
+    remote = False
+
+    def get(self, cache_key: Hashable) -> Optional[BackendRecord]:
+        """Registro ainda servível (antes de stale_until) ou None"""
+        raise NotImplementedError
+
+    def set(self, cache_key: Hashable, result: Dict[str, Any], expires_at: float,
+            stale_until: float, stored_at: float) -> bool:
+        """Grava o registro; False se não foi armazenado"""
+        raise NotImplementedError
+
+    def get_many(self, cache_keys: Iterable[Hashable]) -> Dict[Hashable, BackendRecord]:
+        """Registros encontrados, por chave"""
+        found = {}
+        for cache_key in cache_keys:
+            record = self.get(cache_key)
+            if record is not None:
+                found[cache_key] = record
+        return found
+
+    def set_many(self, items: List[BackendItem]) -> int:
+        """Grava vários registros; retorna quantos foram armazenados"""
+        return sum(1 for item in items if self.set(*item))
+
+    def delete(self, cache_key: Hashable):
+        raise NotImplementedError
+
+    def clear(self) -> int:
+        raise NotImplementedError
+
+    def acquire_locks(self, cache_keys: List[Hashable], ttl: float) -> Dict[Hashable, str]:
+        """
+        Tenta travar as chaves (single-flight entre nós)
+
+        Returns:
+            Token por chave travada; chaves ausentes estão com outro nó
+        """
+        return {cache_key: '' for cache_key in cache_keys}
+
+    def release_locks(self, tokens: Dict[Hashable, str]):
+        """Libera as chaves travadas por acquire_locks"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
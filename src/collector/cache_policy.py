@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Política de TTL por classe de comando
+Define quanto tempo cada tipo de resultado fica em cache
+
+Dados quase estáticos (identity, endereços) ficam horas em cache; rotas por
+minutos; pings por segundos. Formato (YAML ou JSON, arquivo em
+CACHE_TTL_POLICY_FILE ou JSON inline em CACHE_TTL_POLICY):
+
+    test_types:
+      ping: 15
+      traceroute: 60
+    commands:                      # prefixo do caminho de menu -> TTL
+      /system/identity: 3600
+      /ip/route: 120
+      /system/resource/print: 10
+      /interface/monitor-traffic: 0  # 0 = nunca em cache
+
+Comandos usam o prefixo de caminho mais longo que casar; comandos sem regra
+não são cacheados.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-cache-policy')
+
+# TTLs padrão para os menus de CACHE_COMMANDS (demais usam CACHE_TTL)
+DEFAULT_COMMAND_TTLS = {
+    '/system/identity/print': 3600,
+    '/interface/print': 300,
+    '/ip/address/print': 600,
+    '/ip/route/print': 120,
+    '/system/resource/print': 10
+}
+
+
+class CacheTTLPolicy:
+    """Tabela de TTL por tipo de teste e por caminho de comando"""
+
+    def __init__(self, test_types: Optional[Dict[str, float]] = None,
+                 commands: Optional[Dict[str, float]] = None):
+        self.test_types = {'ping': float(config.CACHE_TTL), 'traceroute': 60.0}
+        self.test_types.update({name: float(ttl) for name, ttl in (test_types or {}).items()})
+        self.commands = {self._normalize(path): float(ttl) for path, ttl in (commands or {}).items()}
+        # Maior prefixo primeiro
+        self._prefixes = sorted(self.commands, key=len, reverse=True)
+        self._resolved: Dict[Tuple[str, Optional[str]], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return '/' + path.strip().strip('/')
+
+    def resolve(self, test_type: str, path: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Classe de cache e TTL de um resultado
+
+        Args:
+            test_type: ping, traceroute ou command
+            path: Caminho de menu (apenas para command)
+
+        Returns:
+            Tupla (classe, ttl em segundos); ttl 0 indica que não deve ir ao cache
+        """
+        lookup = (test_type, path)
+        resolved = self._resolved.get(lookup)
+        if resolved is not None:
+            return resolved
+
+        if test_type == 'command' and path:
+            normalized = self._normalize(path)
+            resolved = (normalized, 0.0)
+            for prefix in self._prefixes:
+                if normalized == prefix or normalized.startswith(prefix + '/'):
+                    resolved = (prefix, self.commands[prefix])
+                    break
+        else:
+            resolved = (test_type, self.test_types.get(test_type, float(config.CACHE_TTL)))
+
+        with self._lock:
+            if len(self._resolved) < 4096:  # Caminhos arbitrários não crescem sem limite
+                self._resolved[lookup] = resolved
+        return resolved
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tabela efetiva de TTLs"""
+        return {
+            'test_types': dict(self.test_types),
+            'commands': {prefix: self.commands[prefix] for prefix in sorted(self.commands)}
+        }
+
+
+def _default_commands() -> Dict[str, float]:
+    return {path: DEFAULT_COMMAND_TTLS.get(path, config.CACHE_TTL) for path in config.CACHE_COMMANDS}
+
+
+def load_ttl_policy(path: str = '', inline: str = '') -> CacheTTLPolicy:
+    """
+    Carrega a política de TTL
+
+    Args:
+        path: Arquivo .yaml/.yml ou .json
+        inline: JSON com o mesmo formato (aplicado por cima do arquivo)
+
+    Returns:
+        Política com os padrões de CACHE_COMMANDS sobrescritos pelo que foi informado
+    """
+    test_types: Dict[str, float] = {}
+    commands = _default_commands()
+
+    sources = []
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith(('.yaml', '.yml')):
+                import yaml
+                sources.append(yaml.safe_load(f) or {})
+            else:
+                sources.append(json.load(f))
+    if inline:
+        sources.append(json.loads(inline))
+
+    for data in sources:
+        if not isinstance(data, dict):
+            raise ValueError("Política de TTL deve ser um objeto com 'test_types' e/ou 'commands'")
+        test_types.update(data.get('test_types') or {})
+        commands.update(data.get('commands') or {})
+
+    return CacheTTLPolicy(test_types, commands)
+
+
+def _build_policy() -> CacheTTLPolicy:
+    """Política do ambiente; configuração inválida cai para os padrões"""
+    try:
+        return load_ttl_policy(config.CACHE_TTL_POLICY_FILE, config.CACHE_TTL_POLICY)
+    except Exception as e:
+        logger.error(f"Política de TTL inválida, usando padrões: {e}")
+        return CacheTTLPolicy(commands=_default_commands())
+
+
+# Política global de TTL
+ttl_policy = _build_policy()
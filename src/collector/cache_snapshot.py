@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Snapshots persistentes do cache
+Permite que workers reciclados e deploys reiniciem com o cache aquecido
+
+Formato do arquivo:
+    magic 'STCS' | versão (1 byte) | crc32 do payload (4 bytes) | payload zlib(JSON)
+
+O payload guarda, por entrada, a chave, o TestResult e os instantes de
+expiração em relógio de parede (time.time), já que o relógio monotônico não
+sobrevive a um reinício. Arquivo com checksum inválido é descartado inteiro.
+"""
+
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger('sentinel-cache-snapshot')
+
+MAGIC = b'STCS'
+VERSION = 1
+_HEADER = struct.Struct('>4sBI')
+
+
+class SnapshotError(Exception):
+    """Snapshot ausente, corrompido ou de versão desconhecida"""
+
+
+def _thaw(value: Any) -> Any:
+    """Listas do JSON voltam a ser tuplas (chaves do cache são hashable)"""
+    if isinstance(value, list):
+        return tuple(_thaw(v) for v in value)
+    return value
+
+
+def write_snapshot(path: str, entries: List[Dict[str, Any]]) -> int:
+    """
+    Grava o snapshot de forma atômica
+
+    Args:
+        path: Arquivo de destino
+        entries: Dicts com key, result, expires_at, stale_until e stored_at (relógio de parede)
+
+    Returns:
+        Tamanho do arquivo em bytes
+    """
+    payload = zlib.compress(
+        json.dumps({'saved_at': time.time(), 'entries': entries},
+                   separators=(',', ':'), default=str).encode('utf-8'),
+        level=1
+    )
+    data = _HEADER.pack(MAGIC, VERSION, zlib.crc32(payload)) + payload
+
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.unlink(tmp_file)
+    return len(data)
+
+
+def read_snapshot(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê e valida o snapshot
+
+    Raises:
+        SnapshotError: Arquivo ausente, truncado, com checksum inválido ou versão desconhecida
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise SnapshotError(f"Snapshot {path} indisponível: {e}")
+
+    if len(data) < _HEADER.size:
+        raise SnapshotError(f"Snapshot {path} truncado")
+
+    magic, version, checksum = _HEADER.unpack_from(data)
+    payload = data[_HEADER.size:]
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError(f"Snapshot {path} com formato desconhecido")
+    if zlib.crc32(payload) != checksum:
+        raise SnapshotError(f"Snapshot {path} com checksum inválido")
+
+    try:
+        content = json.loads(zlib.decompress(payload))
+    except (zlib.error, ValueError) as e:
+        raise SnapshotError(f"Snapshot {path} ilegível: {e}")
+
+    for entry in content.get('entries', []):
+        entry['key'] = _thaw(entry['key'])
+        yield entry
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Circuit Breaker por roteador
+Evita que requisições para um MikroTik fora do ar esperem o timeout completo
+
+Estados:
+    closed    - tráfego normal; falhas consecutivas são contadas
+    open      - falha imediata com resultado "roteador inacessível" em cache
+    half_open - após o backoff, uma única requisição de teste é liberada
+"""
+
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sentinel_config import config
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def jittered_backoff(attempt: int, base: float, cap: float) -> float:
+    """Backoff exponencial com jitter (metade fixa + metade aleatória)"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitOpenError(Exception):
+    """Requisição rejeitada porque o circuit breaker do roteador está aberto"""
+
+    def __init__(self, router: str, retry_in: float, result: Dict[str, Any]):
+        super().__init__(
+            f"Roteador {router} inacessível (circuit breaker aberto, "
+            f"nova tentativa em {retry_in:.1f}s)"
+        )
+        self.router = router
+        self.retry_in = retry_in
+        self.result = result
+
+
+class RetryBudget:
+    """
+    Orçamento de retentativas (token bucket)
+
+    Cada requisição deposita 'ratio' fichas e cada retentativa consome uma,
+    limitando as retentativas a uma fração do tráfego real.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class CircuitBreaker:
+    """Circuit breaker de um roteador (host:porta)"""
+
+    def __init__(self, router: str, failure_threshold: int = 5, base_backoff: float = 1.0,
+                 max_backoff: float = 60.0, probe_timeout: float = 30.0,
+                 retry_budget_ratio: float = 0.2,
+                 on_recover: Optional[Callable[[str], None]] = None):
+        self.router = router
+        self.on_recover = on_recover  # Chamado no primeiro sucesso após falhas
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.probe_timeout = probe_timeout
+        self.retry_budget = RetryBudget(retry_budget_ratio)
+        self.lock = threading.Lock()
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0  # Aberturas seguidas sem sucesso (expoente do backoff)
+        self.open_until = 0.0
+        self.probe_started = 0.0
+        self.last_error = ''
+        self._unreachable_result: Optional[Dict[str, Any]] = None
+
+        self.stats = {
+            'failures': 0,
+            'successes': 0,
+            'rejected': 0,
+            'opened': 0,
+            'retries': 0,
+            'retries_denied': 0
+        }
+
+    def allow_request(self) -> bool:
+        """Verifica se a requisição pode seguir (libera uma sonda em half_open)"""
+        with self.lock:
+            self.retry_budget.deposit()
+            now = time.time()
+
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and now >= self.open_until:
+                self.state = HALF_OPEN
+                self.probe_started = now
+                return True
+
+            if self.state == HALF_OPEN and now - self.probe_started > self.probe_timeout:
+                # Sonda anterior nunca reportou resultado: libera outra
+                self.probe_started = now
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    def check(self):
+        """Como allow_request, mas levanta CircuitOpenError quando rejeitada"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.router, self.retry_in(), self.unreachable_result())
+
+    def try_retry(self) -> bool:
+        """Consome o orçamento para uma retentativa de conexão"""
+        with self.lock:
+            if self.state != CLOSED or not self.retry_budget.withdraw():
+                self.stats['retries_denied'] += 1
+                return False
+            self.stats['retries'] += 1
+            return True
+
+    def record_success(self):
+        """Sucesso de conexão/comando: fecha o circuito"""
+        with self.lock:
+            self.stats['successes'] += 1
+            recovered = self.consecutive_failures > 0 or self.state != CLOSED
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.open_count = 0
+                self._unreachable_result = None
+        
+        if recovered and self.on_recover is not None:
+            self.on_recover(self.router)
+
+    def record_failure(self, error: Any = None):
+        """Falha de conexão/transporte: abre o circuito no limite ou se a sonda falhar"""
+        with self.lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            if error is not None:
+                self.last_error = str(error)
+
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def _open(self):
+        """Abre o circuito com backoff exponencial e jitter (com lock adquirido)"""
+        delay = jittered_backoff(self.open_count, self.base_backoff, self.max_backoff)
+        self.state = OPEN
+        self.open_until = time.time() + delay
+        self.open_count += 1
+        self.stats['opened'] += 1
+        self._unreachable_result = {
+            'status': 'error',
+            'error': f"Roteador {self.router} inacessível: {self.last_error or 'falhas consecutivas'}",
+            'error_type': 'router_unreachable',
+            'circuit_state': OPEN,
+            'opened_at': datetime.now().isoformat(),
+            'execution_time_seconds': 0
+        }
+
+    def retry_in(self) -> float:
+        """Segundos até a próxima sonda"""
+        return max(0.0, self.open_until - time.time())
+
+    def unreachable_result(self) -> Dict[str, Any]:
+        """Resultado "roteador inacessível" gerado na abertura do circuito"""
+        with self.lock:
+            result = dict(self._unreachable_result or {
+                'status': 'error',
+                'error': f"Roteador {self.router} inacessível",
+                'error_type': 'router_unreachable',
+                'circuit_state': self.state,
+                'execution_time_seconds': 0
+            })
+        result['retry_in_seconds'] = round(self.retry_in(), 2)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado e contadores do breaker"""
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in_seconds': round(max(0.0, self.open_until - time.time()), 2)
+                if self.state == OPEN else 0,
+                'retry_budget_tokens': round(self.retry_budget.tokens, 2),
+                'last_error': self.last_error,
+                **self.stats
+            }
+
+
+class CircuitBreakerRegistry:
+    """Breakers por roteador criados sob demanda"""
+
+    def __init__(self, failure_threshold: int = 5, base_backoff: float = 1.0,
+                 max_backoff: float = 60.0, probe_timeout: float = 30.0,
+                 retry_budget_ratio: float = 0.2):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.probe_timeout = probe_timeout
+        self.retry_budget_ratio = retry_budget_ratio
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+        self._recovery_listeners: List[Callable[[str], None]] = []
+
+    def add_recovery_listener(self, listener: Callable[[str], None]):
+        """Registra callback(router) para quando um roteador volta a responder"""
+        self._recovery_listeners.append(listener)
+
+    def _notify_recovery(self, router: str):
+        for listener in self._recovery_listeners:
+            listener(router)
+
+    def get(self, host: str, port: int) -> CircuitBreaker:
+        """Obtém (ou cria) o breaker de host:porta"""
+        router = f"{host}:{port}"
+        breaker = self.breakers.get(router)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.get(router)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        router, self.failure_threshold, self.base_backoff,
+                        self.max_backoff, self.probe_timeout, self.retry_budget_ratio,
+                        on_recover=self._notify_recovery
+                    )
+                    self.breakers[router] = breaker
+        return breaker
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de todos os breakers"""
+        with self.lock:
+            breakers = list(self.breakers.items())
+
+        routers = {router: breaker.get_stats() for router, breaker in breakers}
+        return {
+            'open': sum(1 for stats in routers.values() if stats['state'] == OPEN),
+            'half_open': sum(1 for stats in routers.values() if stats['state'] == HALF_OPEN),
+            'failure_threshold': self.failure_threshold,
+            'routers': routers
+        }
+
+
+# Instância global dos circuit breakers
+circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    base_backoff=config.CIRCUIT_BREAKER_BASE_BACKOFF,
+    max_backoff=config.CIRCUIT_BREAKER_MAX_BACKOFF,
+    probe_timeout=config.MIKROTIK_API_TIMEOUT,
+    retry_budget_ratio=config.RETRY_BUDGET_RATIO
+)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Broker de conexões RouterOS
+Um único processo por nó é dono de todas as sessões API com os roteadores e
+do cache de probes; os workers do gunicorn (ou do ASGI) encaminham as
+operações por um socket Unix (BROKER_SOCKET).
+
+Sem o broker, cada worker tem o próprio pool: 12 workers podem abrir
+12 x MAX_CONNECTIONS_PER_HOST sessões no mesmo roteador (que limita as
+sessões API), e cada reciclagem de worker derruba o pool dele. Com o broker
+existe um conjunto de sessões por roteador por nó, que sobrevive às
+reciclagens.
+
+Protocolo (um socket por worker e event loop, requisições multiplexadas):
+    quadro = tamanho (u32) | id da requisição (u32) | flags (u8) | payload
+    flags bit 0 = payload comprimido (zlib)
+    requisição: {"m": método, "a": argumentos}
+    resposta:   {"r": resultado} ou {"e": mensagem de erro}
+
+Execução:
+    python3 connection_broker.py      (ou BROKER_AUTOSTART pelo master do gunicorn)
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import signal
+import struct
+import sys
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-broker')
+
+_FRAME = struct.Struct('>IIB')
+_COMPRESSED = 0x01
+_COMPRESS_MIN = 4096
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Operações expostas: (assíncrona, bloqueante). Bloqueantes vão para o executor do conector
+METHODS: Dict[str, Tuple[bool, bool]] = {
+    'execute_batch_ping': (True, False),
+    'execute_single_command': (True, False),
+    'execute_batch_commands': (True, False),
+    'execute_multiple_hosts': (True, False),
+    'test_connection': (False, True),
+    'get_stats': (False, False),
+    'clear_cache': (False, False),
+}
+
+
+class BrokerError(Exception):
+    """Erro devolvido pelo broker ou falha de comunicação com ele"""
+
+
+def encode_frame(request_id: int, message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+    flags = 0
+    if len(payload) >= _COMPRESS_MIN:
+        payload = zlib.compress(payload, 1)
+        flags |= _COMPRESSED
+    return _FRAME.pack(len(payload), request_id, flags) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any]]:
+    """Lê um quadro completo (IncompleteReadError no fim da conexão)"""
+    length, request_id, flags = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if length > MAX_FRAME_SIZE:
+        raise BrokerError(f"Quadro de {length} bytes excede o limite")
+    payload = await reader.readexactly(length)
+    if flags & _COMPRESSED:
+        payload = zlib.decompress(payload)
+    return request_id, json.loads(payload)
+
+
+async def dispatch(method: str, kwargs: Dict[str, Any]) -> Any:
+    """Executa a operação no conector deste processo"""
+    from mikrotik_connector import mikrotik_connector
+
+    if method not in METHODS:
+        raise BrokerError(f"Operação desconhecida: {method}")
+    is_async, blocking = METHODS[method]
+    handler = getattr(mikrotik_connector, method)
+    if is_async:
+        return await handler(**kwargs)
+    if blocking:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(mikrotik_connector.thread_pool,
+                                          functools.partial(handler, **kwargs))
+    return handler(**kwargs)
+
+
+# ===== CLIENTE (workers) =====
+
+class _Channel:
+    """Conexão de um event loop com o broker e suas requisições pendentes"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.next_id = 0
+        self.closed = False
+        self.reader_task: Optional[asyncio.Task] = None
+
+    def fail_pending(self, error: BaseException):
+        self.closed = True
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+
+class BrokerClient:
+    """Encaminha operações do conector ao broker (ou executa localmente se desativado)"""
+
+    def __init__(self, path: str = '', timeout: float = 110.0, fallback_local: bool = True):
+        self.path = path
+        self.timeout = timeout
+        self.fallback_local = fallback_local
+        self._channels: Dict[int, _Channel] = {}  # id(loop) -> canal
+        self._connect_locks: Dict[int, asyncio.Lock] = {}
+        self._pid: Optional[int] = None
+        self._stats = {
+            'calls': 0,
+            'errors': 0,
+            'fallbacks': 0,
+            'connects': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    async def call(self, method: str, **kwargs) -> Any:
+        """
+        Executa a operação no broker
+
+        Broker inacessível com BROKER_FALLBACK_LOCAL: executa no próprio worker.
+
+        Raises:
+            BrokerError: Erro na operação remota ou broker inacessível sem fallback
+        """
+        if not self.enabled:
+            return await dispatch(method, kwargs)
+
+        self._stats['calls'] += 1
+        try:
+            channel = await self._channel()
+        except OSError as e:
+            self._stats['errors'] += 1
+            if self.fallback_local:
+                self._stats['fallbacks'] += 1
+                logger.warning(f"Broker {self.path} inacessível, executando localmente: {e}")
+                return await dispatch(method, kwargs)
+            raise BrokerError(f"Broker {self.path} inacessível: {e}")
+
+        channel.next_id = (channel.next_id + 1) & 0xFFFFFFFF
+        request_id = channel.next_id
+        future = asyncio.get_running_loop().create_future()
+        channel.pending[request_id] = future
+        try:
+            channel.writer.write(encode_frame(request_id, {'m': method, 'a': kwargs}))
+            await channel.writer.drain()
+            response = await asyncio.wait_for(future, self.timeout if self.timeout > 0 else None)
+        except asyncio.TimeoutError:
+            self._stats['errors'] += 1
+            raise BrokerError(f"timeout de {self.timeout}s aguardando o broker ({method})")
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self._stats['errors'] += 1
+            raise BrokerError(f"Conexão com o broker perdida: {e}")
+        finally:
+            channel.pending.pop(request_id, None)
+
+        if 'e' in response:
+            self._stats['errors'] += 1
+            raise BrokerError(response['e'])
+        return response.get('r')
+
+    async def _channel(self) -> _Channel:
+        """Canal do event loop atual (reconecta se caiu; descarta os herdados do fork)"""
+        if self._pid != os.getpid():
+            self._channels = {}
+            self._connect_locks = {}
+            self._pid = os.getpid()
+
+        loop = asyncio.get_running_loop()
+        channel = self._channels.get(id(loop))
+        if channel is not None and channel.loop is loop and not channel.closed:
+            return channel
+
+        # Requisições simultâneas do mesmo loop compartilham uma única conexão
+        lock = self._connect_locks.setdefault(id(loop), asyncio.Lock())
+        async with lock:
+            channel = self._channels.get(id(loop))
+            if channel is not None and channel.loop is loop and not channel.closed:
+                return channel
+
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            channel = _Channel(loop, reader, writer)
+            channel.reader_task = loop.create_task(self._read_responses(channel))
+
+            # Descarta canais de loops já encerrados (asyncio.run, reinício do loop)
+            for key, old in list(self._channels.items()):
+                if old.loop.is_closed():
+                    del self._channels[key]
+                    self._connect_locks.pop(key, None)
+            self._channels[id(loop)] = channel
+            self._stats['connects'] += 1
+            return channel
+
+    async def _read_responses(self, channel: _Channel):
+        try:
+            while True:
+                request_id, response = await read_frame(channel.reader)
+                future = channel.pending.get(request_id)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as e:
+            channel.fail_pending(BrokerError(f"Conexão com o broker encerrada: {e}"))
+            channel.writer.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats, socket=self.path, enabled=self.enabled,
+                    channels=sum(1 for c in self._channels.values()
+                                 if not c.closed and not c.loop.is_closed()))
+
+
+# ===== SERVIDOR (processo broker) =====
+
+class BrokerServer:
+    """Servidor do socket Unix que executa as operações no conector do processo"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started_at = time.time()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stats = {
+            'clients': 0,
+            'connections_total': 0,
+            'requests': 0,
+            'errors': 0
+        }
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Socket órfão de uma execução anterior
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        os.chmod(self.path, 0o660)
+        logger.info(f"Broker de conexões escutando em {self.path} (pid {os.getpid()})")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._stats['clients'] += 1
+        self._stats['connections_total'] += 1
+        tasks = set()
+        try:
+            while True:
+                request_id, message = await read_frame(reader)
+                task = asyncio.create_task(self._serve(request_id, message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.warning(f"Cliente do broker desconectado por erro de protocolo: {e}")
+        finally:
+            self._stats['clients'] -= 1
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _serve(self, request_id: int, message: Dict[str, Any], writer: asyncio.StreamWriter):
+        self._stats['requests'] += 1
+        method = message.get('m', '')
+        try:
+            response = {'r': await dispatch(method, message.get('a') or {})}
+            if method == 'get_stats' and isinstance(response['r'], dict):
+                response['r']['broker'] = self.get_stats()
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"Erro no broker ({method}): {e}")
+            response = {'e': str(e)}
+
+        if not writer.is_closing():
+            writer.write(encode_frame(request_id, response))
+            await writer.drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats, pid=os.getpid(), socket=self.path,
+                    uptime_seconds=round(time.time() - self.started_at, 1))
+
+
+async def serve(path: str):
+    """Executa o broker até SIGTERM/SIGINT"""
+    from cache import cache
+    from mikrotik_connector import mikrotik_connector, prewarm_from_inventory
+
+    cache.restore_snapshot()
+    prewarm_from_inventory()
+
+    server = BrokerServer(path)
+    await server.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logger.info("Encerrando broker de conexões...")
+    await server.close()
+    await mikrotik_connector.close_all_connections()  # Grava o snapshot do cache
+
+
+# Cliente global dos workers (inativo sem BROKER_SOCKET)
+broker_client = BrokerClient(
+    path=config.BROKER_SOCKET,
+    timeout=config.ASYNC_REQUEST_TIMEOUT,
+    fallback_local=config.BROKER_FALLBACK_LOCAL
+)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=getattr(logging, config.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if not config.BROKER_SOCKET:
+        logger.error("Defina BROKER_SOCKET para executar o broker de conexões")
+        sys.exit(1)
+    asyncio.run(serve(config.BROKER_SOCKET))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Execução cooperativa em workers gevent
+Com o worker gevent do gunicorn (monkey patching), o I/O do librouteros já
+roda sobre sockets cooperativos: um ThreadPoolExecutor só acrescenta fila,
+workers fixos e - criado no master com preload_app - uma SimpleQueue não
+cooperativa que pode travar o hub.
+
+No modo gevent (MIKROTIK_EXECUTION_MODE) o conector troca os thread pools
+por GreenletExecutor: cada tarefa vira um greenlet, com concorrência
+limitada por um semáforo do gevent, sem fila intermediária.
+
+O modo é resolvido por processo na primeira utilização: o monkey patching
+acontece no worker, depois do import feito pelo master.
+"""
+
+import logging
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger('sentinel-gevent')
+
+try:
+    import gevent
+    from gevent import monkey
+    from gevent.lock import BoundedSemaphore
+    from gevent.pool import Group
+except ImportError:
+    gevent = None
+
+THREADS = 'threads'
+GEVENT = 'gevent'
+AUTO = 'auto'
+
+
+def gevent_patched() -> bool:
+    """Sockets do processo foram substituídos pelos do gevent"""
+    return gevent is not None and monkey.is_module_patched('socket')
+
+
+def resolve_execution_mode(mode: str) -> str:
+    """
+    Modo efetivo de execução
+
+    Args:
+        mode: 'threads', 'gevent' ou 'auto' (gevent se o socket estiver patcheado)
+    """
+    mode = (mode or AUTO).lower()
+    if mode == AUTO:
+        return GEVENT if gevent_patched() else THREADS
+    if mode == GEVENT and not gevent_patched():
+        logger.warning("MIKROTIK_EXECUTION_MODE=gevent sem monkey patching do gevent; usando threads")
+        return THREADS
+    return mode if mode in (THREADS, GEVENT) else THREADS
+
+
+def greenlet_count() -> int:
+    """Greenlets vivos dos GreenletExecutor do processo (contador, sem varrer o gc)"""
+    return GreenletExecutor.live_greenlets()
+
+
+class GreenletExecutor(Executor):
+    """
+    Executor compatível com concurrent.futures sobre greenlets
+
+    submit() nunca bloqueia quem chama (o event loop, por exemplo): o greenlet
+    é criado na hora e aguarda o semáforo de forma cooperativa.
+    """
+
+    # Greenlets vivos de todos os executores (estatísticas por requisição sem varrer o gc)
+    _live = 0
+    _live_lock = threading.Lock()
+
+    def __init__(self, max_workers: int, name: str = 'greenlet-pool'):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._semaphore = BoundedSemaphore(self.max_workers)
+        self._group = Group()
+        self._shutdown = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0
+        }
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+
+        future: Future = Future()
+
+        def run():
+            with self._semaphore:
+                if not future.set_running_or_notify_cancel():
+                    return
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    self._count('failed')
+                    future.set_exception(e)
+                else:
+                    self._count('completed')
+                    future.set_result(result)
+
+        self._count('submitted')
+        self._adjust_live(1)
+        # rawlink também dispara para greenlet morto antes de rodar (shutdown com kill)
+        self._group.spawn(run).rawlink(lambda _: self._adjust_live(-1))
+        return future
+
+    @classmethod
+    def _adjust_live(cls, delta: int):
+        with cls._live_lock:
+            cls._live += delta
+
+    @classmethod
+    def live_greenlets(cls) -> int:
+        return cls._live
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._shutdown = True
+        if cancel_futures:
+            self._group.kill(block=False)
+        elif wait:
+            self._group.join()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Greenlets do executor (ativos = executando ou aguardando o semáforo)"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['max_workers'] = self.max_workers
+        stats['greenlets'] = len(self._group)
+        stats['running'] = self.max_workers - self._semaphore.counter
+        return stats
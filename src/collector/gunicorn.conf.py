@@ -5,6 +5,9 @@ High-performance WSGI server configuration
 """
 
 import os
+import sys
+import time
+import subprocess
 import multiprocessing
 
 # Server socket
@@ -51,10 +54,52 @@ reuse_port = True
 max_requests_jitter = 50
 preload_app = True
 
+# Broker de conexões (BROKER_SOCKET): processo filho do master, fora do ciclo dos workers
+_broker_process = None
+
+def _start_broker(server, wait=True):
+    """Inicia o broker se configurado e não estiver rodando (wait: aguarda o socket)"""
+    global _broker_process
+    from sentinel_config import config
+    if not config.BROKER_SOCKET or not config.BROKER_AUTOSTART:
+        return
+    if _broker_process is not None and _broker_process.poll() is None:
+        return
+    if _broker_process is not None:
+        server.log.warning(f"Broker de conexões encerrou (código {_broker_process.returncode}); reiniciando")
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'connection_broker.py')
+    _broker_process = subprocess.Popen([sys.executable, script])
+    if not wait:
+        server.log.info(f"Broker de conexões reiniciado (pid {_broker_process.pid})")
+        return
+
+    # Aguarda o socket para os primeiros workers não caírem no fallback local
+    deadline = time.monotonic() + 10
+    while not os.path.exists(config.BROKER_SOCKET) and time.monotonic() < deadline:
+        if _broker_process.poll() is not None:
+            break
+        time.sleep(0.1)
+    server.log.info(f"Broker de conexões iniciado (pid {_broker_process.pid}) em {config.BROKER_SOCKET}")
+
+def _broker_enabled():
+    from sentinel_config import config
+    return bool(config.BROKER_SOCKET)
+
 # Worker lifecycle
 def on_starting(server):
     """Called just before the master process is initialized."""
     server.log.info("TriplePlay-Sentinel Collector starting...")
+    _start_broker(server)
+
+def on_exit(server):
+    """Called just before exiting Gunicorn."""
+    if _broker_process is not None and _broker_process.poll() is None:
+        _broker_process.terminate()
+        try:
+            _broker_process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            _broker_process.kill()
 
 def on_reload(server):
     """Called to recycle workers during a reload via SIGHUP."""
@@ -67,10 +112,40 @@ def worker_int(worker):
 def pre_fork(server, worker):
     """Called just before a worker is forked."""
     server.log.info(f"Worker {worker.pid} forked")
+    # Cada (re)fork de worker confere se o broker continua vivo; sem esperar o
+    # socket: o master não pode travar e o worker usa o fallback local até lá
+    _start_broker(server, wait=False)
 
 def post_fork(server, worker):
     """Called just after a worker has been forked."""
     server.log.info(f"Worker {worker.pid} spawned")
+    
+    # Com broker, cache e conexões ficam no processo dele
+    if _broker_enabled():
+        return
+    
+    # Recarrega o cache do último snapshot (entradas ainda válidas)
+    from cache import cache
+    restored = cache.restore_snapshot()
+    if restored:
+        server.log.info(f"Worker {worker.pid}: {restored} resultados restaurados do snapshot do cache")
+    
+    # Pré-aquece o pool API do worker (threads e sockets não podem vir do master)
+    from mikrotik_connector import prewarm_from_inventory
+    routers = prewarm_from_inventory()
+    if routers:
+        server.log.info(f"Worker {worker.pid}: pré-aquecendo conexões para {routers} roteadores")
+
+def worker_exit(server, worker):
+    """Called just after a worker has been exited, in the worker process."""
+    # Reciclagem (max_requests) ou deploy: grava o cache para o próximo worker
+    if not _broker_enabled():
+        from cache import cache
+        cache.save_snapshot()
+    
+    # Encerra o event loop persistente do worker (fecha seletor e descritores)
+    from background_loop import background_loop
+    background_loop.stop()
 
 def worker_abort(worker):
     """Called when a worker received the SIGABRT signal."""
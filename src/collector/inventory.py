@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Inventário de Roteadores
+Carrega a lista de MikroTiks usada para pré-aquecer o pool de conexões API
+
+Formato (YAML ou JSON):
+
+    routers:
+      - host: 192.168.1.1
+        username: sentinel
+        password_env: MIKROTIK_PASSWORD   # ou password: ...
+        port: 8728                        # 8729 ativa API-SSL (ou use_ssl: true)
+        min_sessions: 4
+        hot_spares: 2
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from sentinel_config import config
+from api_ssl import resolve_use_ssl
+
+logger = logging.getLogger('sentinel-inventory')
+
+
+@dataclass
+class RouterInventoryEntry:
+    """Roteador do inventário e o aquecimento desejado do seu pool"""
+    host: str
+    username: str
+    password: str
+    port: int = 8728
+    min_sessions: int = 0
+    hot_spares: int = 0
+    name: str = ""
+    use_ssl: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte para dicionário (sem a senha)"""
+        return {
+            'name': self.name or self.host,
+            'host': self.host,
+            'port': self.port,
+            'username': self.username,
+            'min_sessions': self.min_sessions,
+            'hot_spares': self.hot_spares,
+            'use_ssl': self.use_ssl
+        }
+
+
+def _parse_entry(raw: Dict[str, Any]) -> RouterInventoryEntry:
+    """Valida e converte um item do inventário"""
+    if not isinstance(raw, dict):
+        raise ValueError(f"Item de inventário inválido: {raw!r}")
+
+    host = raw.get('host')
+    username = raw.get('username')
+    if not host or not username:
+        raise ValueError(f"Item de inventário sem host/username: {raw!r}")
+
+    password = raw.get('password')
+    if password is None and raw.get('password_env'):
+        password = os.getenv(raw['password_env'])
+    if password is None:
+        raise ValueError(f"Senha não definida para {host} (password ou password_env)")
+
+    port = int(raw.get('port', 8728))
+    use_ssl = raw.get('use_ssl')
+
+    return RouterInventoryEntry(
+        host=str(host),
+        username=str(username),
+        password=str(password),
+        port=port,
+        min_sessions=max(0, int(raw.get('min_sessions', config.PREWARM_MIN_SESSIONS))),
+        hot_spares=max(0, int(raw.get('hot_spares', config.PREWARM_HOT_SPARES))),
+        name=str(raw.get('name', '')),
+        use_ssl=resolve_use_ssl(port, None if use_ssl is None else bool(use_ssl))
+    )
+
+
+def load_router_inventory(path: str) -> List[RouterInventoryEntry]:
+    """
+    Carrega o inventário de roteadores
+
+    Args:
+        path: Arquivo .yaml/.yml ou .json
+
+    Returns:
+        Lista de roteadores (itens inválidos são ignorados com log de erro)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get('routers', [])
+    if not isinstance(data, list):
+        raise ValueError(f"Inventário {path} deve conter uma lista 'routers'")
+
+    entries = []
+    for raw in data:
+        try:
+            entries.append(_parse_entry(raw))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Ignorando item do inventário {path}: {e}")
+
+    logger.info(f"Inventário carregado: {len(entries)} roteadores de {path}")
+    return entries
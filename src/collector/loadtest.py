@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Gerador de carga para comparar modos de servidor
+Simula itens HTTP do Zabbix (um POST por target) com conexões keep-alive
+simultâneas e reporta requisições/s e latências p50/p99.
+
+Comparação gunicorn/gevent vs ASGI (mesma máquina, mesmo roteador):
+    ./start.sh start &   python3 loadtest.py --url http://127.0.0.1:5000 ...
+    ./start.sh asgi  &   python3 loadtest.py --url http://127.0.0.1:5000 ...
+
+Exemplo com 2000 itens simultâneos:
+    python3 loadtest.py --url http://127.0.0.1:5000 --concurrency 2000 --duration 60 \\
+        --router 192.168.88.1 --username admin --password senha --targets-file targets.txt
+
+Medição de referência sem roteador (--router 127.0.0.1 --port 1: a conexão é
+recusada e, após a primeira falha, cada worker responde pelo cache negativo,
+isolando servidor + handler + cache). 1 vCPU compartilhada com o gerador,
+GUNICORN_WORKERS=2, GUNICORN_CMD_ARGS="--max-requests 0", 15 s:
+
+    modo            concorrência   req/s    p50       p99
+    gevent (WSGI)        50        1091     31.5 ms   147.8 ms
+    ASGI (uvicorn)       50        1785     25.0 ms    52.2 ms
+    gevent (WSGI)       200         900    183.8 ms  1416.3 ms
+    ASGI (uvicorn)      200        1996     84.8 ms  1167.8 ms
+
+Com max_requests=5000 (padrão do gunicorn.conf.py) os workers reciclam no meio
+da medição e o p99 inclui o reaquecimento do cache de cada worker novo.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """Lê uma resposta HTTP/1.1 com Content-Length e retorna o status"""
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def _worker(host: str, port: int, path: str, bodies: List[bytes], offset: int,
+                  deadline: float, timeout: float, latencies: List[float], errors: Dict[str, int]):
+    """Uma conexão keep-alive enviando POSTs em sequência até o prazo"""
+    reader = writer = None
+    index = offset
+    while time.monotonic() < deadline:
+        body = bodies[index % len(bodies)]
+        index += 1
+        request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n").encode() + body
+        start = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+
+            # Servidor travado não trava a medição: a requisição conta como erro
+            status = await asyncio.wait_for(_read_response(reader), timeout)
+            if status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            latencies.append(time.monotonic() - start)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, IndexError, ValueError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url: str, bodies: List[bytes], concurrency: int, duration: float,
+                   timeout: float = 30.0) -> Tuple[List[float], Dict[str, int], float]:
+    parts = urlsplit(url)
+    path = parts.path if parts.path not in ('', '/') else '/api/v2/mikrotik/ping'
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    start = time.monotonic()
+    deadline = start + duration
+    await asyncio.gather(*[
+        _worker(parts.hostname, parts.port or 80, path, bodies, i, deadline, timeout, latencies, errors)
+        for i in range(concurrency)
+    ])
+    return latencies, errors, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga de pings no estilo itens HTTP do Zabbix')
+    parser.add_argument('--url', default='http://127.0.0.1:5000/api/v2/mikrotik/ping')
+    parser.add_argument('--concurrency', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--router', required=True)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--port', type=int, default=8728)
+    parser.add_argument('--targets-file', help='Um target por linha (padrão: 8.8.8.8)')
+    parser.add_argument('--count', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=30, help='Prazo por requisição (segundos)')
+    args = parser.parse_args()
+
+    targets = ['8.8.8.8']
+    if args.targets_file:
+        with open(args.targets_file) as f:
+            targets = [line.strip() for line in f if line.strip()]
+
+    bodies = [json.dumps({
+        'host': args.router, 'username': args.username, 'password': args.password,
+        'port': args.port, 'targets': [target], 'count': args.count
+    }).encode() for target in targets]
+
+    latencies, errors, elapsed = asyncio.run(run_load(args.url, bodies, args.concurrency, args.duration,
+                                                      args.timeout))
+    if not latencies:
+        print(f"Nenhuma resposta; erros: {errors}")
+        return
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"Requisições: {len(latencies)} em {elapsed:.1f}s ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"Latência: p50 {statistics.median(latencies) * 1000:.1f} ms | p99 {p99 * 1000:.1f} ms")
+    print(f"Erros: {errors or 'nenhum'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Micro-batching de pings por roteador
+O LLD do Zabbix cria um item HTTP tripleplay.ping[{#TARGET}] por target: na
+virada de cada intervalo chegam dezenas de POSTs de um target só para o mesmo
+roteador, cada um adquirindo conexão e montando o próprio batch.
+
+Requisições para a mesma chave (roteador, credenciais, count) que chegam
+dentro da janela PING_BATCH_WINDOW_MS - ou até juntar PING_BATCH_MAX_ITEMS
+targets - são despachadas como um único batch multiplexado e cada requisição
+recebe apenas os seus resultados.
+
+O agrupamento acontece por event loop (o loop persistente do worker, o do
+ASGI ou o do broker), onde todas as requisições do processo se encontram.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-micro-batch')
+
+Dispatch = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+
+def missing_result(target: str) -> Dict[str, Any]:
+    """Resultado de erro para um target que o despacho não devolveu"""
+    return {
+        'target': target,
+        'status': 'error',
+        'error': 'Sem resposta',
+        'execution_time_seconds': 0,
+        'cached': False
+    }
+
+
+class _Batch:
+    """Targets acumulados na janela e o resultado compartilhado do despacho"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, dispatch: Dispatch):
+        self.targets: Dict[str, None] = {}
+        self.requests = 0
+        self.dispatch = dispatch
+        self.future: asyncio.Future = loop.create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Agrupa requisições da mesma chave dentro de uma janela curta"""
+
+    def __init__(self, window_ms: float = 20.0, max_items: int = 100):
+        self.window = max(0.0, window_ms) / 1000
+        self.max_items = max(1, max_items)
+        self._batches: Dict[Hashable, _Batch] = {}
+        self._running = set()  # Referências dos despachos em andamento
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'targets': 0,
+            'flushed_by_size': 0,
+            'flushed_by_window': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def submit(self, key: Hashable, targets: List[str], dispatch: Dispatch) -> Dict[str, Any]:
+        """
+        Entra no batch aberto da chave (ou abre um) e aguarda o despacho
+
+        Args:
+            key: Identifica requisições que podem ir no mesmo batch
+            targets: Targets desta requisição
+            dispatch: Executa o batch (lista de targets -> resultados por target);
+                      usado o da requisição que abriu o batch
+
+        Returns:
+            Resultados apenas dos targets desta requisição (missing_result para
+            os que o despacho omitir)
+        """
+        if not self.enabled or len(targets) >= self.max_items:
+            return self._fan_out(await dispatch(targets), targets)
+
+        loop = asyncio.get_running_loop()
+        batch_key = (id(loop), key)
+        with self._lock:
+            batch = self._batches.get(batch_key)
+            if batch is None:
+                batch = _Batch(loop, dispatch)
+                self._batches[batch_key] = batch
+                batch.timer = loop.call_later(self.window, self._flush, batch_key, batch, 'flushed_by_window')
+            batch.targets.update(dict.fromkeys(targets))
+            batch.requests += 1
+            self._stats['requests'] += 1
+            full = len(batch.targets) >= self.max_items
+
+        if full:
+            self._flush(batch_key, batch, 'flushed_by_size')
+
+        # shield: cancelar uma requisição (timeout) não cancela o batch dos demais
+        results = await asyncio.shield(batch.future)
+        return self._fan_out(results, targets)
+
+    @staticmethod
+    def _fan_out(results: Dict[str, Any], targets: List[str]) -> Dict[str, Any]:
+        """Resultados dos targets da requisição; um target omitido não derruba os demais"""
+        missing = [target for target in targets if target not in results]
+        if missing:
+            logger.warning(f"Despacho sem resultado para {len(missing)} targets: {missing[:5]}")
+        return {target: results[target] if target in results else missing_result(target)
+                for target in targets}
+
+    def _flush(self, batch_key: Hashable, batch: _Batch, reason: str):
+        """Fecha o batch e despacha (chamado no loop do batch)"""
+        with self._lock:
+            if self._batches.get(batch_key) is not batch:
+                return  # Já despachado pelo outro gatilho
+            del self._batches[batch_key]
+            self._stats['batches'] += 1
+            self._stats['targets'] += len(batch.targets)
+            self._stats[reason] += 1
+
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: _Batch):
+        try:
+            results = await batch.dispatch(list(batch.targets))
+        except asyncio.CancelledError:
+            batch.future.cancel()
+            raise
+        except Exception as e:
+            if not batch.future.done():
+                batch.future.set_exception(e)
+        else:
+            if not batch.future.done():
+                batch.future.set_result(results)
+        finally:
+            # Sem requisições aguardando (todas canceladas): evita "exception never retrieved"
+            if batch.future.done() and not batch.future.cancelled():
+                batch.future.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Requisições por batch despachado"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_batches'] = len(self._batches)
+        stats['window_ms'] = self.window * 1000
+        stats['max_items'] = self.max_items
+        stats['avg_requests_per_batch'] = (
+            round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0
+        )
+        return stats
+
+
+# Instância global para os pings do conector (PING_BATCH_WINDOW_MS=0 desativa)
+ping_batcher = MicroBatcher(config.PING_BATCH_WINDOW_MS, config.PING_BATCH_MAX_ITEMS)
+
+
+if __name__ == '__main__':
+    # Simulação: N itens de um target chegando espalhados em 10 ms, cada
+    # despacho com custo fixo (aquisição de conexão + login/API) + custo por target
+    import time
+
+    ITEMS, SPREAD, FIXED, PER_TARGET = 500, 0.010, 0.005, 0.0001
+
+    async def simulate(batcher: MicroBatcher) -> Dict[str, float]:
+        dispatches = 0
+        busy = asyncio.Semaphore(4)  # Sessões API por roteador
+
+        async def dispatch(targets: List[str]) -> Dict[str, Any]:
+            nonlocal dispatches
+            async with busy:
+                dispatches += 1
+                await asyncio.sleep(FIXED + PER_TARGET * len(targets))
+            return {target: {'status': 'success', 'target': target} for target in targets}
+
+        async def item(i: int) -> float:
+            await asyncio.sleep(SPREAD * i / ITEMS)
+            start = time.monotonic()
+            await batcher.submit('router', [f'10.0.{i // 256}.{i % 256}'], dispatch)
+            return time.monotonic() - start
+
+        start = time.monotonic()
+        latencies = sorted(await asyncio.gather(*[item(i) for i in range(ITEMS)]))
+        return {
+            'dispatches': dispatches,
+            'elapsed_ms': (time.monotonic() - start) * 1000,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000
+        }
+
+    for label, batcher in (('sem micro-batching', MicroBatcher(0)),
+                           ('janela 20 ms', MicroBatcher(20, 100))):
+        result = asyncio.run(simulate(batcher))
+        print(f"{label:>20}: {result['dispatches']:4d} despachos | total {result['elapsed_ms']:7.1f} ms | "
+              f"p50 {result['p50_ms']:6.1f} ms | p99 {result['p99_ms']:6.1f} ms")
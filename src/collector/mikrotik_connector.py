@@ -4,54 +4,149 @@ TriplePlay-Sentinel - MikroTik Connector
 Network monitoring and management system
 """
 
+import os
 import time
 import threading
 import logging
 import asyncio
+import json
+import functools
+import weakref
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import librouteros
+from librouteros.exceptions import ConnectionClosed, FatalError, MultiTrapError, ProtocolError, TrapError
 from librouteros.query import Key
 from sentinel_config import config
+from routeros_api import (AsyncRouterOSConnection, AsyncRouterOSPool, RouterOSConnectionError,
+                          RouterOSTimeoutError, RouterOSTrapError, build_command_words,
+                          build_query_words, parse_reply_words)
+from inventory import RouterInventoryEntry, load_router_inventory
+from circuit_breaker import OPEN, CircuitOpenError, circuit_breakers, jittered_backoff
+from adaptive_limit import AdaptiveLimiter, adaptive_limits
+from api_ssl import resolve_use_ssl, tls_sessions
+from netwatch import NetwatchManager
+from cache import cache
+from cache_policy import ttl_policy
+from negative_cache import (AUTH_FAILURE, TARGET_UNREACHABLE, classify_failure, credential_hash,
+                            negative_cache)
+from models import TestResult
+from single_flight import single_flight
+from micro_batch import missing_result, ping_batcher
+from background_loop import background_loop
+from gevent_support import GEVENT, GreenletExecutor, greenlet_count, resolve_execution_mode
 
 logger = logging.getLogger('sentinel-mikrotik-connector')
 
+# Ações de menu permitidas sem COMMAND_ALLOW_WRITE
+READ_ONLY_ACTIONS = ('print', 'getall', 'get')
+
+
+class PoolTimeoutError(Exception):
+    """Nenhuma conexão do pool liberada no prazo (saturação local, não falha do roteador)"""
+
+
+class RouterConnectError(Exception):
+    """TCP, TLS ou login com o roteador falhou"""
+
+
+class RouterAuthError(Exception):
+    """Login recusado pelo roteador (!trap no /login): o roteador está respondendo"""
+
+
+def failure_fields(error: BaseException) -> Dict[str, Any]:
+    """
+    Campos estruturados de uma falha, usados pelo cache negativo (classify_failure)
+
+    transport_error: conexão/transporte com o roteador falhou
+    trap: o roteador respondeu com !trap (erro do comando ou do target)
+    error_type=auth_failure: login recusado (não conta para o circuit breaker)
+
+    Timeouts locais (fila do pool, comando sem resposta em sessão ativa) não
+    recebem nenhum dos dois e nunca vão ao cache negativo.
+    """
+    if isinstance(error, RouterAuthError):
+        return {'error_type': AUTH_FAILURE}
+    if isinstance(error, (TrapError, MultiTrapError, RouterOSTrapError)):
+        return {'trap': True}
+    if isinstance(error, (PoolTimeoutError, RouterOSTimeoutError, TimeoutError)):
+        return {}
+    if isinstance(error, (RouterConnectError, RouterOSConnectionError, OSError,
+                          ConnectionClosed, FatalError, ProtocolError)):
+        return {'transport_error': True}
+    return {}
+
+
+def ping_latency_sample(data: Dict[str, Any], elapsed: float, count: int) -> Optional[float]:
+    """
+    Latência do roteador para o limite adaptativo a partir de um ping
+    
+    Desconta o tempo próprio do ping (count-1 intervalos de 1s). Com perda de
+    pacotes o tempo inclui a espera pelo timeout do target: não mede o roteador.
+    
+    Returns:
+        Latência em segundos ou None se o ping perdeu pacotes
+    """
+    if (data or {}).get('packet_loss_percent', 100) > 0:
+        return None
+    return max(0.0, elapsed - (count - 1))
+
 
 class MikroTikAPIConnection:
     """Conexão individual API MikroTik usando librouteros"""
     
-    def __init__(self, host: str, username: str, password: str, port: int = 8728, timeout: int = 10):
+    def __init__(self, host: str, username: str, password: str, port: int = 8728, timeout: int = 10,
+                 use_ssl: bool = False):
         self.host = host
         self.username = username
         self.password = password
         self.port = port
         self.timeout = timeout
+        self.use_ssl = use_ssl
         self.connection = None
         self.connected = False
         self.available = True
         self.created_at = time.time()
         self.last_used = time.time()
+        self.last_validated = 0.0  # Último uso bem-sucedido ou keepalive
+        self.last_keepalive = 0.0  # Último keepalive (não conta como uso: last_used decide a ociosidade)
+        self.last_error = ''
+        self.login_refused = False  # !trap no /login (credencial recusada)
         self._lock = threading.Lock()
     
     def connect(self) -> bool:
         """Estabelece conexão com a API MikroTik"""
+        kwargs = {}
+        if self.use_ssl:
+            kwargs['ssl_wrapper'] = tls_sessions.wrapper(self.host, self.port)
+        
         try:
             self.connection = librouteros.connect(
                 host=self.host,
                 username=self.username,
                 password=self.password,
                 port=self.port,
-                timeout=self.timeout
+                timeout=self.timeout,
+                **kwargs
             )
+            if self.use_ssl:
+                # Sessão guardada após o login para retomar na próxima conexão
+                tls_sessions.store(self.host, self.port, self.connection.protocol.transport.sock)
             self.connected = True
             self.last_used = time.time()
+            self.last_validated = self.last_used
             logger.info(f"Conexão API estabelecida com {self.host}:{self.port}")
             return True
             
         except Exception as e:
             logger.error(f"Erro ao conectar API {self.host}:{self.port}: {e}")
+            if self.use_ssl:
+                tls_sessions.invalidate(self.host, self.port)
+            self.last_error = str(e)
+            self.login_refused = isinstance(e, (TrapError, MultiTrapError))
             self.connected = False
             return False
     
@@ -74,11 +169,23 @@ class MikroTikAPIConnection:
         try:
             # Testa com comando simples
             list(self.connection('/system/identity/print'))
+            self.last_validated = time.time()
             return True
         except:
             self.connected = False
             return False
     
+    def is_fresh(self, window: float) -> bool:
+        """Conexão validada (uso bem-sucedido ou keepalive) há menos de 'window' segundos"""
+        return self.connected and (time.time() - self.last_validated) < window
+    
+    def _handle_command_error(self, error: Exception):
+        """Marca a conexão como morta em erros de transporte (erros !trap não afetam a sessão)"""
+        if isinstance(error, (TrapError, MultiTrapError)):
+            return
+        if isinstance(error, (OSError, ConnectionClosed, FatalError, ProtocolError)):
+            self.connected = False
+    
     def execute_ping(self, address: str, count: int = 4, size: int = 64, interval: int = 1) -> Dict[str, Any]:
         """Executa ping via API librouteros"""
         if not self.connected or not self.connection:
@@ -91,11 +198,9 @@ class MikroTikAPIConnection:
             # Executa ping usando librouteros
             ping_results = []
             
-            # Comando ping via API
-            ping_cmd = self.connection('/ping')
-            
-            # Configura parâmetros
-            ping_responses = ping_cmd(
+            # Comando ping via API (librouteros 3: parâmetros na própria chamada)
+            ping_responses = self.connection(
+                '/ping',
                 address=address,
                 count=count,
                 size=size,
@@ -107,17 +212,25 @@ class MikroTikAPIConnection:
                 ping_results.append(response)
             
             execution_time = time.time() - start_time
+            self.last_validated = time.time()
             
             # Processa resultados
             return self._process_ping_results(ping_results, execution_time)
             
         except Exception as e:
             execution_time = time.time() - start_time
+            self._handle_command_error(e)
             logger.error(f"Erro no ping via API {self.host}: {e}")
-            raise Exception(f"Erro na execução do ping: {e}")
+            raise
     
     def execute_batch_ping(self, addresses: List[str], count: int = 4, size: int = 64) -> Dict[str, Dict[str, Any]]:
-        """Executa múltiplos pings VERDADEIRAMENTE em paralelo usando API MikroTik"""
+        """
+        Executa múltiplos pings em paralelo na mesma conexão API
+        
+        Cada /ping é enviado com um atributo .tag próprio e as sentenças de
+        resposta são roteadas pelo tag, então todos os pings correm ao mesmo
+        tempo no roteador e o lote termina em aproximadamente um ping.
+        """
         if not self.connected or not self.connection:
             raise Exception("Conexão não estabelecida")
         
@@ -125,132 +238,203 @@ class MikroTikAPIConnection:
         self.last_used = start_time
         results = {}
         
+        error_data = {
+            'packets_sent': 0,
+            'packets_received': 0,
+            'packet_loss_percent': 100.0,
+            'status': 'unreachable'
+        }
+        
+        protocol = self.connection.protocol
+        pending = {}       # {tag: address}
+        ping_replies = {}  # {address: [respostas]}
+        
         try:
-            # A API MikroTik suporta múltiplos comandos simultâneos!
-            # Vamos usar isso para máxima performance
-            
-            ping_generators = {}
-            active_pings = {}
-            
-            # Inicia todos os pings simultaneamente
-            for address in addresses:
-                try:
-                    # Cria comando ping para este endereço
-                    ping_cmd = self.connection('/ping')
-                    
-                    # Inicia ping (retorna generator para resultados)
-                    ping_gen = ping_cmd(
-                        address=address,
-                        count=count,
-                        size=size,
-                        interval=1
-                    )
-                    
-                    ping_generators[address] = ping_gen
-                    active_pings[address] = []
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao iniciar ping para {address}: {e}")
-                    results[address] = {
-                        'status': 'error',
-                        'error': str(e),
-                        'data': {
-                            'packets_sent': 0,
-                            'packets_received': 0,
-                            'packet_loss_percent': 100.0,
-                            'status': 'unreachable'
-                        }
-                    }
-            
-            # Coleta resultados de todos os pings simultaneamente
-            max_iterations = count * 2  # Limite de segurança
-            iteration = 0
+            # Inicia todos os pings simultaneamente (um tag por endereço)
+            for index, address in enumerate(dict.fromkeys(addresses)):
+                tag = str(index)
+                protocol.writeSentence(
+                    '/ping',
+                    f'=address={address}',
+                    f'=count={count}',
+                    f'=size={size}',
+                    '=interval=1',
+                    f'.tag={tag}'
+                )
+                pending[tag] = address
+                ping_replies[address] = []
             
-            while ping_generators and iteration < max_iterations:
-                iteration += 1
+            # Roteia cada resposta para o ping dono do tag até todos terminarem
+            while pending:
+                reply_word, words = protocol.readSentence()
+                attributes, tag = parse_reply_words(list(words))
+                address = pending.get(tag)
                 
-                # Para cada ping ativo, tenta coletar próximo resultado
-                completed_addresses = []
+                if address is None:
+                    continue
                 
-                for address, ping_gen in list(ping_generators.items()):
-                    try:
-                        # Tenta obter próximo resultado (non-blocking)
-                        result = next(ping_gen)
-                        active_pings[address].append(result)
-                        
-                    except StopIteration:
-                        # Ping completado para este endereço
-                        completed_addresses.append(address)
-                        
-                    except Exception as e:
-                        # Erro neste ping específico
-                        logger.error(f"Erro durante ping para {address}: {e}")
-                        completed_addresses.append(address)
-                        if address not in results:
-                            results[address] = {
-                                'status': 'error',
-                                'error': str(e),
-                                'data': {
-                                    'packets_sent': 0,
-                                    'packets_received': 0,
-                                    'packet_loss_percent': 100.0,
-                                    'status': 'unreachable'
-                                }
-                            }
-                
-                # Remove pings completados
-                for address in completed_addresses:
-                    if address in ping_generators:
-                        del ping_generators[address]
-                
-                # Pequena pausa para evitar CPU 100%
-                if ping_generators:
-                    time.sleep(0.01)  # 10ms
+                if reply_word == '!re':
+                    ping_replies[address].append(attributes)
+                elif reply_word == '!trap':
+                    error = attributes.get('message', 'Erro desconhecido')
+                    logger.error(f"Erro durante ping para {address}: {error}")
+                    results[address] = {'status': 'error', 'error': str(error), 'trap': True,
+                                         'data': dict(error_data)}
+                elif reply_word == '!done':
+                    del pending[tag]
             
             # Processa resultados coletados
-            for address, ping_results in active_pings.items():
+            execution_time = time.time() - start_time
+            self.last_validated = time.time()
+            for address, replies in ping_replies.items():
                 if address not in results:  # Só processa se não teve erro
-                    try:
-                        execution_time = time.time() - start_time
-                        processed_result = self._process_ping_results(ping_results, execution_time)
-                        results[address] = {
-                            'status': 'success',
-                            'data': processed_result
-                        }
-                    except Exception as e:
-                        results[address] = {
-                            'status': 'error',
-                            'error': str(e),
-                            'data': {
-                                'packets_sent': 0,
-                                'packets_received': 0,
-                                'packet_loss_percent': 100.0,
-                                'status': 'unreachable'
-                            }
-                        }
+                    results[address] = {
+                        'status': 'success',
+                        'data': self._process_ping_results(replies, execution_time)
+                    }
             
-            execution_time = time.time() - start_time
             successful = sum(1 for r in results.values() if r['status'] == 'success')
-            logger.info(f"Batch ping API paralelo: {successful}/{len(addresses)} sucessos em {execution_time:.2f}s")
+            logger.info(f"Batch ping API multiplexado: {successful}/{len(ping_replies)} sucessos em {execution_time:.2f}s")
             
             return results
             
         except Exception as e:
-            logger.error(f"Erro no batch ping API paralelo {self.host}: {e}")
-            # Retorna erro para endereços não processados
-            error_data = {
-                'packets_sent': 0,
-                'packets_received': 0,
-                'packet_loss_percent': 100.0,
-                'status': 'unreachable'
-            }
+            # Stream pode ter ficado com respostas pendentes - descarta a conexão
+            self.connected = False
+            logger.error(f"Erro no batch ping API multiplexado {self.host}: {e}")
             
             for address in addresses:
                 if address not in results:
-                    results[address] = {'status': 'error', 'error': str(e), 'data': error_data}
+                    results[address] = {
+                        'status': 'error',
+                        'error': str(e),
+                        # Timeout de leitura: sobrecarga para o limite adaptativo, não roteador fora
+                        'timed_out': isinstance(e, TimeoutError),
+                        'data': dict(error_data),
+                        **failure_fields(e)
+                    }
             
             return results
     
+    def run_command(self, path: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Executa um comando arbitrário (ex: '/tool/netwatch/add') e retorna as sentenças !re
+        
+        Erros !trap são propagados (TrapError) sem derrubar a conexão.
+        """
+        if not self.connected or not self.connection:
+            raise Exception("Conexão não estabelecida")
+        
+        try:
+            results = list(self.connection(path, **(params or {})))
+            self.last_used = time.time()
+            self.last_validated = self.last_used
+            return results
+        except Exception as e:
+            self._handle_command_error(e)
+            raise
+    
+    def execute_menu_command(self, path: str, proplist: Optional[List[str]] = None,
+                             query: Optional[Any] = None, params: Optional[Dict[str, Any]] = None,
+                             max_rows: int = 0) -> Dict[str, Any]:
+        """
+        Executa um comando de menu (ex: '/ip/route/print') com .proplist e filtros '?'
+        
+        Projeção e filtros são aplicados no próprio roteador. As sentenças !re são
+        lidas uma a uma e gravadas direto como linhas compactas ('columns' + lista
+        de valores por linha). Atingido max_rows, o comando é cancelado (/cancel).
+        """
+        if not self.connected or not self.connection:
+            raise Exception("Conexão não estabelecida")
+        
+        start_time = time.time()
+        self.last_used = start_time
+        
+        if isinstance(proplist, str):
+            proplist = [field.strip() for field in proplist.split(',') if field.strip()]
+        
+        protocol = self.connection.protocol
+        columns = list(proplist or [])
+        positions = {column: index for index, column in enumerate(columns)}
+        rows = []
+        ret = None
+        trap = None
+        truncated = False
+        
+        try:
+            words = build_command_words(path, params) + build_query_words(proplist, query)
+            protocol.writeSentence(*words, '.tag=cmd')
+            pending = {'cmd'}
+            
+            while pending:
+                reply_word, reply = protocol.readSentence()
+                attributes, tag = parse_reply_words(list(reply))
+                if tag not in pending:
+                    continue
+                
+                if reply_word == '!re' and tag == 'cmd' and not truncated:
+                    row = [None] * len(columns)
+                    for key, value in attributes.items():
+                        index = positions.get(key)
+                        if index is None:
+                            if proplist:
+                                continue
+                            index = positions[key] = len(columns)
+                            columns.append(key)
+                            row.append(None)
+                        row[index] = value
+                    rows.append(row)
+                    
+                    if max_rows and len(rows) >= max_rows:
+                        truncated = True
+                        protocol.writeSentence('/cancel', '=tag=cmd', '.tag=cancel')
+                        pending.add('cancel')
+                elif reply_word == '!trap' and tag == 'cmd' and not truncated:
+                    trap = attributes.get('message', 'Erro desconhecido')
+                elif reply_word == '!done':
+                    if tag == 'cmd':
+                        ret = attributes.get('ret')
+                    pending.discard(tag)
+        except Exception as e:
+            # Stream pode ter ficado com respostas pendentes - descarta a conexão
+            self.connected = False
+            logger.error(f"Erro no comando {path} via API {self.host}: {e}")
+            raise
+        
+        self.last_validated = time.time()
+        if trap is not None:
+            raise TrapError(message=trap)
+        
+        # Colunas que surgiram depois completam as linhas anteriores
+        for row in rows:
+            if len(row) < len(columns):
+                row.extend([None] * (len(columns) - len(row)))
+        
+        result = {
+            'path': path,
+            'columns': columns,
+            'rows': rows,
+            'row_count': len(rows),
+            'truncated': truncated,
+            'execution_time_seconds': round(time.time() - start_time, 3)
+        }
+        if ret is not None:
+            result['ret'] = ret
+        return result
+    
+    def get_system_resource(self) -> Dict[str, Any]:
+        """Lê /system/resource (cpu-load, memória, uptime)"""
+        if not self.connected or not self.connection:
+            raise Exception("Conexão não estabelecida")
+        
+        try:
+            resources = list(self.connection('/system/resource/print'))
+            self.last_validated = time.time()
+            return resources[0] if resources else {}
+        except Exception as e:
+            self._handle_command_error(e)
+            raise
+    
     def execute_traceroute(self, address: str, max_hops: int = 30) -> Dict[str, Any]:
         """Executa traceroute via API"""
         if not self.connected or not self.connection:
@@ -260,13 +444,13 @@ class MikroTikAPIConnection:
         self.last_used = start_time
         
         try:
-            # Comando traceroute via API
-            traceroute_cmd = self.connection('/tool/traceroute')
-            
+            # Comando traceroute via API (count limita as rodadas; sem ele o traceroute não termina)
             traceroute_results = []
-            traceroute_responses = traceroute_cmd(
+            traceroute_responses = self.connection(
+                '/tool/traceroute',
                 address=address,
-                count=max_hops
+                count=3,
+                **{'max-hops': max_hops}
             )
             
             # Coleta respostas
@@ -274,17 +458,20 @@ class MikroTikAPIConnection:
                 traceroute_results.append(response)
             
             execution_time = time.time() - start_time
+            self.last_validated = time.time()
             
             # Processa resultados do traceroute
             return self._process_traceroute_results(traceroute_results, address, execution_time)
             
         except Exception as e:
             execution_time = time.time() - start_time
+            self._handle_command_error(e)
             logger.error(f"Erro no traceroute via API {self.host}: {e}")
-            raise Exception(f"Erro na execução do traceroute: {e}")
+            raise
     
-    def _process_ping_results(self, ping_results: List[Dict], execution_time: float) -> Dict[str, Any]:
-        """Processa resultados do ping da API librouteros"""
+    @staticmethod
+    def _process_ping_results(ping_results: List[Dict], execution_time: float) -> Dict[str, Any]:
+        """Processa resultados do ping da API (librouteros ou cliente nativo)"""
         
         if not ping_results:
             return {
@@ -437,11 +624,12 @@ class MikroTikAPIConnection:
         with self._lock:
             self.available = False
     
-    def mark_available(self):
-        """Marca conexão como disponível"""
+    def mark_available(self, touch: bool = True):
+        """Marca conexão como disponível (touch=False mantém last_used, ex.: após keepalive)"""
         with self._lock:
             self.available = True
-            self.last_used = time.time()
+            if touch:
+                self.last_used = time.time()
     
     def is_available(self) -> bool:
         """Verifica se conexão está disponível"""
@@ -449,123 +637,607 @@ class MikroTikAPIConnection:
             return self.available and self.connected
 
 
+class _PoolWaiter:
+    """Requisição aguardando conexão na fila FIFO do pool"""
+    
+    __slots__ = ('event', 'connection', 'slot_freed', 'enqueued_at')
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.connection: Optional[MikroTikAPIConnection] = None
+        self.slot_freed = False
+        self.enqueued_at = time.time()
+
+
+class _HostPool:
+    """
+    Conexões de um pool_key protegidas por lock próprio
+    
+    'pending' conta vagas reservadas para conexões sendo estabelecidas fora
+    do lock, para que o limite por host continue valendo durante o connect.
+    """
+    
+    __slots__ = ('lock', 'connections', 'waiters', 'pending')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections: List[MikroTikAPIConnection] = []
+        self.waiters: Deque[_PoolWaiter] = deque()
+        self.pending = 0
+    
+    def free_slot_for_waiter(self):
+        """Acorda o primeiro da fila para ocupar uma vaga liberada (com lock adquirido)"""
+        if self.waiters:
+            waiter = self.waiters.popleft()
+            waiter.slot_freed = True
+            waiter.event.set()
+
+
 class MikroTikAPIPool:
-    """Pool de conexões API MikroTik usando librouteros"""
+    """
+    Pool de conexões API MikroTik usando librouteros
+    
+    Cada pool_key (host:porta:usuário) tem seu próprio lock; o lock global só
+    protege o dicionário de pools. Connect e verificações de liveness rodam
+    fora de qualquer lock, então um roteador lento não trava os demais.
+    
+    Roteadores registrados via prewarm() são mantidos aquecidos pela thread
+    de manutenção: min_sessions sessões abertas e hot_spares ociosas.
+    """
     
-    def __init__(self, max_connections_per_host: int = 10):
+    def __init__(self, max_connections_per_host: int = 10, acquire_timeout: float = 5.0,
+                 freshness_window: float = 60.0, keepalive_interval: float = 30.0,
+                 max_idle_time: float = 300.0):
         self.max_connections_per_host = max_connections_per_host
-        self.pools: Dict[str, List[MikroTikAPIConnection]] = {}
-        self.pool_lock = threading.RLock()
+        self.acquire_timeout = acquire_timeout
+        self.freshness_window = freshness_window
+        self.keepalive_interval = keepalive_interval
+        self.max_idle_time = max_idle_time
+        self.pools: Dict[str, _HostPool] = {}
+        self.pool_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        
+        # Health checker em background (iniciado sob demanda em cada processo)
+        self._health_thread: Optional[threading.Thread] = None
+        self._health_pid: Optional[int] = None
+        self._health_stop = threading.Event()
+        
+        # Roteadores do inventário mantidos aquecidos (pool_key -> entrada)
+        self.warm_targets: Dict[str, RouterInventoryEntry] = {}
+        self._warm_retry_at: Dict[str, float] = {}
+        self._warming: Set[str] = set()  # Pools com abertura de sessões em andamento
+        self._maintenance_wakeup = threading.Event()
+        
         self.stats = {
             'total_connections': 0,
             'active_connections': 0,
             'api_calls': 0,
             'batch_calls': 0,
             'reused_connections': 0,
-            'failed_connections': 0
+            'failed_connections': 0,
+            'waits': 0,
+            'wait_timeouts': 0,
+            'handoffs': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'fresh_reuses': 0,
+            'inline_liveness_checks': 0,
+            'keepalive_checks': 0,
+            'keepalive_failures': 0,
+            'prewarm_connections': 0,
+            'prewarm_failures': 0
         }
     
-    def _get_pool_key(self, host: str, username: str, port: int) -> str:
+    def _get_pool_key(self, host: str, username: str, port: int, use_ssl: bool = False) -> str:
         """Gera chave do pool"""
-        return f"{host}:{port}:{username}"
+        key = f"{host}:{port}:{username}"
+        return f"{key}:ssl" if use_ssl else key
+    
+    def _get_host_pool(self, pool_key: str) -> _HostPool:
+        """Obtém (ou cria) o pool de um pool_key"""
+        host_pool = self.pools.get(pool_key)
+        if host_pool is None:
+            with self.pool_lock:
+                host_pool = self.pools.setdefault(pool_key, _HostPool())
+        return host_pool
+    
+    def _increment_stat(self, name: str, value=1):
+        """Incrementa contador de estatística de forma thread-safe"""
+        with self.stats_lock:
+            self.stats[name] += value
+    
+    def _update_active_connections(self):
+        """Recalcula o total de conexões abertas"""
+        with self.pool_lock:
+            host_pools = list(self.pools.values())
+        total = sum(len(host_pool.connections) for host_pool in host_pools)
+        with self.stats_lock:
+            self.stats['active_connections'] = total
     
     @contextmanager
-    def get_connection(self, host: str, username: str, password: str, port: int = 8728):
-        """Context manager para obter conexão do pool"""
-        pool_key = self._get_pool_key(host, username, port)
+    def get_connection(self, host: str, username: str, password: str, port: int = 8728,
+                       use_ssl: Optional[bool] = None):
+        """
+        Context manager para obter conexão do pool
+        
+        Levanta CircuitOpenError sem tocar na rede quando o circuit breaker do
+        roteador está aberto. use_ssl=None ativa API-SSL pela porta (8729).
+        """
+        breaker = circuit_breakers.get(host, port)
+        breaker.check()
         connection = None
         
         try:
             # Obtém conexão do pool
-            connection = self._acquire_connection(host, username, password, port)
-            self.stats['api_calls'] += 1
+            connection = self._acquire_connection(
+                host, username, password, port, resolve_use_ssl(port, use_ssl)
+            )
+            self._increment_stat('api_calls')
             yield connection
             
         except Exception as e:
-            self.stats['failed_connections'] += 1
+            self._increment_stat('failed_connections')
             raise e
             
         finally:
             # Retorna conexão para o pool
             if connection:
+                if connection.connected:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure(f"Conexão perdida com {host}:{port}")
                 self._release_connection(connection)
     
-    def _acquire_connection(self, host: str, username: str, password: str, port: int) -> MikroTikAPIConnection:
-        """Obtém conexão do pool"""
-        pool_key = self._get_pool_key(host, username, port)
+    def _acquire_connection(self, host: str, username: str, password: str, port: int,
+                            use_ssl: bool = False) -> MikroTikAPIConnection:
+        """
+        Obtém conexão do pool
         
-        with self.pool_lock:
-            if pool_key not in self.pools:
-                self.pools[pool_key] = []
+        Com o pool cheio a requisição entra em uma fila FIFO por pool_key e
+        aguarda até acquire_timeout segundos; a conexão liberada é entregue
+        diretamente ao waiter mais antigo.
+        """
+        self._ensure_health_checker()
+        
+        pool_key = self._get_pool_key(host, username, port, use_ssl)
+        host_pool = self._get_host_pool(pool_key)
+        deadline = time.time() + self.acquire_timeout
+        waiter = None
+        
+        while True:
+            candidate = None
+            reserved = False
             
-            pool = self.pools[pool_key]
+            with host_pool.lock:
+                # Requisições novas não passam na frente de quem já está na fila
+                if waiter is not None or not host_pool.waiters:
+                    for conn in host_pool.connections:
+                        if conn.is_available():
+                            conn.mark_busy()
+                            candidate = conn
+                            break
+                    
+                    if candidate is None:
+                        open_slots = len(host_pool.connections) + host_pool.pending
+                        if open_slots < self.max_connections_per_host:
+                            host_pool.pending += 1
+                            reserved = True
+                
+                if candidate is None and not reserved:
+                    # Pool cheio: entra na fila (na frente se já estava esperando)
+                    if waiter is None:
+                        waiter = _PoolWaiter()
+                        self._increment_stat('waits')
+                        host_pool.waiters.append(waiter)
+                    else:
+                        waiter.event.clear()
+                        waiter.slot_freed = False
+                        host_pool.waiters.appendleft(waiter)
             
-            # Procura conexão disponível e ativa
-            for conn in pool:
-                if conn.is_available() and conn.is_alive():
-                    conn.mark_busy()
-                    self.stats['reused_connections'] += 1
+            if pool_key in self.warm_targets and (candidate is not None or reserved):
+                # Um hot spare foi consumido (ou faltou): repõe em background
+                self._maintenance_wakeup.set()
+            
+            if candidate is not None:
+                # Conexão usada com sucesso (ou validada pelo keepalive) há pouco
+                # tempo é confiável; caso contrário verifica liveness fora do lock
+                if candidate.is_fresh(self.freshness_window):
+                    self._increment_stat('fresh_reuses')
+                    alive = True
+                else:
+                    self._increment_stat('inline_liveness_checks')
+                    alive = candidate.is_alive()
+                
+                if alive:
+                    self._increment_stat('reused_connections')
+                    if waiter is not None:
+                        self._record_wait(waiter)
                     logger.debug(f"Reutilizando conexão API para {host}")
-                    return conn
+                    return candidate
+                
+                self._discard_connection(host_pool, candidate)
+                continue
+            
+            if reserved:
+                conn = self._open_reserved_connection(host_pool, host, username, password, port, use_ssl)
+                if waiter is not None:
+                    self._record_wait(waiter)
+                return conn
             
-            # Remove conexões mortas
-            active_connections = []
-            for conn in pool:
-                if conn.is_alive():
-                    active_connections.append(conn)
+            waiter.event.wait(max(0.0, deadline - time.time()))
+            
+            with host_pool.lock:
+                if waiter.connection is not None:
+                    handed = waiter.connection
+                elif waiter.slot_freed:
+                    # Uma vaga foi liberada (conexão morta removida): tenta de novo
+                    handed = None
                 else:
-                    conn.disconnect()
-            self.pools[pool_key] = active_connections
+                    # Timeout: sai da fila
+                    try:
+                        host_pool.waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                    self._increment_stat('wait_timeouts')
+                    raise PoolTimeoutError(
+                        f"Timeout aguardando conexão do pool API para {host} "
+                        f"({self.acquire_timeout}s, max: {self.max_connections_per_host})"
+                    )
             
-            # Cria nova conexão se dentro do limite
-            if len(self.pools[pool_key]) < self.max_connections_per_host:
-                conn = MikroTikAPIConnection(host, username, password, port)
+            if handed is not None:
+                self._record_wait(waiter)
+                return handed
+    
+    def _open_reserved_connection(self, host_pool: _HostPool, host: str, username: str,
+                                  password: str, port: int, use_ssl: bool = False) -> MikroTikAPIConnection:
+        """
+        Estabelece conexão em uma vaga reservada (TCP + login fora de qualquer lock)
+        
+        Falhas são repetidas até MIKROTIK_MAX_RETRIES vezes com backoff exponencial
+        e jitter, desde que o orçamento de retentativas do roteador permita.
+        """
+        breaker = circuit_breakers.get(host, port)
+        connected = False
+        
+        try:
+            for attempt in range(config.MIKROTIK_MAX_RETRIES + 1):
+                if attempt > 0:
+                    if not breaker.try_retry():
+                        break
+                    time.sleep(jittered_backoff(attempt - 1, 0.2, 2.0))
                 
-                if conn.connect():
+                conn = MikroTikAPIConnection(host, username, password, port, use_ssl=use_ssl)
+                connected = conn.connect()
+                if connected or conn.login_refused:
+                    break
+        finally:
+            with host_pool.lock:
+                host_pool.pending -= 1
+                if connected:
                     conn.mark_busy()
-                    self.pools[pool_key].append(conn)
-                    self.stats['total_connections'] += 1
-                    self.stats['active_connections'] = sum(len(p) for p in self.pools.values())
-                    logger.info(f"Nova conexão API criada para {host} (total no pool: {len(self.pools[pool_key])})")
-                    return conn
+                    host_pool.connections.append(conn)
+                    pool_size = len(host_pool.connections)
                 else:
-                    raise Exception(f"Falha ao conectar API {host}:{port}")
+                    host_pool.free_slot_for_waiter()
+        
+        if not connected and conn.login_refused:
+            # Roteador respondeu: login recusado não abre o circuito
+            raise RouterAuthError(f"Login recusado por {host}:{port}: {conn.last_error}")
+        if not connected:
+            breaker.record_failure(conn.last_error)
+            raise RouterConnectError(f"Falha ao conectar API {host}:{port}: {conn.last_error}")
+        
+        self._increment_stat('total_connections')
+        self._update_active_connections()
+        logger.info(f"Nova conexão API criada para {host} (total no pool: {pool_size})")
+        return conn
+    
+    def _discard_connection(self, host_pool: _HostPool, connection: MikroTikAPIConnection):
+        """Remove conexão morta do pool e libera a vaga para a fila"""
+        with host_pool.lock:
+            if connection in host_pool.connections:
+                host_pool.connections.remove(connection)
+            host_pool.free_slot_for_waiter()
+        
+        connection.disconnect()
+        self._update_active_connections()
+    
+    def _record_wait(self, waiter: _PoolWaiter):
+        """Registra tempo de espera na fila"""
+        wait_time = time.time() - waiter.enqueued_at
+        with self.stats_lock:
+            self.stats['total_wait_time'] += wait_time
+            if wait_time > self.stats['max_wait_time']:
+                self.stats['max_wait_time'] = wait_time
+    
+    def _release_connection(self, connection: MikroTikAPIConnection, touch: bool = True):
+        """
+        Retorna conexão para o pool ou a entrega ao waiter mais antigo
+        
+        Args:
+            touch: Conta como uso (atualiza last_used); False para o keepalive
+        """
+        pool_key = self._get_pool_key(connection.host, connection.username, connection.port,
+                                      connection.use_ssl)
+        host_pool = self._get_host_pool(pool_key)
+        
+        if not connection.connected:
+            # Conexão morta: libera a vaga para o primeiro da fila criar outra
+            self._discard_connection(host_pool, connection)
+            return
+        
+        with host_pool.lock:
+            if host_pool.waiters:
+                # Handoff direto: a conexão continua ocupada, agora pelo waiter
+                waiter = host_pool.waiters.popleft()
+                waiter.connection = connection
+                connection.last_used = time.time()
+                waiter.event.set()
+            else:
+                connection.mark_available(touch)
+                return
+        
+        self._increment_stat('handoffs')
+    
+    def _ensure_health_checker(self):
+        """Inicia o health checker neste processo (threads não sobrevivem ao fork do gunicorn)"""
+        if self._health_pid == os.getpid():
+            return
+        if self.keepalive_interval <= 0 and not self.warm_targets:
+            return
+        
+        with self.pool_lock:
+            if self._health_pid == os.getpid():
+                return
             
-            raise Exception(f"Pool API lotado para {host} (max: {self.max_connections_per_host})")
+            self._health_stop.clear()
+            self._warming = set()  # Threads de aquecimento do processo pai não existem aqui
+            self._health_thread = threading.Thread(
+                target=self._health_check_loop,
+                name='mikrotik-pool-health',
+                daemon=True
+            )
+            self._health_pid = os.getpid()
+        
+        # Fora do lock: no worker gevent ele é um lock real (criado no master) e start() cede o greenlet
+        self._health_thread.start()
     
-    def _release_connection(self, connection: MikroTikAPIConnection):
-        """Retorna conexão para o pool"""
-        connection.mark_available()
+    def _health_check_loop(self):
+        """
+        Thread de manutenção do pool
+        
+        Repõe sessões dos roteadores aquecidos sempre que acordada (hot spare
+        consumido) e, a cada keepalive_interval, valida conexões ociosas e
+        remove as mortas ou ociosas demais.
+        """
+        next_keepalive = time.time() + self.keepalive_interval
+        
+        while not self._health_stop.is_set():
+            timeout = None
+            if self.keepalive_interval > 0:
+                timeout = max(0.0, next_keepalive - time.time())
+            
+            self._maintenance_wakeup.wait(timeout)
+            self._maintenance_wakeup.clear()
+            if self._health_stop.is_set():
+                break
+            
+            try:
+                if self.warm_targets:
+                    self.maintain_warm_pools()
+                
+                if self.keepalive_interval > 0 and time.time() >= next_keepalive:
+                    self.check_idle_connections()
+                    self.cleanup_idle_connections(self.max_idle_time)
+                    next_keepalive = time.time() + self.keepalive_interval
+            except Exception as e:
+                logger.error(f"Erro no health checker do pool API: {e}")
+    
+    def prewarm(self, entries: List[RouterInventoryEntry]):
+        """
+        Registra roteadores para manter aquecidos
+        
+        Não bloqueia: as sessões são abertas pela thread de manutenção deste
+        processo (no gunicorn, chamar em post_fork de cada worker).
+        """
+        with self.pool_lock:
+            for entry in entries:
+                pool_key = self._get_pool_key(entry.host, entry.username, entry.port, entry.use_ssl)
+                self.warm_targets[pool_key] = entry
+                self._warm_retry_at.pop(pool_key, None)
+        
+        self._ensure_health_checker()
+        self._maintenance_wakeup.set()
+        logger.info(f"Pré-aquecimento agendado para {len(entries)} roteadores")
+    
+    def maintain_warm_pools(self):
+        """
+        Abre as sessões que faltam para min_sessions/hot_spares de cada roteador aquecido
+        
+        Não espera as aberturas: um roteador inacessível (timeout de conexão) não
+        atrasa os demais nem o keepalive. Um pool com abertura em andamento fica
+        de fora até ela terminar.
+        """
+        now = time.time()
+        
+        with self.pool_lock:
+            targets = [
+                (pool_key, entry) for pool_key, entry in self.warm_targets.items()
+                if self._warm_retry_at.get(pool_key, 0) <= now and pool_key not in self._warming
+            ]
+        
+        for pool_key, entry in targets:
+            breaker = circuit_breakers.get(entry.host, entry.port)
+            if breaker.state == OPEN and breaker.retry_in() > 0:
+                continue
+            
+            host_pool = self._get_host_pool(pool_key)
+            
+            with host_pool.lock:
+                total = len(host_pool.connections) + host_pool.pending
+                idle = sum(1 for conn in host_pool.connections if conn.is_available())
+                missing = max(entry.min_sessions - total, entry.hot_spares - idle, 0)
+                missing = min(missing, self.max_connections_per_host - total)
+                if missing <= 0:
+                    continue
+                host_pool.pending += missing
+            
+            with self.pool_lock:
+                self._warming.add(pool_key)
+            threading.Thread(
+                target=self._warm_worker,
+                args=(pool_key, host_pool, entry, missing),
+                name='mikrotik-pool-prewarm',
+                daemon=True
+            ).start()
+    
+    def _warm_worker(self, pool_key: str, host_pool: _HostPool,
+                     entry: RouterInventoryEntry, reserved: int):
+        """Thread de aquecimento de um pool (libera o pool para o próximo ciclo ao terminar)"""
+        try:
+            self._open_warm_connections(pool_key, host_pool, entry, reserved)
+        except Exception as e:
+            logger.error(f"Erro no pré-aquecimento de {entry.host}:{entry.port}: {e}")
+        finally:
+            with self.pool_lock:
+                self._warming.discard(pool_key)
+    
+    def _open_warm_connections(self, pool_key: str, host_pool: _HostPool,
+                               entry: RouterInventoryEntry, reserved: int):
+        """Estabelece sessões em vagas já reservadas e as deixa disponíveis no pool"""
+        breaker = circuit_breakers.get(entry.host, entry.port)
+        opened = 0
+        
+        while opened < reserved:
+            conn = MikroTikAPIConnection(entry.host, entry.username, entry.password, entry.port,
+                                         use_ssl=entry.use_ssl)
+            if not conn.connect():
+                breaker.record_failure(conn.last_error)
+                break
+            breaker.record_success()
+            
+            with host_pool.lock:
+                host_pool.pending -= 1
+                conn.mark_busy()
+                host_pool.connections.append(conn)
+            
+            # Entrega a um waiter da fila ou marca como disponível
+            self._release_connection(conn)
+            opened += 1
+        
+        if opened < reserved:
+            with host_pool.lock:
+                for _ in range(reserved - opened):
+                    host_pool.pending -= 1
+                    host_pool.free_slot_for_waiter()
+            
+            # Roteador fora do ar: nova tentativa só no próximo ciclo de keepalive
+            with self.pool_lock:
+                self._warm_retry_at[pool_key] = time.time() + max(self.keepalive_interval, 5.0)
+            self._increment_stat('prewarm_failures')
+            logger.warning(f"Falha no pré-aquecimento de {entry.host}:{entry.port} "
+                           f"({opened}/{reserved} sessões abertas)")
+        
+        if opened:
+            with self.stats_lock:
+                self.stats['total_connections'] += opened
+                self.stats['prewarm_connections'] += opened
+            self._update_active_connections()
+            logger.debug(f"Pré-aquecimento: {opened} sessões abertas para {entry.host}:{entry.port}")
+    
+    def check_idle_connections(self):
+        """Executa keepalive nas conexões ociosas não validadas no último intervalo"""
+        with self.pool_lock:
+            host_pools = list(self.pools.values())
+        
+        for host_pool in host_pools:
+            to_check = []
+            
+            with host_pool.lock:
+                for conn in host_pool.connections:
+                    if conn.is_available() and not conn.is_fresh(self.keepalive_interval):
+                        conn.mark_busy()
+                        to_check.append(conn)
+            
+            # Round trip fora do lock; a conexão fica ocupada durante o teste
+            for conn in to_check:
+                self._increment_stat('keepalive_checks')
+                conn.last_keepalive = time.time()
+                if not conn.is_alive():
+                    self._increment_stat('keepalive_failures')
+                    logger.info(f"Keepalive falhou, removendo conexão API {conn.host}:{conn.port}")
+                # Keepalive não é uso: a sessão ociosa continua elegível para cleanup_idle_connections
+                self._release_connection(conn, touch=False)
+    
+    def stop_health_checker(self):
+        """Interrompe o health checker"""
+        self._health_stop.set()
+        self._maintenance_wakeup.set()
+        self._health_pid = None
     
     def execute_ping(self, host: str, username: str, password: str, address: str, 
-                    count: int = 4, size: int = 64, port: int = 8728) -> Dict[str, Any]:
+                    count: int = 4, size: int = 64, port: int = 8728,
+                    use_ssl: Optional[bool] = None) -> Dict[str, Any]:
         """Interface simplificada para ping"""
         
-        with self.get_connection(host, username, password, port) as conn:
+        with self.get_connection(host, username, password, port, use_ssl) as conn:
             return conn.execute_ping(address, count, size)
     
     def execute_batch_ping(self, host: str, username: str, password: str, addresses: List[str],
-                          count: int = 4, size: int = 64, port: int = 8728) -> Dict[str, Dict[str, Any]]:
+                          count: int = 4, size: int = 64, port: int = 8728,
+                          use_ssl: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
         """Interface simplificada para batch ping"""
         
-        with self.get_connection(host, username, password, port) as conn:
-            self.stats['batch_calls'] += 1
+        with self.get_connection(host, username, password, port, use_ssl) as conn:
+            self._increment_stat('batch_calls')
             return conn.execute_batch_ping(addresses, count, size)
     
     def execute_traceroute(self, host: str, username: str, password: str, address: str,
-                          max_hops: int = 30, port: int = 8728) -> Dict[str, Any]:
+                          max_hops: int = 30, port: int = 8728,
+                          use_ssl: Optional[bool] = None) -> Dict[str, Any]:
         """Interface simplificada para traceroute"""
         
-        with self.get_connection(host, username, password, port) as conn:
+        with self.get_connection(host, username, password, port, use_ssl) as conn:
             return conn.execute_traceroute(address, max_hops)
     
-    def test_connection(self, host: str, username: str, password: str, port: int = 8728) -> Dict[str, Any]:
+    def run_command(self, host: str, username: str, password: str, path: str,
+                    params: Optional[Dict[str, Any]] = None, port: int = 8728,
+                    use_ssl: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Interface simplificada para comandos arbitrários"""
+        
+        with self.get_connection(host, username, password, port, use_ssl) as conn:
+            return conn.run_command(path, params)
+    
+    def execute_menu_command(self, host: str, username: str, password: str, path: str,
+                             proplist: Optional[List[str]] = None, query: Optional[Any] = None,
+                             params: Optional[Dict[str, Any]] = None, port: int = 8728,
+                             use_ssl: Optional[bool] = None, max_rows: int = 0) -> Dict[str, Any]:
+        """Interface simplificada para comandos de menu com projeção/filtros"""
+        
+        with self.get_connection(host, username, password, port, use_ssl) as conn:
+            return conn.execute_menu_command(path, proplist, query, params, max_rows)
+    
+    def get_cpu_load(self, host: str, username: str, password: str, port: int = 8728,
+                     use_ssl: Optional[bool] = None) -> Optional[float]:
+        """Lê o cpu-load do roteador (sinal do limite adaptativo); None em caso de erro"""
+        try:
+            with self.get_connection(host, username, password, port, use_ssl) as conn:
+                resource = conn.get_system_resource()
+        except Exception as e:
+            logger.debug(f"Erro ao ler cpu-load de {host}:{port}: {e}")
+            return None
+        
+        return resource.get('cpu-load')
+    
+    def test_connection(self, host: str, username: str, password: str, port: int = 8728,
+                        use_ssl: Optional[bool] = None) -> Dict[str, Any]:
         """Testa conectividade API"""
         
         start_time = time.time()
+        use_ssl = resolve_use_ssl(port, use_ssl)
         
         try:
-            with self.get_connection(host, username, password, port) as conn:
+            with self.get_connection(host, username, password, port, use_ssl) as conn:
                 # Executa comando simples para testar
                 test_result = conn.execute_ping('8.8.8.8', 1)
                 
@@ -578,6 +1250,7 @@ class MikroTikAPIPool:
                     'method': 'api',
                     'host': host,
                     'port': port,
+                    'use_ssl': use_ssl,
                     'test_result': test_result
                 }
                 
@@ -590,6 +1263,7 @@ class MikroTikAPIPool:
                 'method': 'api',
                 'host': host,
                 'port': port,
+                'use_ssl': use_ssl,
                 'error': str(e)
             }
     
@@ -597,51 +1271,93 @@ class MikroTikAPIPool:
         """Retorna estatísticas do pool"""
         
         with self.pool_lock:
-            pool_details = {}
-            total_connections = 0
-            available_connections = 0
+            host_pools = list(self.pools.items())
+        
+        pool_details = {}
+        total_connections = 0
+        available_connections = 0
+        current_waiters = 0
+        
+        for pool_key, host_pool in host_pools:
+            with host_pool.lock:
+                total = len(host_pool.connections)
+                available = sum(1 for conn in host_pool.connections if conn.is_available())
+                waiting = len(host_pool.waiters)
+                connecting = host_pool.pending
             
-            for pool_key, pool in self.pools.items():
-                available = sum(1 for conn in pool if conn.is_available())
-                busy = len(pool) - available
-                
-                pool_details[pool_key] = {
-                    'total': len(pool),
-                    'available': available,
-                    'busy': busy
-                }
-                
-                total_connections += len(pool)
-                available_connections += available
-            
-            success_rate = 0
-            if self.stats['api_calls'] > 0:
-                success_rate = ((self.stats['api_calls'] - self.stats['failed_connections']) / 
-                               self.stats['api_calls'] * 100)
+            pool_details[pool_key] = {
+                'total': total,
+                'available': available,
+                'busy': total - available,
+                'connecting': connecting,
+                'waiting': waiting
+            }
             
-            reuse_rate = 0
-            if self.stats['total_connections'] > 0:
-                reuse_rate = (self.stats['reused_connections'] / 
-                             self.stats['total_connections'] * 100)
+            warm_entry = self.warm_targets.get(pool_key)
+            if warm_entry is not None:
+                pool_details[pool_key]['min_sessions'] = warm_entry.min_sessions
+                pool_details[pool_key]['hot_spares'] = warm_entry.hot_spares
             
-            return {
-                'pools': pool_details,
-                'global_stats': {
-                    'total_connections': total_connections,
-                    'available_connections': available_connections,
-                    'busy_connections': total_connections - available_connections,
-                    'api_calls': self.stats['api_calls'],
-                    'batch_calls': self.stats['batch_calls'],
-                    'failed_connections': self.stats['failed_connections'],
-                    'success_rate_percent': round(success_rate, 2),
-                    'reuse_rate_percent': round(reuse_rate, 2)
-                },
-                'performance': {
-                    'max_connections_per_host': self.max_connections_per_host,
-                    'library': 'librouteros',
-                    'connection_type': 'api_native'
-                }
+            total_connections += total
+            available_connections += available
+            current_waiters += waiting
+        
+        with self.stats_lock:
+            stats = dict(self.stats)
+        
+        success_rate = 0
+        if stats['api_calls'] > 0:
+            success_rate = ((stats['api_calls'] - stats['failed_connections']) / 
+                           stats['api_calls'] * 100)
+        
+        reuse_rate = 0
+        if stats['total_connections'] > 0:
+            reuse_rate = (stats['reused_connections'] / 
+                         stats['total_connections'] * 100)
+        
+        completed_waits = stats['waits'] - stats['wait_timeouts']
+        avg_wait = stats['total_wait_time'] / completed_waits if completed_waits > 0 else 0
+        
+        return {
+            'pools': pool_details,
+            'global_stats': {
+                'total_connections': total_connections,
+                'available_connections': available_connections,
+                'busy_connections': total_connections - available_connections,
+                'api_calls': stats['api_calls'],
+                'batch_calls': stats['batch_calls'],
+                'failed_connections': stats['failed_connections'],
+                'success_rate_percent': round(success_rate, 2),
+                'reuse_rate_percent': round(reuse_rate, 2)
+            },
+            'health': {
+                'freshness_window_seconds': self.freshness_window,
+                'keepalive_interval_seconds': self.keepalive_interval,
+                'fresh_reuses': stats['fresh_reuses'],
+                'inline_liveness_checks': stats['inline_liveness_checks'],
+                'keepalive_checks': stats['keepalive_checks'],
+                'keepalive_failures': stats['keepalive_failures']
+            },
+            'wait_queue': {
+                'current_waiters': current_waiters,
+                'waits': stats['waits'],
+                'wait_timeouts': stats['wait_timeouts'],
+                'handoffs': stats['handoffs'],
+                'avg_wait_ms': round(avg_wait * 1000, 2),
+                'max_wait_ms': round(stats['max_wait_time'] * 1000, 2),
+                'acquire_timeout_seconds': self.acquire_timeout
+            },
+            'prewarm': {
+                'targets': len(self.warm_targets),
+                'connections_opened': stats['prewarm_connections'],
+                'failures': stats['prewarm_failures']
+            },
+            'performance': {
+                'max_connections_per_host': self.max_connections_per_host,
+                'library': 'librouteros',
+                'connection_type': 'api_native'
             }
+        }
     
     def cleanup_idle_connections(self, max_idle_time: int = 300):
         """Remove conexões ociosas"""
@@ -649,35 +1365,103 @@ class MikroTikAPIPool:
         current_time = time.time()
         
         with self.pool_lock:
-            for pool_key, pool in self.pools.items():
-                active_connections = []
-                
-                for conn in pool:
+            host_pools = list(self.pools.items())
+        
+        for pool_key, host_pool in host_pools:
+            idle_connections = []
+            warm_entry = self.warm_targets.get(pool_key)
+            
+            with host_pool.lock:
+                for conn in host_pool.connections:
                     if conn.is_available() and (current_time - conn.last_used) > max_idle_time:
-                        logger.debug(f"Removendo conexão ociosa: {pool_key}")
-                        conn.disconnect()
-                    else:
-                        active_connections.append(conn)
+                        idle_connections.append(conn)
                 
-                self.pools[pool_key] = active_connections
+                if warm_entry is not None:
+                    # Roteadores aquecidos mantêm min_sessions e hot_spares
+                    available = sum(1 for conn in host_pool.connections if conn.is_available())
+                    removable = min(
+                        len(host_pool.connections) - warm_entry.min_sessions,
+                        available - warm_entry.hot_spares
+                    )
+                    idle_connections = idle_connections[:max(0, removable)]
+                
+                for conn in idle_connections:
+                    host_pool.connections.remove(conn)
             
-            self.stats['active_connections'] = sum(len(p) for p in self.pools.values())
+            # Desconecta fora do lock
+            for conn in idle_connections:
+                logger.debug(f"Removendo conexão ociosa: {pool_key}")
+                conn.disconnect()
+        
+        self._update_active_connections()
     
     def cleanup_all_connections(self):
         """Limpa todas as conexões"""
         
+        self.stop_health_checker()
+        
         with self.pool_lock:
-            for pool in self.pools.values():
-                for conn in pool:
-                    conn.disconnect()
-            
+            host_pools = list(self.pools.values())
             self.pools.clear()
+        
+        for host_pool in host_pools:
+            with host_pool.lock:
+                connections = list(host_pool.connections)
+                host_pool.connections.clear()
+            for conn in connections:
+                conn.disconnect()
+        
+        with self.stats_lock:
             self.stats['active_connections'] = 0
-            logger.info("Todas as conexões API foram limpas")
+        logger.info("Todas as conexões API foram limpas")
 
 
 # Instância global do pool
-mikrotik_api_pool = MikroTikAPIPool(max_connections_per_host=config.MAX_CONNECTIONS_PER_HOST)
+mikrotik_api_pool = MikroTikAPIPool(
+    max_connections_per_host=config.MAX_CONNECTIONS_PER_HOST,
+    acquire_timeout=config.API_POOL_ACQUIRE_TIMEOUT,
+    freshness_window=config.API_CONNECTION_FRESHNESS,
+    keepalive_interval=config.API_KEEPALIVE_INTERVAL,
+    max_idle_time=config.API_MAX_IDLE_TIME
+)
+
+
+# Sondas persistentes /tool/netwatch (usa o pool global)
+netwatch_manager = NetwatchManager(
+    mikrotik_api_pool,
+    enabled=config.NETWATCH_MODE,
+    probe_interval=config.NETWATCH_PROBE_INTERVAL,
+    collect_interval=config.NETWATCH_COLLECT_INTERVAL,
+    max_age=config.NETWATCH_MAX_AGE,
+    reconcile_interval=config.NETWATCH_RECONCILE_INTERVAL,
+    target_ttl=config.NETWATCH_TARGET_TTL,
+    owner_id=config.NETWATCH_OWNER_ID,
+    state_dir=config.NETWATCH_STATE_DIR
+)
+
+# Roteador voltou a responder (keepalive, pré-aquecimento, sonda): invalida o cache negativo
+circuit_breakers.add_recovery_listener(negative_cache.invalidate_router)
+
+
+def prewarm_from_inventory(path: Optional[str] = None) -> int:
+    """
+    Carrega o inventário de roteadores e agenda o pré-aquecimento do pool
+    
+    Returns:
+        Número de roteadores registrados (0 se não há inventário configurado)
+    """
+    path = path or config.ROUTER_INVENTORY_FILE
+    if not path:
+        return 0
+    
+    try:
+        entries = load_router_inventory(path)
+    except Exception as e:
+        logger.error(f"Erro ao carregar inventário de roteadores {path}: {e}")
+        return 0
+    
+    mikrotik_api_pool.prewarm(entries)
+    return len(entries)
 
 
 # Interface compatível com o sistema existente
@@ -689,18 +1473,32 @@ class MikroTikConnector:
         self.pools = {}  # {host_key: [MikroTikAPIConnection]}
         self.pool_lock = threading.RLock()
         
-        # Semáforos para controlar concorrência por host
-        self.host_semaphores = {}  # {host_key: threading.Semaphore}
+        # Executores (threads ou greenlets) criados por processo na primeira
+        # utilização: o monkey patching do worker gevent acontece após o import
+        self._executors_pid = None
+        self._executors_lock = threading.Lock()
+        self._thread_pool = None
+        self._refresh_pool = None
+        self._cache_pool = None
+        self.execution_mode = None
         
-        # Thread pool para operações paralelas
-        self.thread_pool = ThreadPoolExecutor(
-            max_workers=config.MAX_WORKERS,
-            thread_name_prefix='mikrotik-pool'
-        )
+        # Conexões do backend asyncio nativo: um pool por event loop
+        self._native_pools: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncRouterOSPool]' = \
+            weakref.WeakKeyDictionary()
+        self._native_pools_lock = threading.Lock()
+        
+        # Atualizações em background de pings servidos vencidos (stale-while-revalidate)
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_stats = {'started': 0, 'failed': 0}
+        
+        # Single-flight entre nós (locks no Redis): chaves esperadas de outro nó
+        self._remote_stats = {'waited': 0, 'served': 0, 'timed_out': 0}
         
         # Configurações
         self.max_connections_per_host = config.MAX_CONNECTIONS_PER_HOST
         self.max_concurrent_per_host = config.MAX_CONCURRENT_COMMANDS
+        self.api_backend = config.MIKROTIK_API_BACKEND
         
         # Estatísticas
         self.stats = {
@@ -719,16 +1517,80 @@ class MikroTikConnector:
         """Gera chave única para o pool"""
         return f"{host}:{port}:{username}"
     
-    def _get_host_semaphore(self, host_key: str) -> threading.Semaphore:
-        """Obtém semáforo para controlar concorrência por host"""
-        if host_key not in self.host_semaphores:
-            self.host_semaphores[host_key] = threading.Semaphore(self.max_concurrent_per_host)
-        return self.host_semaphores[host_key]
+    def _ensure_executors(self):
+        """Cria os executores do processo conforme MIKROTIK_EXECUTION_MODE"""
+        if self._executors_pid == os.getpid():
+            return
+        
+        with self._executors_lock:
+            if self._executors_pid == os.getpid():
+                return
+            
+            self.execution_mode = resolve_execution_mode(config.MIKROTIK_EXECUTION_MODE)
+            if self.execution_mode == GEVENT:
+                # I/O direto em greenlets sobre sockets patcheados, sem threads
+                self._thread_pool = GreenletExecutor(config.MAX_WORKERS, 'mikrotik-pool')
+                self._refresh_pool = None  # Atualizações rodam no event loop persistente
+                self._cache_pool = GreenletExecutor(config.REDIS_IO_WORKERS, 'cache-io')
+            else:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=config.MAX_WORKERS,
+                    thread_name_prefix='mikrotik-pool'
+                )
+                self._refresh_pool = ThreadPoolExecutor(
+                    max_workers=max(1, config.CACHE_REFRESH_WORKERS),
+                    thread_name_prefix='cache-refresh'
+                )
+                # Separado do mikrotik-pool: consultas ao cache não esperam atrás de pings
+                self._cache_pool = ThreadPoolExecutor(
+                    max_workers=max(1, config.REDIS_IO_WORKERS),
+                    thread_name_prefix='cache-io'
+                )
+            self._executors_pid = os.getpid()
+            logger.info(f"Modo de execução do conector: {self.execution_mode}")
+    
+    @property
+    def thread_pool(self):
+        """Executor das operações bloqueantes do librouteros (threads ou greenlets)"""
+        self._ensure_executors()
+        return self._thread_pool
     
-    def execute_command(self, host: str, username: str, password: str, command: str, port: int = 8728) -> Dict[str, Any]:
+    async def _cache_io(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executa uma operação do cache a partir do event loop
+        
+        Com camada remota (Redis, cliente síncrono) a chamada vai para o executor
+        cache-io; só L1/memória compartilhada roda direto no loop.
+        """
+        if not cache.remote_io:
+            return fn(*args, **kwargs)
+        self._ensure_executors()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cache_pool, functools.partial(fn, *args, **kwargs))
+    
+    def _native_pool(self) -> AsyncRouterOSPool:
+        """Pool de conexões nativas do event loop atual"""
+        loop = asyncio.get_running_loop()
+        native_pool = self._native_pools.get(loop)
+        if native_pool is None:
+            with self._native_pools_lock:
+                native_pool = self._native_pools.setdefault(loop, AsyncRouterOSPool(config.API_MAX_IDLE_TIME))
+        return native_pool
+    
+    def _get_host_limiter(self, host: str, port: int) -> AdaptiveLimiter:
+        """Obtém o limite adaptativo (AIMD) de comandos simultâneos do roteador"""
+        return adaptive_limits.get(host, port)
+    
+    def execute_command(self, host: str, username: str, password: str, command: str, port: int = 8728,
+                        parameters: Optional[Dict[str, Any]] = None,
+                        use_ssl: Optional[bool] = None) -> Dict[str, Any]:
         """
         Interface compatível que simula comandos SSH via API
         Mantém compatibilidade com o sistema existente
+        
+        Ping e traceroute retornam saída no formato SSH; demais caminhos de menu
+        (ex: '/ip/route/print') retornam linhas compactas em 'data', com
+        parameters 'proplist' e 'query' repassados ao roteador.
         """
         
         start_time = time.time()
@@ -745,7 +1607,8 @@ class MikroTikConnector:
                     ping_params['address'],
                     ping_params.get('count', 4),
                     ping_params.get('size', 64),
-                    port
+                    port,
+                    use_ssl
                 )
                 
                 # Converte resultado para formato SSH compatível
@@ -770,7 +1633,8 @@ class MikroTikConnector:
                     host, username, password,
                     trace_params['address'],
                     trace_params.get('max_hops', 30),
-                    port
+                    port,
+                    use_ssl
                 )
                 
                 # Converte resultado para formato SSH compatível
@@ -787,17 +1651,23 @@ class MikroTikConnector:
                 }
             
             else:
-                # Comando não suportado
-                return {
-                    'status': 'error',
-                    'output': '',
-                    'error': f'Comando não suportado: {command}',
-                    'exit_status': 1,
-                    'execution_time_seconds': time.time() - start_time,
-                    'timestamp': datetime.now().isoformat(),
-                    'method': 'api'
-                }
+                return self._execute_menu_command(host, username, password, command,
+                                                  parameters or {}, port, start_time, use_ssl)
                 
+        except CircuitOpenError as e:
+            # Falha rápida: roteador marcado como inacessível
+            return {
+                'status': 'error',
+                'output': '',
+                'error': str(e),
+                'error_type': 'router_unreachable',
+                'exit_status': 1,
+                'execution_time_seconds': 0,
+                'timestamp': datetime.now().isoformat(),
+                'method': 'api',
+                'cached': True
+            }
+            
         except Exception as e:
             return {
                 'status': 'error',
@@ -806,8 +1676,77 @@ class MikroTikConnector:
                 'exit_status': 1,
                 'execution_time_seconds': time.time() - start_time,
                 'timestamp': datetime.now().isoformat(),
+                'method': 'api',
+                **failure_fields(e)
+            }
+    
+    def _execute_menu_command(self, host: str, username: str, password: str, command: str,
+                              parameters: Dict[str, Any], port: int, start_time: float,
+                              use_ssl: Optional[bool] = None) -> Dict[str, Any]:
+        """Executa caminho de menu genérico (somente leitura, salvo COMMAND_ALLOW_WRITE)"""
+        path, params = self._parse_menu_command(command)
+        
+        params.update(parameters)
+        proplist = params.pop('proplist', None)
+        query = params.pop('query', None)
+        max_rows = config.COMMAND_MAX_ROWS
+        requested_rows = params.pop('max_rows', None)
+        if requested_rows:
+            max_rows = min(max_rows, int(requested_rows)) if max_rows else int(requested_rows)
+        
+        action = path.rsplit('/', 1)[-1]
+        if action not in READ_ONLY_ACTIONS and not config.COMMAND_ALLOW_WRITE:
+            return {
+                'status': 'error',
+                'output': '',
+                'error': f'Comando não permitido (somente leitura): {path}',
+                'exit_status': 1,
+                'execution_time_seconds': time.time() - start_time,
+                'timestamp': datetime.now().isoformat(),
                 'method': 'api'
             }
+        
+        api_result = mikrotik_api_pool.execute_menu_command(
+            host, username, password, path, proplist, query, params, port,
+            use_ssl=use_ssl, max_rows=max_rows
+        )
+        
+        return {
+            'status': 'success',
+            'output': '',
+            'error': '',
+            'exit_status': 0,
+            'data': api_result,
+            'execution_time_seconds': api_result['execution_time_seconds'],
+            'timestamp': datetime.now().isoformat(),
+            'method': 'api'
+        }
+    
+    def _parse_menu_command(self, command: str) -> Tuple[str, Dict[str, Any]]:
+        """Separa caminho de menu e atributos ('/ip route print count-only=' -> '/ip/route/print')"""
+        segments = []
+        params = {}
+        
+        for part in command.split():
+            if '=' in part:
+                key, _, value = part.partition('=')
+                params[key] = value
+            else:
+                segments.extend(segment for segment in part.split('/') if segment)
+        
+        return '/' + '/'.join(segments), params
+    
+    def _unreachable_results(self, targets: List[str], error: CircuitOpenError) -> List[Dict[str, Any]]:
+        """Resultados de falha rápida para targets de um roteador com circuito aberto"""
+        return [{
+            'target': target,
+            'status': 'error',
+            'error': str(error),
+            'error_type': 'router_unreachable',
+            'retry_in_seconds': error.result.get('retry_in_seconds', 0),
+            'execution_time_seconds': 0,
+            'cached': True
+        } for target in targets]
     
     def _parse_ping_command(self, command: str) -> Dict[str, Any]:
         """Extrai parâmetros do comando ping"""
@@ -888,37 +1827,461 @@ class MikroTikConnector:
         """Retorna estatísticas das conexões"""
         return mikrotik_api_pool.get_stats()
     
-    def test_connection(self, host: str, username: str, password: str, port: int = 8728) -> Dict[str, Any]:
-        """Testa conectividade"""
-        return mikrotik_api_pool.test_connection(host, username, password, port)
+    def test_connection(self, host: str, username: str, password: str, port: int = 8728,
+                        use_ssl: Optional[bool] = None) -> Dict[str, Any]:
+        """Testa conectividade (use_ssl=None deduz API-SSL pela porta)"""
+        return mikrotik_api_pool.test_connection(host, username, password, port, use_ssl)
     
     # ===== MÉTODOS ASYNC PARA ALTA CONCORRÊNCIA =====
     
     async def execute_batch_ping(self, host: str, username: str, password: str, 
                                  targets: List[str], count: int = 4, use_cache: bool = True,
-                                 port: int = 8728) -> List[Dict[str, Any]]:
-        """Executa batch de pings com máxima concorrência usando API"""
+                                 port: int = 8728, use_ssl: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Executa batch de pings multiplexados por conexão API
         
-        host_key = self._get_pool_key(host, username, port)
-        semaphore = self._get_host_semaphore(host_key)
+        Os targets são divididos em blocos de até MAX_COMMANDS_PER_CONNECTION e
+        cada bloco roda inteiro em uma única conexão (um .tag por ping).
         
-        async def single_ping_task(target: str) -> Dict[str, Any]:
-            """Task para ping individual"""
-            with semaphore:  # Controla concorrência por host
+        Com NETWATCH_MODE os targets são registrados como sondas netwatch no
+        roteador e respondidos pelo último snapshot; só os que ainda não
+        aparecem no snapshot são pingados diretamente.
+        
+        Com use_cache, targets com resultado válido em cache não são pingados; os
+        demais passam por single-flight (requisições simultâneas para o mesmo
+        router/target/count aguardam o ping já em andamento).
+        
+        Com CACHE_STALE_WHILE_REVALIDATE, resultados vencidos há menos de
+        CACHE_MAX_STALENESS são devolvidos na hora (stale=true) e atualizados
+        por uma única execução em background.
+        
+        Com REDIS_ENABLED o cache é consultado em uma única ida ao Redis e só um
+        nó do collector pinga cada target por vez (lock distribuído).
+        
+        Com PING_BATCH_WINDOW_MS, os targets restantes de requisições para o
+        mesmo roteador que chegam dentro da janela vão em um único batch.
+        """
+        
+        results = {}
+        stale_targets = []
+        if use_cache and config.ENABLE_SMART_CACHE and self._cache_policy('ping', '')[1] > 0:
+            results = await self._cache_io(self._cache_get_many, host, 'ping', targets,
+                                           allow_stale=True, port=port, count=count,
+                                           **self._credential_params(username, password, port, use_ssl))
+            stale_targets = [target for target, cached in results.items() if cached['stale']]
+        
+        if stale_targets:
+            self._schedule_ping_refresh(host, username, password, stale_targets, count, port, use_ssl)
+        
+        pending = [target for target in dict.fromkeys(targets) if target not in results]
+        if pending and use_cache and negative_cache.enabled:
+            pending = self._fill_negative_ping_results(host, username, password, pending,
+                                                       count, port, results)
+        if pending:
+            # Micro-batching: junta com pings de outras requisições para o mesmo roteador
+            results.update(await ping_batcher.submit(
+                (host, port, username, password, count, use_ssl), pending,
+                lambda batch: self._execute_coalesced_batch_ping(host, username, password, batch,
+                                                                 count, port, use_ssl)
+            ))
+        
+        return [results.get(target) or missing_result(target) for target in targets]
+    
+    def _fill_negative_ping_results(self, host: str, username: str, password: str,
+                                    targets: List[str], count: int, port: int,
+                                    results: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Responde com falhas recentes do cache negativo; retorna os targets a pingar"""
+        router_failure = negative_cache.get_router(host, port, username, password)
+        remaining = []
+        
+        for target in targets:
+            failure = router_failure or negative_cache.get_target(host, port, username, password,
+                                                                  target, count)
+            if failure is None:
+                remaining.append(target)
+            else:
+                results[target] = dict(failure, target=target, execution_time_seconds=0)
+        
+        return remaining
+    
+    def _store_ping_results(self, host: str, username: str, password: str,
+                            results: List[Dict[str, Any]], count: int, port: int,
+                            use_ssl: Optional[bool] = None):
+        """Falhas vão para o cache negativo (TTL da categoria); sucessos para o cache normal"""
+        successes = []
+        for result in results:
+            category = classify_failure(result, is_ping=True)
+            if category is not None and negative_cache.record(
+                category, host, port, result, username=username, password=password,
+                target=result['target'], count=count
+            ):
+                continue
+            if result['status'] == 'success':
+                successes.append(result)
+        
+        ttl = self._cache_policy('ping', '')[1]
+        if successes and ttl > 0:
+            # Uma única gravação por camada (pipeline no Redis)
+            credential_params = self._credential_params(username, password, port, use_ssl)
+            cache.set_many(host, 'ping', [
+                (result['target'], self._to_test_result(host, 'ping', result['target'], result, ttl))
+                for result in successes
+            ], ttl=ttl, port=port, count=count, **credential_params)
+    
+    def _schedule_ping_refresh(self, host: str, username: str, password: str,
+                               targets: List[str], count: int, port: int,
+                               use_ssl: Optional[bool] = None):
+        """Atualiza em background os pings servidos vencidos (uma execução por chave)"""
+        credential = tuple(self._credential_params(username, password, port, use_ssl).values())
+        keys = {target: ('ping', host, port, target, count, *credential)
+                for target in dict.fromkeys(targets)}
+        
+        with self._refresh_lock:
+            pending = [target for target, key in keys.items() if key not in self._refreshing]
+            self._refreshing.update(keys[target] for target in pending)
+            self._refresh_stats['started'] += len(pending)
+        
+        if not pending:
+            return
+        
+        def finished(error: Optional[BaseException]):
+            with self._refresh_lock:
+                if error is not None:
+                    self._refresh_stats['failed'] += len(pending)
+                self._refreshing.difference_update(keys[target] for target in pending)
+            if error is not None:
+                logger.warning(f"Erro ao atualizar pings vencidos de {host}:{port}: {error}")
+        
+        self._ensure_executors()
+        if self._refresh_pool is None:
+            # Modo gevent: asyncio.run não pode rodar em outro greenlet da mesma thread
+            future = background_loop.submit(self._execute_coalesced_batch_ping(
+                host, username, password, pending, count, port, use_ssl
+            ))
+            future.add_done_callback(
+                lambda done: finished(None if done.cancelled() else done.exception())
+            )
+            return
+        
+        def refresh():
+            """Roda o batch em um event loop próprio da thread de atualização"""
+            error = None
+            try:
+                asyncio.run(self._execute_coalesced_batch_ping(
+                    host, username, password, pending, count, port, use_ssl
+                ))
+            except Exception as e:
+                error = e
+            finally:
+                finished(error)
+        
+        self._refresh_pool.submit(refresh)
+    
+    async def _execute_coalesced_batch_ping(self, host: str, username: str, password: str,
+                                            targets: List[str], count: int, port: int,
+                                            use_ssl: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+        """Pinga apenas os targets sem execução em andamento e aguarda os demais"""
+        # Credencial na chave: quem erra a senha não recebe o resultado de outro chamador
+        credential_params = self._credential_params(username, password, port, use_ssl)
+        keys = {target: ('ping', host, port, target, count, *credential_params.values())
+                for target in targets}
+        leading = []
+        following = {}
+        
+        for target in targets:
+            future, leader = single_flight.begin(keys[target])
+            if leader:
+                leading.append(target)
+            else:
+                following[target] = future
+        
+        results = {}
+        if leading:
+            error = None
+            locks = {}
+            try:
+                probing = leading
+                if config.ENABLE_SMART_CACHE and self._cache_policy('ping', '')[1] > 0:
+                    # Entre nós: só pinga o que nenhum outro collector está pingando
+                    locks, remote = await self._claim_remote(host, 'ping', leading, port=port, count=count,
+                                                             **credential_params)
+                    results.update(remote)
+                    probing = [target for target in leading if target not in remote]
+                
+                if probing:
+                    probed = await self._probe_batch_ping(host, username, password, probing, count,
+                                                          port, use_ssl)
+                    for result in probed:
+                        results[result['target']] = result
+                    fresh = [result for result in probed if not result.get('cached')]
+                    await self._cache_io(self._store_ping_results, host, username, password,
+                                         fresh, count, port, use_ssl)
+                    if any(result['status'] == 'success' for result in fresh):
+                        # Roteador respondeu: descarta falhas de conexão/login em cache
+                        negative_cache.invalidate_router(f"{host}:{port}")
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Depois de gravar no cache: quem espera o lock encontra o resultado
+                if locks:
+                    await self._cache_io(cache.release_locks, host, 'ping', locks, port=port, count=count,
+                                         **credential_params)
+                for target in leading:
+                    single_flight.finish(keys[target], results.get(target), error)
+        
+        for target, future in following.items():
+            results[target] = dict(await single_flight.wait(future), coalesced=True)
+        
+        return results
+    
+    async def _claim_remote(self, host: str, test_type: str, targets: List[str],
+                            **params) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]]]:
+        """
+        Trava os targets entre nós e aguarda os que outro nó já está executando
+        
+        A espera consulta o cache a cada REDIS_LOCK_POLL_INTERVAL até
+        REDIS_LOCK_TTL; o lock de um nó que caiu expira e é retomado aqui.
+        
+        Returns:
+            Tupla (locks obtidos, resultados vindos de outro nó)
+        """
+        locks = await self._cache_io(cache.acquire_locks, host, test_type, targets,
+                                     config.REDIS_LOCK_TTL, **params)
+        waiting = [target for target in targets if target not in locks]
+        if not waiting:
+            return locks, {}
+        
+        with self.stats_lock:
+            self._remote_stats['waited'] += len(waiting)
+        
+        remote = {}
+        deadline = time.monotonic() + config.REDIS_LOCK_TTL
+        while waiting and time.monotonic() < deadline:
+            await asyncio.sleep(config.REDIS_LOCK_POLL_INTERVAL)
+            remote.update(await self._cache_io(self._cache_get_many, host, test_type, waiting,
+                                               track=False, **params))
+            waiting = [target for target in waiting if target not in remote]
+            if waiting:
+                # Lock expirado (dono caiu ou não gravou): assume a execução
+                acquired = await self._cache_io(cache.acquire_locks, host, test_type, waiting,
+                                                config.REDIS_LOCK_TTL, **params)
+                locks.update(acquired)
+                waiting = [target for target in waiting if target not in acquired]
+        
+        with self.stats_lock:
+            self._remote_stats['served'] += len(remote)
+            self._remote_stats['timed_out'] += len(waiting)
+        return locks, remote
+    
+    async def _probe_batch_ping(self, host: str, username: str, password: str,
+                                targets: List[str], count: int = 4, port: int = 8728,
+                                use_ssl: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Pinga via snapshot netwatch (se ativo) e/ou diretamente no roteador"""
+        
+        if netwatch_manager.enabled:
+            netwatch_manager.register_targets(host, username, password, targets, port, use_ssl)
+            snapshot_results = netwatch_manager.get_ping_results(host, username, password, targets,
+                                                                   port, use_ssl)
+            live_targets = [target for target in targets if target not in snapshot_results]
+            
+            live_results = {}
+            if live_targets:
+                for result in await self._execute_live_batch_ping(
+                    host, username, password, live_targets, count, port, use_ssl
+                ):
+                    live_results[result['target']] = result
+            
+            return [snapshot_results.get(target) or live_results.get(target) or missing_result(target)
+                    for target in targets]
+        
+        return await self._execute_live_batch_ping(host, username, password, targets, count,
+                                                   port, use_ssl)
+    
+    async def _execute_live_batch_ping(self, host: str, username: str, password: str,
+                                       targets: List[str], count: int = 4, port: int = 8728,
+                                       use_ssl: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """Executa os pings diretamente no roteador (backend thread pool ou asyncio)"""
+        
+        if self.api_backend == 'asyncio':
+            return await self._execute_native_batch_ping(host, username, password, targets, count,
+                                                         port, use_ssl)
+        
+        breaker = circuit_breakers.get(host, port)
+        if breaker.state == OPEN and breaker.retry_in() > 0:
+            # Circuito aberto: nem ocupa threads do executor
+            return self._unreachable_results(targets, CircuitOpenError(
+                breaker.router, breaker.retry_in(), breaker.unreachable_result()
+            ))
+        
+        limiter = self._get_host_limiter(host, port)
+        chunk_size = max(1, min(config.MAX_COMMANDS_PER_CONNECTION, limiter.current_limit))
+        chunks = [targets[i:i + chunk_size] for i in range(0, len(targets), chunk_size)]
+        
+        def run_chunk(chunk: List[str]) -> Dict[str, Dict[str, Any]]:
+            """Executa um bloco de pings em uma conexão do pool (thread do executor)"""
+            limiter.acquire(len(chunk))  # Limite adaptativo de comandos por roteador
+            latency = None
+            timed_out = False
+            
+            with self.stats_lock:
+                self.stats['concurrent_requests'] += len(chunk)
+                if self.stats['concurrent_requests'] > self.stats['peak_concurrent']:
+                    self.stats['peak_concurrent'] = self.stats['concurrent_requests']
+            
+            try:
+                if limiter.cpu_sample_due(config.ADAPTIVE_CPU_SAMPLE_INTERVAL):
+                    limiter.record_cpu_load(
+                        mikrotik_api_pool.get_cpu_load(host, username, password, port, use_ssl)
+                    )
+                
+                start_time = time.time()
+                results = mikrotik_api_pool.execute_batch_ping(
+                    host, username, password, chunk, count, 64, port, use_ssl
+                )
+                
+                timed_out = any(result.get('transport_error') or result.get('timed_out')
+                                for result in results.values())
+                # O bloco dura o ping mais lento: qualquer target com perda invalida a amostra
+                samples = [ping_latency_sample(result.get('data'), time.time() - start_time, count)
+                           for result in results.values()]
+                if samples and None not in samples:
+                    latency = max(samples)
+                return results
+            except CircuitOpenError:
+                raise
+            except Exception:
+                timed_out = True
+                raise
+            finally:
+                limiter.release(len(chunk), latency, timed_out)
                 with self.stats_lock:
-                    self.stats['concurrent_requests'] += 1
-                    if self.stats['concurrent_requests'] > self.stats['peak_concurrent']:
-                        self.stats['peak_concurrent'] = self.stats['concurrent_requests']
+                    self.stats['concurrent_requests'] -= len(chunk)
+        
+        # Executa todos os blocos simultaneamente
+        loop = asyncio.get_running_loop()
+        tasks = [loop.run_in_executor(self.thread_pool, run_chunk, chunk) for chunk in chunks]
+        chunk_results = await asyncio.gather(*tasks, return_exceptions=True)
+        adaptive_limits.maybe_save()
+        
+        # Converte resultados por endereço para a lista no formato da API
+        processed_results = []
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            if isinstance(chunk_result, CircuitOpenError):
+                processed_results.extend(self._unreachable_results(chunk, chunk_result))
+                continue
+            
+            for target in chunk:
+                if isinstance(chunk_result, Exception):
+                    result = {'status': 'error', 'error': str(chunk_result), **failure_fields(chunk_result)}
+                else:
+                    result = chunk_result.get(target) or missing_result(target)
+                
+                if result['status'] == 'success':
+                    processed_results.append({
+                        'target': target,
+                        'status': 'success',
+                        'data': result['data'],
+                        'execution_time_seconds': result['data'].get('execution_time_seconds', 0),
+                        'cached': False
+                    })
+                else:
+                    processed_results.append({
+                        'target': target,
+                        'status': 'error',
+                        'error': result.get('error', 'Erro desconhecido'),
+                        'execution_time_seconds': 0,
+                        'cached': False,
+                        **{field: result[field] for field in ('transport_error', 'trap', 'error_type')
+                           if result.get(field)}
+                    })
+        
+        return processed_results
+    
+    async def _execute_native_batch_ping(self, host: str, username: str, password: str,
+                                         targets: List[str], count: int = 4, port: int = 8728,
+                                         use_ssl: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Executa o batch em uma conexão nativa asyncio com pings multiplexados
+        
+        A conexão autenticada fica no pool do event loop (chave do
+        MikroTikAPIPool + hash da credencial) e é reutilizada pelos próximos
+        batches do mesmo roteador.
+        """
+        
+        breaker = circuit_breakers.get(host, port)
+        try:
+            breaker.check()
+        except CircuitOpenError as e:
+            return self._unreachable_results(targets, e)
+        
+        ssl_enabled = resolve_use_ssl(port, use_ssl)
+        ssl_context = None
+        server_hostname = None
+        if ssl_enabled:
+            ssl_context = tls_sessions.context
+            server_hostname = host if tls_sessions.verify else None
+        
+        async def connect() -> AsyncRouterOSConnection:
+            """TCP (+TLS) e login com retentativas; a última falha é propagada"""
+            breaker.check()  # Quem esperava outro connect não repete um roteador já condenado
+            for attempt in range(config.MIKROTIK_MAX_RETRIES + 1):
+                connection = AsyncRouterOSConnection(host, username, password, port,
+                                                     timeout=config.MIKROTIK_API_TIMEOUT,
+                                                     ssl_context=ssl_context,
+                                                     server_hostname=server_hostname)
+                try:
+                    await connection.connect()
+                    if connection.tls_handshake_time is not None:
+                        # asyncio não permite informar a SSLSession: handshake sempre completo
+                        tls_sessions.record_handshake(host, port, connection.tls_handshake_time, False)
+                    return connection
+                except RouterOSTrapError as e:
+                    # Login recusado: sem retentativa e fora do circuit breaker
+                    raise RouterAuthError(f"Login recusado por {host}:{port}: {e}") from e
+                except Exception as e:
+                    if attempt == config.MIKROTIK_MAX_RETRIES or not breaker.try_retry():
+                        breaker.record_failure(e)
+                        raise
                 
+                await asyncio.sleep(jittered_backoff(attempt, 0.2, 2.0))
+        
+        native_pool = self._native_pool()
+        pool_key = (f"{mikrotik_api_pool._get_pool_key(host, username, port, ssl_enabled)}:"
+                    f"{credential_hash(username, password)}")
+        try:
+            connection = await native_pool.acquire(pool_key, connect)
+        except CircuitOpenError as e:
+            return self._unreachable_results(targets, e)
+        except Exception as e:
+            return [{
+                'target': target,
+                'status': 'error',
+                'error': str(e),
+                'execution_time_seconds': 0,
+                'cached': False,
+                **failure_fields(e)
+            } for target in targets]
+        
+        limiter = self._get_host_limiter(host, port)
+        in_flight = asyncio.Semaphore(max(1, config.MAX_COMMANDS_PER_CONNECTION))
+        stalled = False  # Comando sem resposta: a sessão pode estar morta sem o TCP saber
+        
+        async def single_ping_task(target: str) -> Dict[str, Any]:
+            """Task para ping individual (um .tag na conexão compartilhada)"""
+            nonlocal stalled
+            async with in_flight:
+                await limiter.acquire_async()
+                start_time = time.time()
+                latency = None
+                timed_out = False
                 try:
-                    # Executa ping em thread pool para não bloquear async
-                    loop = asyncio.get_event_loop()
-                    result = await loop.run_in_executor(
-                        self.thread_pool,
-                        mikrotik_api_pool.execute_ping,
-                        host, username, password, target, count, 64, port
+                    ping_results = await connection.talk(
+                        '/ping', address=target, count=count, size=64, interval=1
                     )
-                    
+                    execution_time = time.time() - start_time
+                    result = MikroTikAPIConnection._process_ping_results(ping_results, execution_time)
+                    latency = ping_latency_sample(result, execution_time, count)
                     return {
                         'target': target,
                         'status': 'success',
@@ -926,65 +2289,191 @@ class MikroTikConnector:
                         'execution_time_seconds': result.get('execution_time_seconds', 0),
                         'cached': False
                     }
-                    
                 except Exception as e:
+                    # !trap (ex: endereço inválido) não indica sobrecarga do roteador
+                    timed_out = not isinstance(e, RouterOSTrapError)
+                    stalled = stalled or isinstance(e, RouterOSTimeoutError)
                     return {
                         'target': target,
                         'status': 'error',
                         'error': str(e),
                         'execution_time_seconds': 0,
-                        'cached': False
+                        'cached': False,
+                        **failure_fields(e)
                     }
                 finally:
-                    with self.stats_lock:
-                        self.stats['concurrent_requests'] -= 1
+                    limiter.release(1, latency, timed_out)
         
-        # Executa TODOS os pings simultaneamente
-        tasks = [single_ping_task(target) for target in targets]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if limiter.cpu_sample_due(config.ADAPTIVE_CPU_SAMPLE_INTERVAL):
+            try:
+                resources = await connection.talk('/system/resource/print')
+                limiter.record_cpu_load(resources[0].get('cpu-load') if resources else None)
+            except Exception as e:
+                logger.debug(f"Erro ao ler cpu-load de {host}:{port}: {e}")
         
-        # Processa exceções
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                processed_results.append({
-                    'target': targets[i],
-                    'status': 'error',
-                    'error': str(result),
-                    'execution_time_seconds': 0
-                })
+        try:
+            with self.stats_lock:
+                self.stats['concurrent_requests'] += len(targets)
+                if self.stats['concurrent_requests'] > self.stats['peak_concurrent']:
+                    self.stats['peak_concurrent'] = self.stats['concurrent_requests']
+            
+            return list(await asyncio.gather(*[single_ping_task(target) for target in targets]))
+        finally:
+            with self.stats_lock:
+                self.stats['concurrent_requests'] -= len(targets)
+            adaptive_limits.maybe_save()
+            if connection.connected:
+                breaker.record_success()
             else:
-                processed_results.append(result)
-        
-        return processed_results
+                breaker.record_failure(f"Conexão perdida com {host}:{port}")
+            await native_pool.release(pool_key, connection, discard=stalled)
     
     async def execute_single_command(self, host: str, username: str, password: str,
                                      command: str, parameters: Dict = None, use_cache: bool = True,
-                                     port: int = 8728) -> Dict[str, Any]:
-        """Executa comando único de forma assíncrona"""
+                                     port: int = 8728, use_ssl: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Executa comando único de forma assíncrona
         
-        loop = asyncio.get_event_loop()
+        Comandos com TTL na política (cache_policy, padrão CACHE_COMMANDS) são
+        servidos do cache; comandos de leitura idênticos e simultâneos
+        compartilham uma única execução (single-flight).
+        """
         
+        loop = asyncio.get_running_loop()
+        parameters = parameters or {}
+        path = self._parse_menu_command(command)[0]
+        cacheable = config.ENABLE_SMART_CACHE and self._cache_policy('command', path)[1] > 0
+        credential_params = self._credential_params(username, password, port, use_ssl)
+        cache_params = {'port': port, 'command': command, 'parameters': parameters, **credential_params}
+        
+        if cacheable and use_cache:
+            cached = await self._cache_io(self._cache_get, host, 'command', path, **cache_params)
+            if cached is not None:
+                return cached
+        
+        if use_cache:
+            failure = negative_cache.get_router(host, port, username, password)
+            if failure is not None:
+                return dict(failure, execution_time_seconds=0)
+        
+        key = None
+        if self._is_read_only_command(command, path):
+            key = ('command', host, port, command, json.dumps(parameters, sort_keys=True, default=str),
+                   *credential_params.values())
+            future, leader = single_flight.begin(key)
+            if not leader:
+                return dict(await single_flight.wait(future), coalesced=True)
+        
+        result = None
+        locks = {}
         try:
+            if cacheable and key is not None:
+                # Entre nós: aguarda o resultado se outro collector já executa o comando
+                locks, remote = await self._claim_remote(host, 'command', [path], **cache_params)
+                if path in remote:
+                    result = remote[path]
+                    return result
+            
             # Executa comando em thread pool para não bloquear async
             result = await loop.run_in_executor(
                 self.thread_pool,
                 self.execute_command,
-                host, username, password, command, port
+                host, username, password, command, port, parameters, use_ssl
             )
             
-            return result
+            if cacheable and result.get('status') == 'success':
+                await self._cache_io(self._cache_set, host, 'command', path, result, **cache_params)
+            
+            if result.get('status') == 'success':
+                negative_cache.invalidate_router(f"{host}:{port}")
+            elif not result.get('cached'):
+                category = classify_failure(result)
+                if category is not None and category != TARGET_UNREACHABLE:
+                    negative_cache.record(category, host, port, result,
+                                          username=username, password=password)
             
         except Exception as e:
-            return {
+            result = {
                 'status': 'error',
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                **failure_fields(e)
             }
+        
+        finally:
+            if locks:
+                await self._cache_io(cache.release_locks, host, 'command', locks, **cache_params)
+            if key is not None:
+                # Sem resultado aqui só se a task foi cancelada
+                single_flight.finish(key, result, None if result is not None else asyncio.CancelledError())
+        
+        return result
+    
+    def _is_read_only_command(self, command: str, path: str) -> bool:
+        """Ping/traceroute ou ação de leitura (seguro para single-flight)"""
+        if '/ping' in command or 'traceroute' in command:
+            return True
+        return path.rsplit('/', 1)[-1] in READ_ONLY_ACTIONS
+    
+    @staticmethod
+    def _credential_params(username: str, password: str, port: int,
+                           use_ssl: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Parâmetros de chave (cache e single-flight) que separam credenciais e API-SSL
+        
+        Resultado obtido com uma credencial nunca é servido a outra: senha
+        errada recebe a falha de login, não o sucesso de outro chamador.
+        """
+        return {'credential': credential_hash(username, password), 'ssl': resolve_use_ssl(port, use_ssl)}
+    
+    def _cache_policy(self, test_type: str, target: str) -> Tuple[str, float]:
+        """Classe e TTL do resultado (comandos são classificados pelo caminho de menu)"""
+        return ttl_policy.resolve(test_type, target if test_type == 'command' else None)
+    
+    def _cache_get(self, host: str, test_type: str, target: str, allow_stale: bool = False,
+                   **params) -> Optional[Dict[str, Any]]:
+        """Resultado em cache (marcado como cached, com idade e se está vencido) ou None"""
+        return self._cache_get_many(host, test_type, [target], allow_stale=allow_stale,
+                                    **params).get(target)
+    
+    def _cache_get_many(self, host: str, test_type: str, targets: List[str],
+                        allow_stale: bool = False, track: bool = True,
+                        **params) -> Dict[str, Dict[str, Any]]:
+        """Resultados em cache por target (uma consulta por camada externa)"""
+        cache_class = self._cache_policy(test_type, targets[0] if targets else '')[0]
+        found = cache.lookup_many(host, test_type, targets, allow_stale=allow_stale,
+                                  cache_class=cache_class, track=track, **params)
+        return {
+            target: dict(entry.results, cached=True, stale=stale, cache_age_seconds=round(age, 3),
+                         execution_time_seconds=0)
+            for target, (entry, age, stale) in found.items()
+        }
+    
+    def _cache_set(self, host: str, test_type: str, target: str, result: Dict[str, Any], **params):
+        """Armazena o resultado de um teste no cache com o TTL da sua classe"""
+        ttl = self._cache_policy(test_type, target)[1]
+        cache.set(host, test_type, target, self._to_test_result(host, test_type, target, result, ttl),
+                  ttl=ttl, **params)
+    
+    @staticmethod
+    def _to_test_result(host: str, test_type: str, target: str, result: Dict[str, Any],
+                        ttl: float) -> TestResult:
+        """Envelope TestResult de um resultado do conector"""
+        return TestResult(
+            status=result['status'],
+            test_type=test_type,
+            timestamp=datetime.now().isoformat(),
+            cache_hit=False,
+            cache_ttl=int(ttl),
+            mikrotik_host=host,
+            target=target,
+            results=result,
+            execution_time_seconds=result.get('execution_time_seconds', 0)
+        )
     
     async def execute_batch_commands(self, host: str, username: str, password: str,
                                      commands: List[Dict], max_concurrent: int = None,
-                                     port: int = 8728) -> List[Dict[str, Any]]:
+                                     port: int = 8728, use_ssl: Optional[bool] = None) -> List[Dict[str, Any]]:
         """Executa múltiplos comandos simultaneamente"""
         
         if max_concurrent is None:
@@ -1000,7 +2489,7 @@ class MikroTikConnector:
                 parameters = cmd_info.get('parameters', {})
                 
                 return await self.execute_single_command(
-                    host, username, password, command, parameters, port=port
+                    host, username, password, command, parameters, port=port, use_ssl=use_ssl
                 )
         
         # Executa todos os comandos simultaneamente
@@ -1039,7 +2528,8 @@ class MikroTikConnector:
                     host_config['password'],
                     command,
                     parameters,
-                    port=host_config.get('port', 8728)
+                    port=host_config.get('port', 8728),
+                    use_ssl=host_config.get('use_ssl')
                 )
         
         # Executa em todos os hosts simultaneamente
@@ -1059,10 +2549,34 @@ class MikroTikConnector:
     
     async def close_all_connections(self):
         """Fecha todas as conexões e limpa recursos"""
+        netwatch_manager.stop()
+        cache.save_snapshot()
+        cache.stop()
+        if self._executors_pid == os.getpid():
+            if self._refresh_pool is not None:
+                self._refresh_pool.shutdown(wait=False)
+            self._cache_pool.shutdown(wait=False)
         mikrotik_api_pool.cleanup_all_connections()
-        self.thread_pool.shutdown(wait=True)
+        await self._close_native_pools()
+        adaptive_limits.save()
+        if self._executors_pid == os.getpid():
+            self._thread_pool.shutdown(wait=True)
         logger.info("Todas as conexões e recursos foram fechados")
     
+    async def _close_native_pools(self):
+        """Fecha as conexões nativas de todos os event loops"""
+        with self._native_pools_lock:
+            native_pools = list(self._native_pools.items())
+            self._native_pools.clear()
+        
+        current = asyncio.get_running_loop()
+        for loop, native_pool in native_pools:
+            if loop is current:
+                await native_pool.close_all()
+            elif loop.is_running():
+                # Streams só podem ser fechados no loop dono
+                asyncio.run_coroutine_threadsafe(native_pool.close_all(), loop)
+    
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas completas do conector"""
         base_stats = mikrotik_api_pool.get_stats()
@@ -1073,16 +2587,46 @@ class MikroTikConnector:
                 'peak_concurrent_requests': self.stats['peak_concurrent'],
                 'max_concurrent_per_host': self.max_concurrent_per_host,
                 'max_connections_per_host': self.max_connections_per_host,
-                'thread_pool_workers': config.MAX_WORKERS
+                'thread_pool_workers': config.MAX_WORKERS,
+                'api_backend': self.api_backend
             }
         
+        self._ensure_executors()
+        base_stats['execution'] = {'mode': self.execution_mode}
+        if self.execution_mode == GEVENT:
+            base_stats['execution']['greenlets'] = greenlet_count()
+            base_stats['execution']['pool'] = self._thread_pool.get_stats()
+        
+        if self.api_backend == 'asyncio':
+            with self._native_pools_lock:
+                native_pools = list(self._native_pools.values())
+            base_stats['native_pool'] = {}
+            for native_pool in native_pools:
+                for name, value in native_pool.get_stats().items():
+                    base_stats['native_pool'][name] = base_stats['native_pool'].get(name, 0) + value
+        
+        base_stats['circuit_breakers'] = circuit_breakers.get_stats()
+        base_stats['adaptive_limits'] = adaptive_limits.get_stats()
+        base_stats['tls'] = tls_sessions.get_stats()
+        base_stats['netwatch'] = netwatch_manager.get_stats()
+        base_stats['cache'] = cache.get_stats()
+        base_stats['cache']['ttl_policy'] = ttl_policy.get_stats()
+        base_stats['negative_cache'] = negative_cache.get_stats()
+        with self._refresh_lock:
+            base_stats['cache']['background_refresh'] = {
+                'in_flight': len(self._refreshing),
+                'started': self._refresh_stats['started'],
+                'failed': self._refresh_stats['failed']
+            }
+        base_stats['single_flight'] = single_flight.get_stats()
+        with self.stats_lock:
+            base_stats['single_flight']['remote'] = dict(self._remote_stats)
+        base_stats['micro_batch'] = ping_batcher.get_stats()
         return base_stats
     
-    def clear_cache(self):
-        """Limpa cache (compatibilidade)"""
-        # Cache é gerenciado pelo pool de conexões
-        mikrotik_api_pool.cleanup_idle_connections(max_idle_time=0)
-        logger.info("Cache limpo - conexões ociosas removidas")
+    def clear_cache(self) -> int:
+        """Limpa o cache de resultados (incluindo o cache negativo)"""
+        return cache.clear() + negative_cache.clear()
 
 
 # Instância global do conector otimizado
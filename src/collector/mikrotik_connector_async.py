@@ -15,6 +15,7 @@ import threading
 from concurrent.futures import ThreadPoolExecutor
 import librouteros
 from sentinel_config import config
+from routeros_api import AsyncRouterOSConnection
 
 logger = logging.getLogger('sentinel-mikrotik-async')
 
@@ -107,6 +108,41 @@ class AsyncMikroTikConnector:
                 'execution_time_seconds': 0
             }
     
+    async def _native_ping_operation(self, conn_info: MikroTikConnectionInfo, target: str, count: int,
+                                     connection: Optional[AsyncRouterOSConnection] = None) -> Dict[str, Any]:
+        """
+        Operação de ping usando o cliente RouterOS asyncio nativo (sem thread pool)
+        
+        Se uma conexão compartilhada for informada, o ping é multiplexado nela
+        (.tag) em vez de abrir uma conexão própria.
+        """
+        try:
+            start_time = time.time()
+            
+            if connection is not None:
+                results = await connection.talk('/ping', address=target, count=count)
+            else:
+                async with AsyncRouterOSConnection(
+                    conn_info.host, conn_info.username, conn_info.password,
+                    conn_info.port, timeout=config.MIKROTIK_API_TIMEOUT
+                ) as connection:
+                    results = await connection.talk('/ping', address=target, count=count)
+            
+            execution_time = time.time() - start_time
+            return self._process_ping_results(results, execution_time, target)
+            
+        except Exception as e:
+            logger.error(f"Erro no ping nativo {conn_info.host} -> {target}: {e}")
+            return {
+                'target': target,
+                'status': 'error',
+                'error': str(e),
+                'packets_sent': 0,
+                'packets_received': 0,
+                'packet_loss_percent': 100.0,
+                'execution_time_seconds': 0
+            }
+    
     def _process_ping_results(self, results: List[Dict], execution_time: float, target: str) -> Dict[str, Any]:
         """Processa resultados do ping"""
         if not results:
@@ -157,7 +193,8 @@ class AsyncMikroTikConnector:
         }
     
     async def execute_single_ping(self, host: str, username: str, password: str, 
-                                  target: str, count: int = 4, port: int = 8728) -> Dict[str, Any]:
+                                  target: str, count: int = 4, port: int = 8728,
+                                  connection: Optional[AsyncRouterOSConnection] = None) -> Dict[str, Any]:
         """Executa ping único de forma assíncrona"""
         host_key = self._get_host_key(host, username, port)
         semaphore = self._get_semaphore(host_key)
@@ -171,9 +208,12 @@ class AsyncMikroTikConnector:
             
             try:
                 conn_info = MikroTikConnectionInfo(host, username, password, port)
-                result = await self._execute_sync_operation(
-                    self._sync_ping_operation, conn_info, target, count
-                )
+                if config.MIKROTIK_API_BACKEND == 'asyncio':
+                    result = await self._native_ping_operation(conn_info, target, count, connection)
+                else:
+                    result = await self._execute_sync_operation(
+                        self._sync_ping_operation, conn_info, target, count
+                    )
                 
                 with self.stats_lock:
                     self.stats['successful_requests'] += 1
@@ -200,14 +240,35 @@ class AsyncMikroTikConnector:
         """Executa múltiplos pings SIMULTANEAMENTE"""
         start_time = time.time()
         
+        # Backend nativo: todos os pings multiplexados em uma única conexão
+        shared_connection = None
+        if config.MIKROTIK_API_BACKEND == 'asyncio':
+            shared_connection = AsyncRouterOSConnection(
+                host, username, password, port, timeout=config.MIKROTIK_API_TIMEOUT
+            )
+            try:
+                await shared_connection.connect()
+            except Exception as e:
+                logger.error(f"Erro ao conectar API nativa {host}:{port}: {e}")
+                return [{
+                    'target': target,
+                    'status': 'error',
+                    'error': str(e),
+                    'execution_time_seconds': 0
+                } for target in targets]
+        
         # Cria tasks para todos os pings simultaneamente
         tasks = []
         for target in targets:
-            task = self.execute_single_ping(host, username, password, target, count, port)
+            task = self.execute_single_ping(host, username, password, target, count, port, shared_connection)
             tasks.append(task)
         
         # Executa TODOS os pings em paralelo
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if shared_connection is not None:
+                await shared_connection.close()
         
         # Processa exceções
         processed_results = []
@@ -284,7 +345,11 @@ class AsyncMikroTikConnector:
                 return identity
             
             start_time = time.time()
-            identity = await self._execute_sync_operation(sync_test)
+            if config.MIKROTIK_API_BACKEND == 'asyncio':
+                async with AsyncRouterOSConnection(host, username, password, port, timeout=10) as connection:
+                    identity = (await connection.talk('/system/identity/print'))[0]
+            else:
+                identity = await self._execute_sync_operation(sync_test)
             execution_time = time.time() - start_time
             
             return {
@@ -321,7 +386,8 @@ class AsyncMikroTikConnector:
                     host_key: sem._value for host_key, sem in self.semaphores.items()
                 },
                 'max_concurrent_commands_per_host': config.MAX_CONCURRENT_COMMANDS,
-                'max_concurrent_hosts': config.MAX_CONCURRENT_HOSTS
+                'max_concurrent_hosts': config.MAX_CONCURRENT_HOSTS,
+                'api_backend': config.MIKROTIK_API_BACKEND
             }
     
     async def close_all_connections(self):
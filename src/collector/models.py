@@ -4,9 +4,11 @@ TriplePlay-Sentinel - Modelos de Dados
 Sistema de Monitoramento Centralizado MikroTik-Zabbix via HTTP Agent (PULL)
 """
 
+import sys
+import zlib
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 
 @dataclass
@@ -41,15 +43,122 @@ class TestResult:
         }
 
 
+# Campos de texto de TestResult.results guardados fora do dict no cache
+_TEXT_FIELDS = ('raw_output', 'output')
+
+
+def _pack_text(text: str, compress_min: int) -> Union[str, bytes]:
+    """Texto comprimido (bytes) quando vale a pena, senão o próprio str"""
+    if compress_min <= 0 or len(text) < compress_min:
+        return text
+    encoded = text.encode('utf-8')
+    compressed = zlib.compress(encoded, 1)
+    return compressed if len(compressed) < len(encoded) else text
+
+
+def _unpack_text(blob: Union[str, bytes]) -> str:
+    return zlib.decompress(blob).decode('utf-8') if isinstance(blob, bytes) else blob
+
+
+class CompactResult:
+    """
+    TestResult na forma armazenada pelo cache
+    
+    Host, target, tipo e status são internados; textos brutos (raw_output e
+    results['raw_output'/'output']) são guardados uma única vez, comprimidos a
+    partir de compress_min bytes, e recolocados só na leitura (to_result).
+    """
+    __slots__ = ('status', 'test_type', 'timestamp', 'cache_ttl', 'mikrotik_host', 'target',
+                 'results', 'error_message', 'execution_time_seconds', 'texts', 'text_slots')
+    
+    def __init__(self, result: TestResult, compress_min: int = 0):
+        self.status = sys.intern(result.status)
+        self.test_type = sys.intern(result.test_type)
+        self.timestamp = result.timestamp
+        self.cache_ttl = result.cache_ttl
+        self.mikrotik_host = sys.intern(result.mikrotik_host)
+        self.target = sys.intern(result.target)
+        self.error_message = result.error_message
+        self.execution_time_seconds = result.execution_time_seconds
+        
+        originals: List[str] = []
+        slots: List[Tuple[str, int]] = []
+        
+        def keep(location: str, text: str):
+            # Texto repetido (raw_output também dentro de results) vira referência
+            for index, original in enumerate(originals):
+                if original == text:
+                    slots.append((location, index))
+                    return
+            originals.append(text)
+            slots.append((location, len(originals) - 1))
+        
+        if result.raw_output:
+            keep('', result.raw_output)
+        
+        results = result.results
+        if isinstance(results, dict) and any(
+            isinstance(results.get(field), str) and results.get(field) for field in _TEXT_FIELDS
+        ):
+            results = dict(results)
+            for field in _TEXT_FIELDS:
+                value = results.get(field)
+                if isinstance(value, str) and value:
+                    keep(field, results.pop(field))
+        
+        self.results = results
+        self.texts = tuple(_pack_text(text, compress_min) for text in originals)
+        self.text_slots = tuple(slots)
+    
+    @property
+    def compressed(self) -> bool:
+        return any(isinstance(blob, bytes) for blob in self.texts)
+    
+    def to_result(self) -> TestResult:
+        """Reconstrói o TestResult completo (textos descomprimidos)"""
+        results = self.results
+        raw_output = ''
+        if self.text_slots:
+            texts = [_unpack_text(blob) for blob in self.texts]
+            results = dict(results)
+            for location, index in self.text_slots:
+                if location:
+                    results[location] = texts[index]
+                else:
+                    raw_output = texts[index]
+        
+        return TestResult(
+            status=self.status,
+            test_type=self.test_type,
+            timestamp=self.timestamp,
+            cache_hit=False,
+            cache_ttl=self.cache_ttl,
+            mikrotik_host=self.mikrotik_host,
+            target=self.target,
+            results=results,
+            raw_output=raw_output,
+            error_message=self.error_message,
+            execution_time_seconds=self.execution_time_seconds
+        )
+
+
 @dataclass
 class CacheEntry:
-    """Entrada do cache com timestamp de expiração"""
-    result: TestResult
-    expiry: datetime
+    """Entrada do cache com expiração em relógio monotônico (time.monotonic)"""
+    __slots__ = ('result', 'expires_at', 'stored_at', 'stale_until', 'size')
+    result: CompactResult
+    expires_at: float
+    stored_at: float
+    stale_until: float  # Limite para servir a entrada vencida (stale-while-revalidate)
+    size: int  # Bytes aproximados ocupados pela entrada
+    
+    def is_expired(self, now: float) -> bool:
+        """Verifica se a entrada expirou no instante 'now' (monotônico)"""
+        return now >= self.expires_at
     
-    def is_expired(self) -> bool:
-        """Verifica se a entrada expirou"""
-        return datetime.now() >= self.expiry
+    def is_servable_stale(self, now: float) -> bool:
+        """Vencida, mas ainda dentro da janela de staleness"""
+        return self.expires_at <= now < self.stale_until
 
 
 @dataclass
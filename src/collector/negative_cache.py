@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Cache negativo
+Guarda por pouco tempo as falhas, evitando repetir probes condenados ao timeout
+
+Categorias (TTL próprio cada uma):
+    router_unreachable - conexão/transporte falhou; vale para todo o roteador
+    auth_failure       - login recusado; vale para roteador + credenciais
+    target_unreachable - ping sem nenhuma resposta (100% de perda) ou !trap do target
+
+Entradas do roteador são invalidadas assim que ele volta a responder (sucesso
+em qualquer requisição ou recuperação do circuit breaker).
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sentinel_config import config
+
+ROUTER_UNREACHABLE = 'router_unreachable'
+AUTH_FAILURE = 'auth_failure'
+TARGET_UNREACHABLE = 'target_unreachable'
+
+CATEGORIES = (ROUTER_UNREACHABLE, AUTH_FAILURE, TARGET_UNREACHABLE)
+
+# Mensagens de login recusado (librouteros e cliente nativo)
+_AUTH_ERROR = re.compile(
+    r'invalid user name or password|cannot log in|login failure|not logged in|authentication',
+    re.IGNORECASE
+)
+
+
+def credential_hash(username: str, password: str) -> str:
+    """Hash curto de usuário + senha para chaves (a senha nunca entra em chave ou log)"""
+    return hashlib.sha256(f"{username}\0{password}".encode()).hexdigest()[:16]
+
+
+def classify_failure(result: Dict[str, Any], is_ping: bool = False) -> Optional[str]:
+    """
+    Categoria negativa de um resultado (None se não deve ir ao cache negativo)
+
+    Roteador inacessível e !trap vêm só de sinais estruturados do conector
+    (error_type, transport_error, trap), nunca do texto do erro: timeouts
+    locais (fila do pool, comando sem resposta) não devem virar indisponibilidade
+    do roteador inteiro.
+
+    Args:
+        result: Resultado no formato do conector (status/error/data)
+        is_ping: Resultado de ping de um target (habilita target_unreachable)
+    """
+    if result.get('status') == 'success':
+        data = result.get('data')
+        if is_ping and isinstance(data, dict) and data.get('status') == 'unreachable':
+            return TARGET_UNREACHABLE
+        return None
+
+    error = str(result.get('error', ''))
+    if result.get('error_type') == AUTH_FAILURE or _AUTH_ERROR.search(error):
+        return AUTH_FAILURE
+    if result.get('error_type') == ROUTER_UNREACHABLE or result.get('transport_error'):
+        return ROUTER_UNREACHABLE
+    if is_ping and result.get('trap'):
+        # !trap do próprio ping (endereço inválido, sem rota)
+        return TARGET_UNREACHABLE
+    return None
+
+
+class NegativeCache:
+    """Falhas recentes por roteador, credencial e target"""
+
+    def __init__(self, enabled: bool = True, router_ttl: float = 5.0, auth_ttl: float = 60.0,
+                 target_ttl: float = 10.0):
+        self.enabled = enabled
+        self.ttls = {
+            ROUTER_UNREACHABLE: router_ttl,
+            AUTH_FAILURE: auth_ttl,
+            TARGET_UNREACHABLE: target_ttl
+        }
+        self._entries: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        self._by_router: Dict[str, Set[Tuple]] = {}  # Entradas de roteador/login por host:porta
+        self._lock = threading.Lock()
+        self._stats = {category: {'stored': 0, 'hits': 0, 'invalidated': 0} for category in CATEGORIES}
+
+    @staticmethod
+    def _router_key(router: str) -> Tuple:
+        return (ROUTER_UNREACHABLE, router)
+
+    @staticmethod
+    def _auth_key(router: str, username: str, password: str) -> Tuple:
+        # Só o hash da senha: senha corrigida gera outra chave
+        return (AUTH_FAILURE, router, credential_hash(username, password))
+
+    @staticmethod
+    def _target_key(router: str, username: str, password: str, target: str, count: int) -> Tuple:
+        # Por credencial: quem erra a senha recebe a falha de login, não a do target
+        return (TARGET_UNREACHABLE, router, credential_hash(username, password), target, count)
+
+    def _get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Entrada válida (lock já adquirido)"""
+        found = self._entries.get(key)
+        if found is None:
+            return None
+        expires_at, result = found
+        now = time.monotonic()
+        if now >= expires_at:
+            self._delete(key)
+            return None
+        self._stats[key[0]]['hits'] += 1
+        return dict(result, cached=True, negative=key[0],
+                    negative_retry_in_seconds=round(expires_at - now, 2))
+
+    def get_router(self, host: str, port: int, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """Falha recente de conexão ou de login para o roteador"""
+        if not self.enabled:
+            return None
+        router = f"{host}:{port}"
+        with self._lock:
+            return (self._get(self._router_key(router))
+                    or self._get(self._auth_key(router, username, password)))
+
+    def get_target(self, host: str, port: int, username: str, password: str,
+                   target: str, count: int) -> Optional[Dict[str, Any]]:
+        """Falha recente do ping para o target (vista com a mesma credencial)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._get(self._target_key(f"{host}:{port}", username, password, target, count))
+
+    def record(self, category: str, host: str, port: int, result: Dict[str, Any],
+               username: str = '', password: str = '', target: str = '', count: int = 0) -> bool:
+        """
+        Armazena uma falha com o TTL da sua categoria
+
+        Returns:
+            True se armazenada (cache ativo e TTL da categoria maior que zero)
+        """
+        ttl = self.ttls.get(category, 0)
+        if not self.enabled or ttl <= 0:
+            return False
+
+        router = f"{host}:{port}"
+        if category == ROUTER_UNREACHABLE:
+            key = self._router_key(router)
+        elif category == AUTH_FAILURE:
+            key = self._auth_key(router, username, password)
+        else:
+            key = self._target_key(router, username, password, target, count)
+
+        stored = {k: v for k, v in result.items() if k not in ('cached', 'coalesced', 'stale')}
+        stored['error_type'] = category
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, stored)
+            if category != TARGET_UNREACHABLE:
+                self._by_router.setdefault(router, set()).add(key)
+            self._stats[category]['stored'] += 1
+            if len(self._entries) > config.MAX_CACHE_SIZE:
+                self._purge_expired()
+        return True
+
+    def invalidate_router(self, router: str) -> int:
+        """Roteador voltou: remove suas entradas de inacessível e de login"""
+        if not self._by_router:
+            return 0
+        with self._lock:
+            keys = self._by_router.pop(router, ())
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats[key[0]]['invalidated'] += 1
+            return len(keys)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._by_router.clear()
+            return count
+
+    def _delete(self, key: Tuple):
+        """Remove a entrada e o índice por roteador (lock já adquirido)"""
+        del self._entries[key]
+        if key[0] != TARGET_UNREACHABLE:
+            keys = self._by_router.get(key[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_router[key[1]]
+
+    def _purge_expired(self):
+        """Remove entradas vencidas (lock já adquirido)"""
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if now >= expires_at]:
+            self._delete(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entradas ativas e contadores por categoria"""
+        with self._lock:
+            self._purge_expired()
+            active = {category: 0 for category in CATEGORIES}
+            for key in self._entries:
+                active[key[0]] += 1
+            return {
+                'enabled': self.enabled,
+                'categories': {
+                    category: dict(self._stats[category], active=active[category],
+                                   ttl_seconds=self.ttls[category])
+                    for category in CATEGORIES
+                }
+            }
+
+
+# Instância global do cache negativo
+negative_cache = NegativeCache(
+    enabled=config.NEGATIVE_CACHE_ENABLED,
+    router_ttl=config.NEGATIVE_CACHE_ROUTER_TTL,
+    auth_ttl=config.NEGATIVE_CACHE_AUTH_TTL,
+    target_ttl=config.NEGATIVE_CACHE_TARGET_TTL
+)
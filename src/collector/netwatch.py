@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Sondas persistentes via /tool/netwatch
+Em vez de um /ping por target a cada poll do Zabbix, o collector mantém uma
+entrada netwatch por target em cada roteador e coleta o estado de todos com
+um único /tool/netwatch/print por roteador por ciclo.
+
+As entradas gerenciadas são identificadas pelo comentário NETWATCH_COMMENT
+seguido do dono (NETWATCH_OWNER_ID, um por nó do collector); entradas criadas
+manualmente no roteador nunca são alteradas e cada nó remove só as suas.
+
+Os workers de um nó reconciliam um roteador por vez (flock) sobre a união dos
+targets requisitados por todos eles, mantida em um arquivo em NETWATCH_STATE_DIR:
+um worker não remove entradas que outro ainda usa nem duplica as que outro
+acabou de criar. No modo broker só o processo do broker usa o netwatch.
+
+Cada credencial (usuário + hash da senha + API-SSL) de um roteador tem seu
+próprio registro: o snapshot só é servido a quem usa a credencial que o
+coletou, e uma senha errada não afeta a reconciliação e a coleta das demais.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from api_ssl import resolve_use_ssl
+from negative_cache import credential_hash
+from sentinel_config import config
+
+logger = logging.getLogger('sentinel-netwatch')
+
+NETWATCH_COMMENT = 'tripleplay-sentinel'
+
+# Status com resultado de sonda; 'unknown' (entrada recém-criada) não é queda
+_PROBED_STATUSES = ('up', 'down')
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|us|ns|s|m|h|d|w)')
+_DURATION_MS = {'w': 604800000, 'd': 86400000, 'h': 3600000, 'm': 60000,
+                's': 1000, 'ms': 1, 'us': 0.001, 'ns': 0.000001}
+
+
+def parse_duration_ms(value: Any) -> Optional[float]:
+    """Converte durações RouterOS ('1ms234us', '2s', '00:00:01') para ms"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    value = str(value)
+    if ':' in value:
+        try:
+            hours, minutes, seconds = value.split(':')
+            return (int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1000
+        except ValueError:
+            return None
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_MS[unit] for number, unit in parts)
+
+
+@dataclass
+class _NetwatchRouter:
+    """Roteador com targets monitorados via netwatch"""
+    host: str
+    username: str
+    password: str
+    port: int
+    use_ssl: Optional[bool] = None  # None: API-SSL deduzido pela porta
+    targets: Dict[str, float] = field(default_factory=dict)  # target -> última requisição
+    dirty: bool = True
+    last_reconcile: float = 0.0
+    icmp_type: Optional[bool] = None  # RouterOS 7.4+ aceita type=icmp (rtt/perda)
+    snapshot: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    collected_at: float = 0.0
+    last_error: str = ''
+
+
+class NetwatchManager:
+    """Provisiona, reconcilia e coleta entradas /tool/netwatch por roteador"""
+
+    def __init__(self, pool, enabled: bool = False, probe_interval: int = 30,
+                 collect_interval: float = 30.0, max_age: float = 90.0,
+                 reconcile_interval: float = 300.0, target_ttl: float = 3600.0,
+                 owner_id: str = '', state_dir: str = ''):
+        self.pool = pool
+        self.owner_id = owner_id or socket.gethostname()
+        self.comment = f"{NETWATCH_COMMENT}:{self.owner_id}"
+        self.state_dir = state_dir
+        self.enabled = enabled
+        self.probe_interval = probe_interval
+        self.collect_interval = collect_interval
+        self.max_age = max_age
+        self.reconcile_interval = reconcile_interval
+        self.target_ttl = target_ttl
+        self.routers: Dict[str, _NetwatchRouter] = {}
+        self.lock = threading.Lock()
+
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.stats = {
+            'collections': 0,
+            'collection_errors': 0,
+            'entries_added': 0,
+            'entries_removed': 0,
+            'entries_updated': 0,
+            'served_from_snapshot': 0,
+            'snapshot_misses': 0
+        }
+
+    def _increment_stat(self, name: str, value: int = 1):
+        """Incrementa contador de forma thread-safe"""
+        with self.lock:
+            self.stats[name] += value
+
+    @staticmethod
+    def _router_key(host: str, port: int, username: str, password: str,
+                    use_ssl: Optional[bool] = None) -> str:
+        """Chave do registro: roteador + credencial (só o hash da senha)"""
+        key = f"{host}:{port}:{credential_hash(username, password)}"
+        return f"{key}:ssl" if resolve_use_ssl(port, use_ssl) else key
+
+    def register_targets(self, host: str, username: str, password: str,
+                         targets: List[str], port: int = 8728, use_ssl: Optional[bool] = None):
+        """Registra targets requisitados; novos targets disparam reconciliação"""
+        router_key = self._router_key(host, port, username, password, use_ssl)
+        now = time.time()
+
+        with self.lock:
+            router = self.routers.get(router_key)
+            if router is None:
+                router = _NetwatchRouter(host, username, password, port, use_ssl)
+                self.routers[router_key] = router
+
+            for target in targets:
+                if target not in router.targets:
+                    router.dirty = True
+                router.targets[target] = now
+            dirty = router.dirty
+
+        self._ensure_collector()
+        if dirty:
+            self._wakeup.set()
+
+    def get_ping_results(self, host: str, username: str, password: str, targets: List[str],
+                         port: int = 8728, use_ssl: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Resultados de ping dos targets presentes no último snapshot ainda válido
+
+        Só o snapshot coletado com a mesma credencial é usado: credencial
+        diferente (ou errada) não recebe resultados de outro chamador.
+
+        Returns:
+            {target: resultado no formato de execute_batch_ping}; targets sem
+            snapshot ficam de fora e devem ser pingados diretamente, assim como
+            entradas ainda sem resultado (status 'unknown' até a primeira sonda)
+        """
+        with self.lock:
+            router = self.routers.get(self._router_key(host, port, username, password, use_ssl))
+            if router is None or time.time() - router.collected_at > self.max_age:
+                snapshot = {}
+                collected_at = 0.0
+            else:
+                snapshot = router.snapshot
+                collected_at = router.collected_at
+
+        results = {}
+        for target in targets:
+            entry = snapshot.get(target)
+            if entry is None or str(entry.get('status')) not in _PROBED_STATUSES:
+                continue
+            data = self._entry_to_ping_data(entry, collected_at)
+            results[target] = {
+                'target': target,
+                'status': 'success',
+                'data': data,
+                'execution_time_seconds': 0,
+                'cached': True,
+                'source': 'netwatch'
+            }
+
+        with self.lock:
+            self.stats['served_from_snapshot'] += len(results)
+            self.stats['snapshot_misses'] += len(targets) - len(results)
+
+        return results
+
+    @staticmethod
+    def _entry_to_ping_data(entry: Dict[str, Any], collected_at: float) -> Dict[str, Any]:
+        """Converte uma entrada netwatch no formato de resultado de ping"""
+        status = str(entry.get('status', 'unknown'))
+        reachable = status == 'up'
+        data = {
+            'status': 'reachable' if reachable else 'unreachable',
+            'netwatch_status': status,
+            'since': entry.get('since'),
+            'snapshot_age_seconds': round(time.time() - collected_at, 2),
+            'execution_time_seconds': 0
+        }
+
+        sent = entry.get('sent-count')
+        if sent is not None:
+            # Sonda ICMP (RouterOS 7.4+): estatísticas do último teste
+            received = int(entry.get('response-count', 0))
+            loss = float(entry.get('loss-percent', 100 if not received else 0))
+            data.update({
+                'packets_sent': int(sent),
+                'packets_received': received,
+                'packet_loss_percent': round(loss, 2),
+                'availability_percent': round(100 - loss, 2)
+            })
+            for key, name in (('rtt-min', 'min_time_ms'), ('rtt-avg', 'avg_time_ms'),
+                              ('rtt-max', 'max_time_ms'), ('rtt-jitter', 'jitter_ms')):
+                value = parse_duration_ms(entry.get(key))
+                if value is not None:
+                    data[name] = round(value, 2)
+        else:
+            # Netwatch simples: apenas up/down
+            data.update({
+                'packets_sent': 1,
+                'packets_received': 1 if reachable else 0,
+                'packet_loss_percent': 0.0 if reachable else 100.0,
+                'availability_percent': 100.0 if reachable else 0.0
+            })
+
+        return data
+
+    def _ensure_collector(self):
+        """Inicia a thread de coleta neste processo (threads não sobrevivem ao fork)"""
+        if self._thread_pid == os.getpid():
+            return
+
+        with self.lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='netwatch')
+            self._thread = threading.Thread(target=self._collect_loop, name='netwatch-collector', daemon=True)
+            self._thread_pid = os.getpid()
+
+        # Fora do lock: no worker gevent ele é um lock real (criado no master) e start() cede o greenlet
+        self._thread.start()
+
+    def stop(self):
+        """Interrompe a coleta em background"""
+        self._stop.set()
+        self._wakeup.set()
+        self._thread_pid = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _collect_loop(self):
+        """Reconcilia roteadores alterados e coleta todos a cada collect_interval"""
+        next_collect = 0.0
+
+        while not self._stop.is_set():
+            self._wakeup.wait(max(0.0, next_collect - time.time()))
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+
+            try:
+                self.run_cycle(collect=time.time() >= next_collect)
+            except Exception as e:
+                logger.error(f"Erro no ciclo netwatch: {e}")
+
+            if time.time() >= next_collect:
+                next_collect = time.time() + self.collect_interval
+
+    def run_cycle(self, collect: bool = True):
+        """Um ciclo: reconcilia quem precisa e coleta todos (um print por roteador)"""
+        now = time.time()
+        with self.lock:
+            for key, router in list(self.routers.items()):
+                self._expire_targets(router, now)
+                # Credencial que nunca conseguiu logar e sem targets: não tem entradas a remover
+                if not router.targets and router.last_reconcile == 0:
+                    del self.routers[key]
+            routers = list(self.routers.values())
+
+        def process(router: _NetwatchRouter):
+            if router.dirty or now - router.last_reconcile > self.reconcile_interval:
+                self.reconcile(router)
+            if collect or router.collected_at == 0:
+                self.collect(router)
+
+        executor = self._executor
+        if executor is None:
+            for router in routers:
+                process(router)
+            return
+
+        for future in [executor.submit(process, router) for router in routers]:
+            future.result()
+
+    def _expire_targets(self, router: _NetwatchRouter, now: float):
+        """Targets não requisitados há target_ttl segundos deixam de ser monitorados (lock adquirido)"""
+        for target, last_requested in list(router.targets.items()):
+            if now - last_requested > self.target_ttl:
+                del router.targets[target]
+
+    @contextmanager
+    def _node_targets(self, router: _NetwatchRouter) -> Iterator[Dict[str, float]]:
+        """
+        Targets requisitados por todos os processos do nó para o roteador
+
+        Mantém o flock do arquivo até o fim do bloco (a reconciliação inteira) e
+        grava de volta o registro mesclado. Sem NETWATCH_STATE_DIR (ou sem
+        permissão de escrita) usa só os targets deste processo.
+        """
+        now = time.time()
+        with self.lock:
+            self._expire_targets(router, now)
+            local = dict(router.targets)
+
+        handle = None
+        if self.state_dir:
+            path = os.path.join(self.state_dir, f"netwatch-{router.host}-{router.port}.json")
+            try:
+                os.makedirs(self.state_dir, exist_ok=True)
+                handle = open(path, 'a+')
+            except OSError as e:
+                logger.warning(f"Registro netwatch {path} indisponível, reconciliando sem coordenação: {e}")
+
+        if handle is None:
+            yield local
+            return
+
+        with handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                try:
+                    shared = json.loads(handle.read() or '{}')
+                except ValueError:
+                    shared = {}
+                for target, last_requested in local.items():
+                    shared[target] = max(last_requested, shared.get(target, 0))
+                targets = {target: last_requested for target, last_requested in shared.items()
+                           if now - last_requested <= self.target_ttl}
+
+                handle.seek(0)
+                handle.truncate()
+                json.dump(targets, handle)
+                handle.flush()
+
+                yield targets
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def reconcile(self, router: _NetwatchRouter):
+        """Cria/atualiza/remove entradas deste nó para refletir os targets registrados no nó"""
+        with self.lock:
+            router.dirty = False
+
+        interval = f"{self.probe_interval}s"
+
+        try:
+            # Login antes do registro do nó: credencial recusada não publica seus targets
+            with self.pool.get_connection(router.host, router.username, router.password, router.port,
+                                          router.use_ssl) as conn, \
+                    self._node_targets(router) as node_targets:
+                wanted = set(node_targets)
+                entries = conn.run_command('/tool/netwatch/print')
+                managed = {}
+                for entry in entries:
+                    # Entradas sem dono (versões anteriores) são adotadas
+                    if entry.get('comment') in (self.comment, NETWATCH_COMMENT):
+                        managed.setdefault(str(entry.get('host')), []).append(entry)
+
+                for target in wanted - set(managed):
+                    self._add_entry(conn, router, target, interval)
+
+                for target, target_entries in managed.items():
+                    keep = target in wanted
+                    for index, entry in enumerate(target_entries):
+                        if not keep or index > 0:
+                            # Target expirado ou entrada duplicada
+                            conn.run_command('/tool/netwatch/remove', {'.id': entry['.id']})
+                            self._increment_stat('entries_removed')
+                        elif parse_duration_ms(entry.get('interval')) != self.probe_interval * 1000:
+                            conn.run_command('/tool/netwatch/set', {'.id': entry['.id'], 'interval': interval})
+                            self._increment_stat('entries_updated')
+
+            router.last_reconcile = time.time()
+            logger.debug(f"Netwatch reconciliado em {router.host}: {len(wanted)} targets")
+
+        except Exception as e:
+            with self.lock:
+                router.dirty = True
+                router.last_error = str(e)
+            logger.error(f"Erro ao reconciliar netwatch em {router.host}:{router.port}: {e}")
+
+    def _add_entry(self, conn, router: _NetwatchRouter, target: str, interval: str):
+        """Cria a entrada netwatch (ICMP com rtt/perda quando o RouterOS suporta)"""
+        params = {'host': target, 'interval': interval, 'comment': self.comment}
+
+        if router.icmp_type is not False:
+            try:
+                conn.run_command('/tool/netwatch/add', dict(params, type='icmp'))
+                router.icmp_type = True
+                self._increment_stat('entries_added')
+                return
+            except Exception as e:
+                if not conn.connected:
+                    raise
+                # RouterOS < 7.4: netwatch sem o atributo type
+                logger.info(f"Netwatch ICMP indisponível em {router.host}, usando netwatch simples: {e}")
+                router.icmp_type = False
+
+        conn.run_command('/tool/netwatch/add', params)
+        self._increment_stat('entries_added')
+
+    def collect(self, router: _NetwatchRouter):
+        """Coleta o estado de todas as entradas do roteador com um único print"""
+        try:
+            entries = self.pool.run_command(
+                router.host, router.username, router.password, '/tool/netwatch/print',
+                port=router.port, use_ssl=router.use_ssl
+            )
+        except Exception as e:
+            self._increment_stat('collection_errors')
+            with self.lock:
+                router.last_error = str(e)
+            logger.warning(f"Erro ao coletar netwatch de {router.host}:{router.port}: {e}")
+            return
+
+        # Entradas de qualquer nó servem; a deste nó tem preferência
+        snapshot = {}
+        for entry in entries:
+            comment = str(entry.get('comment', ''))
+            if comment != NETWATCH_COMMENT and not comment.startswith(f"{NETWATCH_COMMENT}:"):
+                continue
+            host = str(entry.get('host'))
+            if host not in snapshot or comment == self.comment:
+                snapshot[host] = entry
+
+        with self.lock:
+            router.snapshot = snapshot
+            router.collected_at = time.time()
+            router.last_error = ''
+            self.stats['collections'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado da coleta netwatch por roteador"""
+        now = time.time()
+        with self.lock:
+            routers = {
+                key: {
+                    'targets': len(router.targets),
+                    'entries': len(router.snapshot),
+                    'icmp_probes': router.icmp_type,
+                    'snapshot_age_seconds': round(now - router.collected_at, 2)
+                    if router.collected_at else None,
+                    'last_collected': datetime.fromtimestamp(router.collected_at).isoformat()
+                    if router.collected_at else None,
+                    'last_error': router.last_error
+                }
+                for key, router in self.routers.items()
+            }
+            stats = dict(self.stats)
+
+        return {
+            'enabled': self.enabled,
+            'owner_id': self.owner_id,
+            'probe_interval_seconds': self.probe_interval,
+            'collect_interval_seconds': self.collect_interval,
+            'max_age_seconds': self.max_age,
+            'routers': routers,
+            **stats
+        }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Cache Redis compartilhado entre nós do collector
+Camada externa do SentinelCache para vários containers atrás de um balanceador:
+um target pingado por um nó é servido pelos demais sem novo probe no roteador
+
+    - leitura de vários targets com um único MGET; gravação em pipeline
+    - TTL no servidor (PX = até stale_until): o Redis descarta sozinho
+    - locks SET NX PX por chave para single-flight entre nós; a liberação só
+      apaga o lock se o token ainda for o nosso (script Lua)
+    - Redis fora do ar: erro registrado e camada ignorada por
+      REDIS_RETRY_INTERVAL segundos, sem atrasar as requisições
+
+Valor gravado: expires_at | stale_until | stored_at (f64, relógio de parede) |
+formato (b'j' JSON ou b'z' JSON+zlib) | TestResult.to_dict()
+"""
+
+import hashlib
+import json
+import logging
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from cache_backend import BackendItem, BackendRecord, CacheBackend, encode_key
+
+logger = logging.getLogger('sentinel-redis-cache')
+
+_TIMES = struct.Struct('<ddd')
+_PLAIN = b'j'
+_COMPRESSED = b'z'
+_COMPRESS_MIN = 512
+
+# Apaga o lock apenas se ainda pertencer ao token (pode ter expirado e sido retomado)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Registros do SentinelCache em um Redis compartilhado"""
+
+    name = 'redis'
+    supports_locks = True
+    remote = True  # Cliente síncrono: no caminho async roda no executor do conector
+
+    def __init__(self, client: Any = None, host: str = 'localhost', port: int = 6379, db: int = 0,
+                 password: str = '', prefix: str = 'sentinel', socket_timeout: float = 0.25,
+                 retry_interval: float = 5.0):
+        """
+        Args:
+            client: Cliente redis já configurado (padrão: redis.Redis com os parâmetros abaixo)
+            prefix: Prefixo das chaves (instalações distintas no mesmo Redis)
+            socket_timeout: Timeout de cada comando; o cache não pode segurar a requisição
+            retry_interval: Pausa após erro antes de voltar a usar o Redis
+        """
+        if client is None:
+            import redis
+            client = redis.Redis(host=host, port=port, db=db, password=password or None,
+                                 socket_timeout=socket_timeout,
+                                 socket_connect_timeout=socket_timeout,
+                                 health_check_interval=30)
+        self.client = client
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._release_script = client.register_script(_RELEASE_SCRIPT)
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'round_trips': 0,
+            'errors': 0,
+            'locks_acquired': 0,
+            'locks_contended': 0
+        }
+
+    # ===== CHAVES E VALORES =====
+
+    def _key(self, kind: str, cache_key: Hashable) -> str:
+        digest = hashlib.blake2b(encode_key(cache_key), digest_size=16).hexdigest()
+        return f"{self.prefix}:{kind}:{digest}"
+
+    @staticmethod
+    def _encode(result: Dict[str, Any], expires_at: float, stale_until: float, stored_at: float) -> bytes:
+        body = json.dumps(result, separators=(',', ':'), default=str).encode('utf-8')
+        kind = _PLAIN
+        if len(body) >= _COMPRESS_MIN:
+            compressed = zlib.compress(body, 1)
+            if len(compressed) < len(body):
+                body, kind = compressed, _COMPRESSED
+        return _TIMES.pack(expires_at, stale_until, stored_at) + kind + body
+
+    @staticmethod
+    def _decode(value: bytes) -> BackendRecord:
+        expires_at, stale_until, stored_at = _TIMES.unpack_from(value)
+        body = value[_TIMES.size + 1:]
+        if value[_TIMES.size:_TIMES.size + 1] == _COMPRESSED:
+            body = zlib.decompress(body)
+        return json.loads(body), expires_at, stale_until, stored_at
+
+    # ===== CHAMADAS AO REDIS =====
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _call(self, operation: str, fn: Callable[[], Any]) -> Optional[Any]:
+        """Executa uma ida e volta; None se o Redis estiver indisponível"""
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            result = fn()
+        except Exception as e:
+            self._down_until = time.monotonic() + self.retry_interval
+            self._count('errors')
+            logger.warning(f"Redis indisponível ({operation}), ignorado por {self.retry_interval}s: {e}")
+            return None
+        self._count('round_trips')
+        return result
+
+    def _pipeline(self, operation: str, build: Callable[[Any], None]) -> Optional[List[Any]]:
+        """Comandos em pipeline (sem MULTI) em uma única ida e volta"""
+        def run():
+            pipe = self.client.pipeline(transaction=False)
+            build(pipe)
+            return pipe.execute()
+        return self._call(operation, run)
+
+    # ===== LEITURA / ESCRITA =====
+
+    def get(self, cache_key: Hashable) -> Optional[BackendRecord]:
+        return self.get_many([cache_key]).get(cache_key)
+
+    def get_many(self, cache_keys: Iterable[Hashable]) -> Dict[Hashable, BackendRecord]:
+        cache_keys = list(cache_keys)
+        if not cache_keys:
+            return {}
+        values = self._call('mget', lambda: self.client.mget([self._key('c', k) for k in cache_keys]))
+        if values is None:
+            return {}
+
+        now = time.time()
+        found = {}
+        for cache_key, value in zip(cache_keys, values):
+            if value is None:
+                continue
+            try:
+                record = self._decode(value)
+            except (struct.error, zlib.error, ValueError) as e:
+                logger.warning(f"Valor inválido no Redis ignorado: {e}")
+                continue
+            if record[2] > now:
+                found[cache_key] = record
+
+        self._count('hits', len(found))
+        self._count('misses', len(cache_keys) - len(found))
+        return found
+
+    def set(self, cache_key: Hashable, result: Dict[str, Any], expires_at: float,
+            stale_until: float, stored_at: float) -> bool:
+        return self.set_many([(cache_key, result, expires_at, stale_until, stored_at)]) == 1
+
+    def set_many(self, items: List[BackendItem]) -> int:
+        now = time.time()
+        # TTL no servidor até o fim da janela de staleness
+        items = [item for item in items if item[3] > now]
+        if not items:
+            return 0
+
+        def build(pipe):
+            for cache_key, result, expires_at, stale_until, stored_at in items:
+                pipe.set(self._key('c', cache_key), self._encode(result, expires_at, stale_until, stored_at),
+                         px=max(1, int((stale_until - now) * 1000)))
+
+        if self._pipeline('set', build) is None:
+            return 0
+        self._count('writes', len(items))
+        return len(items)
+
+    def delete(self, cache_key: Hashable):
+        self._call('delete', lambda: self.client.delete(self._key('c', cache_key)))
+
+    def clear(self) -> int:
+        """Remove as entradas deste prefixo (afeta todos os nós)"""
+        def run():
+            removed = 0
+            batch = []
+            for key in self.client.scan_iter(match=f"{self.prefix}:c:*", count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    removed += self.client.delete(*batch)
+                    batch = []
+            if batch:
+                removed += self.client.delete(*batch)
+            return removed
+        return self._call('clear', run) or 0
+
+    # ===== SINGLE-FLIGHT ENTRE NÓS =====
+
+    def acquire_locks(self, cache_keys: List[Hashable], ttl: float) -> Dict[Hashable, str]:
+        """
+        SET NX PX por chave, em pipeline
+
+        Redis indisponível concede todas as chaves: sem coordenação, cada nó
+        executa o próprio probe (comportamento sem Redis).
+        """
+        if not cache_keys:
+            return {}
+        token = uuid.uuid4().hex
+        ttl_ms = max(1, int(ttl * 1000))
+
+        def build(pipe):
+            for cache_key in cache_keys:
+                pipe.set(self._key('l', cache_key), token, nx=True, px=ttl_ms)
+
+        replies = self._pipeline('lock', build)
+        if replies is None:
+            return {cache_key: '' for cache_key in cache_keys}
+
+        tokens = {cache_key: token for cache_key, acquired in zip(cache_keys, replies) if acquired}
+        self._count('locks_acquired', len(tokens))
+        self._count('locks_contended', len(cache_keys) - len(tokens))
+        return tokens
+
+    def release_locks(self, tokens: Dict[Hashable, str]):
+        tokens = {cache_key: token for cache_key, token in tokens.items() if token}
+        if not tokens:
+            return
+
+        def build(pipe):
+            for cache_key, token in tokens.items():
+                self._release_script(keys=[self._key('l', cache_key)], args=[token], client=pipe)
+
+        self._pipeline('unlock', build)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate_percent'] = round(stats['hits'] / total * 100, 2) if total else 0
+        stats['prefix'] = self.prefix
+        stats['available'] = time.monotonic() >= self._down_until
+        return stats
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Cliente RouterOS API nativo (asyncio)
+Implementação do protocolo da API MikroTik sobre streams asyncio, sem threads
+
+O protocolo da API RouterOS é composto por sentenças (listas de palavras)
+terminadas por uma palavra vazia. Cada palavra é prefixada pelo seu tamanho
+em um formato de comprimento variável (1 a 5 bytes).
+"""
+
+import asyncio
+import binascii
+import hashlib
+import logging
+import ssl
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('sentinel-routeros-api')
+
+# Valores convertidos da mesma forma que o librouteros faz
+_BOOL_WORDS = {'yes': True, 'true': True, 'no': False, 'false': False}
+
+
+class RouterOSError(Exception):
+    """Erro genérico do cliente RouterOS API"""
+
+
+class RouterOSConnectionError(RouterOSError):
+    """Falha de conexão ou de transporte com o roteador"""
+
+
+class RouterOSTrapError(RouterOSError):
+    """Erro retornado pelo roteador em uma sentença !trap"""
+
+    def __init__(self, message: str, category: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.category = category
+
+
+class RouterOSFatalError(RouterOSConnectionError):
+    """Sentença !fatal - o roteador encerrou a sessão"""
+
+
+class RouterOSTimeoutError(RouterOSConnectionError):
+    """Comando sem resposta no prazo (só o comando é cancelado; a sessão continua ativa)"""
+
+
+def encode_length(length: int) -> bytes:
+    """Codifica o tamanho de uma palavra no formato da API RouterOS"""
+    if length < 0x80:
+        return bytes((length,))
+    if length < 0x4000:
+        return (length | 0x8000).to_bytes(2, 'big')
+    if length < 0x200000:
+        return (length | 0xC00000).to_bytes(3, 'big')
+    if length < 0x10000000:
+        return (length | 0xE0000000).to_bytes(4, 'big')
+    return b'\xf0' + length.to_bytes(4, 'big')
+
+
+def encode_word(word: str) -> bytes:
+    """Codifica uma palavra (prefixo de tamanho + conteúdo)"""
+    data = word.encode('utf-8')
+    return encode_length(len(data)) + data
+
+
+def encode_sentence(words: List[str]) -> bytes:
+    """Codifica uma sentença completa, incluindo a palavra vazia final"""
+    return b''.join(encode_word(word) for word in words) + b'\x00'
+
+
+async def read_length(reader: asyncio.StreamReader) -> int:
+    """Lê o prefixo de tamanho de uma palavra"""
+    first = (await reader.readexactly(1))[0]
+
+    if first & 0x80 == 0x00:
+        return first
+    if first & 0xC0 == 0x80:
+        rest = await reader.readexactly(1)
+        return ((first & 0x3F) << 8) | rest[0]
+    if first & 0xE0 == 0xC0:
+        rest = await reader.readexactly(2)
+        return ((first & 0x1F) << 16) | int.from_bytes(rest, 'big')
+    if first & 0xF0 == 0xE0:
+        rest = await reader.readexactly(3)
+        return ((first & 0x0F) << 24) | int.from_bytes(rest, 'big')
+    if first & 0xF8 == 0xF0:
+        rest = await reader.readexactly(4)
+        return int.from_bytes(rest, 'big')
+
+    raise RouterOSConnectionError(f"Prefixo de tamanho inválido: {first:#x}")
+
+
+async def read_sentence(reader: asyncio.StreamReader) -> List[str]:
+    """Lê uma sentença completa (até a palavra vazia)"""
+    words = []
+    while True:
+        length = await read_length(reader)
+        if length == 0:
+            return words
+        data = await reader.readexactly(length)
+        words.append(data.decode('utf-8', errors='replace'))
+
+
+def cast_value(value: str) -> Any:
+    """Converte valores da API para int/bool (compatível com librouteros)"""
+    try:
+        return int(value)
+    except ValueError:
+        return _BOOL_WORDS.get(value, value)
+
+
+def compose_value(value: Any) -> str:
+    """Converte valores Python para o formato de atributo da API"""
+    if isinstance(value, bool):
+        return 'yes' if value else 'no'
+    return str(value)
+
+
+def parse_reply_words(words: List[str]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Converte as palavras de uma resposta em dicionário de atributos
+
+    Returns:
+        Tupla (atributos, tag) - tag é None quando a sentença não possui .tag
+    """
+    attributes = {}
+    tag = None
+
+    for word in words:
+        if word.startswith('='):
+            key, _, value = word[1:].partition('=')
+            attributes[key] = cast_value(value)
+        elif word.startswith('.tag='):
+            tag = word[5:]
+
+    return attributes, tag
+
+
+def build_command_words(command: str, params: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Monta as palavras de um comando a partir do caminho e atributos"""
+    words = [command]
+    for key, value in (params or {}).items():
+        words.append(f"={key}={compose_value(value)}")
+    return words
+
+
+def compose_query_value(value: Any) -> str:
+    """Converte valores Python para o formato usado em filtros '?' (como o print retorna)"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def build_query_words(proplist: Optional[List[str]] = None,
+                      query: Optional[Any] = None) -> List[str]:
+    """
+    Monta as palavras de projeção e filtro de um print
+
+    Args:
+        proplist: Campos retornados pelo roteador ('=.proplist=a,b')
+        query: Dict de igualdades ({'dst-address': '0.0.0.0/0'}; None testa só a
+               existência da propriedade) ou lista de palavras cruas
+               (['?>rx-byte=0', '?#|'])
+    """
+    words = []
+    if proplist:
+        fields = proplist.split(',') if isinstance(proplist, str) else proplist
+        words.append('=.proplist=' + ','.join(str(field).strip() for field in fields))
+
+    if isinstance(query, dict):
+        for key, value in query.items():
+            words.append(f"?{key}" if value is None else f"?{key}={compose_query_value(value)}")
+    elif query:
+        for word in query:
+            word = str(word)
+            words.append(word if word.startswith('?') else f"?{word}")
+
+    return words
+
+
+class _PendingCommand:
+    """Estado de um comando em andamento identificado por .tag"""
+
+    __slots__ = ('future', 'replies', 'trap')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.replies: List[Dict[str, Any]] = []
+        self.trap: Optional[RouterOSTrapError] = None
+
+
+class AsyncRouterOSConnection:
+    """
+    Conexão RouterOS API sobre streams asyncio (sem thread por chamada)
+
+    Após o login, cada comando recebe um atributo .tag único e uma task de
+    leitura roteia as respostas para o comando correspondente. Assim uma única
+    conexão executa centenas de comandos simultâneos (ex: /ping em lote).
+    """
+
+    def __init__(self, host: str, username: str, password: str, port: int = 8728, timeout: int = 10,
+                 ssl_context: Optional[ssl.SSLContext] = None, server_hostname: Optional[str] = None):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.server_hostname = server_hostname
+        self.tls_handshake_time: Optional[float] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connected = False
+        self.created_at = time.time()
+        self.last_used = time.time()
+        self._pending: Dict[str, _PendingCommand] = {}
+        self._next_tag = 0
+        self._reader_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Número de comandos aguardando resposta nesta conexão"""
+        return len(self._pending)
+
+    async def connect(self):
+        """Abre o socket TCP (e TLS para API-SSL), autentica e inicia a task de leitura"""
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                timeout=self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RouterOSConnectionError(f"Erro ao conectar API {self.host}:{self.port}: {e}") from e
+        
+        if self.ssl_context is not None:
+            # Handshake separado do connect TCP para medir seu tempo
+            start_time = time.perf_counter()
+            try:
+                await asyncio.wait_for(
+                    self.writer.start_tls(self.ssl_context, server_hostname=self.server_hostname),
+                    timeout=self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self.writer.close()
+                self.writer = None
+                self.reader = None
+                raise RouterOSConnectionError(f"Erro no handshake TLS com {self.host}:{self.port}: {e}") from e
+            self.tls_handshake_time = time.perf_counter() - start_time
+
+        self.connected = True
+
+        try:
+            await asyncio.wait_for(self._login(), timeout=self.timeout)
+        except asyncio.TimeoutError as e:
+            await self.close()
+            raise RouterOSConnectionError(f"Timeout no login da API {self.host}:{self.port}") from e
+        except Exception:
+            await self.close()
+            raise
+
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        self.last_used = time.time()
+        logger.info(f"Conexão API nativa estabelecida com {self.host}:{self.port}")
+
+    async def _login(self):
+        """Autenticação (método plain do RouterOS >= 6.43 com fallback para challenge)"""
+        replies = await self._exchange(build_command_words(
+            '/login', {'name': self.username, 'password': self.password}
+        ))
+
+        # RouterOS < 6.43 responde com desafio MD5 em =ret=
+        challenge = replies[-1].get('ret') if replies else None
+        if challenge:
+            digest = hashlib.md5(
+                b'\x00' + self.password.encode('utf-8') + binascii.unhexlify(str(challenge))
+            ).hexdigest()
+            await self._exchange(build_command_words(
+                '/login', {'name': self.username, 'response': f"00{digest}"}
+            ))
+
+    async def _exchange(self, words: List[str]) -> List[Dict[str, Any]]:
+        """Troca sequencial (sem tag) usada apenas antes da task de leitura existir"""
+        await self._write_sentence(words)
+
+        replies = []
+        trap = None
+
+        while True:
+            sentence = await read_sentence(self.reader)
+            if not sentence:
+                continue
+
+            reply_word = sentence[0]
+            attributes, _ = parse_reply_words(sentence[1:])
+
+            if reply_word == '!re':
+                replies.append(attributes)
+            elif reply_word == '!trap':
+                trap = RouterOSTrapError(
+                    str(attributes.get('message', 'Erro desconhecido')),
+                    attributes.get('category')
+                )
+            elif reply_word == '!fatal':
+                raise RouterOSFatalError(' '.join(sentence[1:]) or 'Sessão encerrada pelo roteador')
+            elif reply_word == '!done':
+                if attributes:
+                    replies.append(attributes)
+                if trap:
+                    raise trap
+                return replies
+
+    async def _write_sentence(self, words: List[str]):
+        """Envia uma sentença para o roteador"""
+        if not self.connected or self.writer is None:
+            raise RouterOSConnectionError("Conexão não estabelecida")
+        async with self._write_lock:
+            self.writer.write(encode_sentence(words))
+            await self.writer.drain()
+
+    async def _read_loop(self):
+        """Lê sentenças continuamente e entrega cada uma ao comando dono da .tag"""
+        error: Exception = RouterOSConnectionError(f"Conexão encerrada com {self.host}")
+
+        try:
+            while True:
+                sentence = await read_sentence(self.reader)
+                if not sentence:
+                    continue
+
+                reply_word = sentence[0]
+                if reply_word == '!fatal':
+                    error = RouterOSFatalError(' '.join(sentence[1:]) or 'Sessão encerrada pelo roteador')
+                    break
+
+                attributes, tag = parse_reply_words(sentence[1:])
+                pending = self._pending.get(tag)
+                if pending is None:
+                    # Resposta de comando cancelado/expirado
+                    continue
+
+                if reply_word == '!re':
+                    pending.replies.append(attributes)
+                elif reply_word == '!trap':
+                    pending.trap = RouterOSTrapError(
+                        str(attributes.get('message', 'Erro desconhecido')),
+                        attributes.get('category')
+                    )
+                elif reply_word == '!done':
+                    del self._pending[tag]
+                    if attributes:
+                        pending.replies.append(attributes)
+                    if not pending.future.done():
+                        if pending.trap:
+                            pending.future.set_exception(pending.trap)
+                        else:
+                            pending.future.set_result(pending.replies)
+
+        except asyncio.CancelledError:
+            raise
+        except (OSError, asyncio.IncompleteReadError, RouterOSError) as e:
+            error = RouterOSConnectionError(f"Conexão perdida com {self.host}: {e}")
+        finally:
+            self.connected = False
+            self._fail_pending(error)
+
+    def _fail_pending(self, error: Exception):
+        """Falha todos os comandos pendentes (conexão perdida)"""
+        pending, self._pending = self._pending, {}
+        for command in pending.values():
+            if not command.future.done():
+                command.future.set_exception(error)
+
+    async def talk(self, command: str, **params) -> List[Dict[str, Any]]:
+        """
+        Executa um comando e retorna todas as sentenças !re
+
+        Args:
+            command: Caminho do comando (ex: '/ping', '/system/identity/print')
+            **params: Atributos do comando (enviados como =chave=valor)
+
+        Returns:
+            Lista de dicionários, um por sentença !re (ou !done com atributos)
+        """
+        return await self.talk_words(build_command_words(command, params))
+
+    async def talk_words(self, words: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Executa um comando já montado como lista de palavras
+
+        Vários talk_words podem rodar simultaneamente na mesma conexão; em
+        caso de timeout apenas o comando é cancelado (/cancel), não a conexão.
+        """
+        if not self.connected:
+            raise RouterOSConnectionError("Conexão não estabelecida")
+
+        self._next_tag += 1
+        tag = str(self._next_tag)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[tag] = _PendingCommand(future)
+
+        try:
+            await self._write_sentence(words + [f".tag={tag}"])
+            self.last_used = time.time()
+            return await asyncio.wait_for(
+                asyncio.shield(future),
+                timeout=timeout or self.timeout + 60
+            )
+        except asyncio.TimeoutError as e:
+            await self._cancel_tag(tag)
+            raise RouterOSTimeoutError(f"Timeout aguardando resposta de {self.host}") from e
+        except asyncio.CancelledError:
+            await self._cancel_tag(tag)
+            raise
+        except OSError as e:
+            await self.close()
+            raise RouterOSConnectionError(f"Conexão perdida com {self.host}: {e}") from e
+
+    async def _cancel_tag(self, tag: str):
+        """Cancela um comando em andamento no roteador"""
+        if self._pending.pop(tag, None) is None or not self.connected:
+            return
+        try:
+            await self._write_sentence(['/cancel', f"=tag={tag}"])
+        except Exception:
+            pass
+
+    async def close(self):
+        """Fecha a conexão e falha comandos pendentes"""
+        self.connected = False
+
+        if self._reader_task is not None and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+        self._reader_task = None
+        self._fail_pending(RouterOSConnectionError(f"Conexão fechada com {self.host}"))
+
+        if self.writer is not None:
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            finally:
+                self.writer = None
+                self.reader = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class AsyncRouterOSPool:
+    """
+    Conexões nativas já autenticadas, reutilizadas entre batches
+
+    Os comandos são multiplexados por .tag, então uma conexão por chave
+    (roteador + usuário + credencial) atende todos os batches simultâneos.
+    Streams asyncio pertencem ao loop onde foram abertos: use um pool por
+    event loop. Conexões sem usuários e ociosas além de max_idle_time são
+    fechadas na próxima aquisição.
+    """
+
+    def __init__(self, max_idle_time: float = 300.0):
+        self.max_idle_time = max_idle_time
+        self.connections: Dict[str, AsyncRouterOSConnection] = {}
+        self._users: Dict[AsyncRouterOSConnection, int] = {}
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {'connects': 0, 'reuses': 0, 'discarded': 0, 'idle_closed': 0}
+
+    async def acquire(self, key: str,
+                      connect: Callable[[], Awaitable[AsyncRouterOSConnection]]) -> AsyncRouterOSConnection:
+        """
+        Conexão ativa da chave ou uma nova aberta por connect()
+
+        Aquisições simultâneas da mesma chave aguardam um único login.
+        Exceções de connect() são propagadas. Cada acquire exige um release.
+        """
+        await self._close_idle()
+
+        connection = self._live(key)
+        if connection is not None:
+            self.stats['reuses'] += 1
+            return self._use(connection)
+
+        async with self._connect_locks.setdefault(key, asyncio.Lock()):
+            connection = self._live(key)
+            if connection is not None:
+                self.stats['reuses'] += 1
+            else:
+                connection = await connect()
+                self.connections[key] = connection
+                self.stats['connects'] += 1
+            return self._use(connection)
+
+    def _live(self, key: str) -> Optional[AsyncRouterOSConnection]:
+        """Conexão da chave se ainda conectada (mortas saem do pool)"""
+        connection = self.connections.get(key)
+        if connection is not None and not connection.connected:
+            del self.connections[key]
+            self.stats['discarded'] += 1
+            return None
+        return connection
+
+    def _use(self, connection: AsyncRouterOSConnection) -> AsyncRouterOSConnection:
+        self._users[connection] = self._users.get(connection, 0) + 1
+        return connection
+
+    async def release(self, key: str, connection: AsyncRouterOSConnection, discard: bool = False):
+        """
+        Devolve a conexão; discard=True a retira do pool (ex: comandos sem resposta)
+
+        Conexões fora do pool são fechadas quando o último usuário as devolve.
+        """
+        users = self._users.get(connection, 1) - 1
+        if users > 0:
+            self._users[connection] = users
+        else:
+            self._users.pop(connection, None)
+
+        if (discard or not connection.connected) and self.connections.get(key) is connection:
+            del self.connections[key]
+            self.stats['discarded'] += 1
+
+        if users <= 0 and self.connections.get(key) is not connection:
+            await connection.close()
+
+    async def _close_idle(self):
+        """Fecha conexões sem usuários ociosas além de max_idle_time"""
+        now = time.time()
+        idle = [key for key, connection in self.connections.items()
+                if connection not in self._users and now - connection.last_used > self.max_idle_time]
+        for key in idle:
+            connection = self.connections.pop(key)
+            self.stats['idle_closed'] += 1
+            await connection.close()
+
+    async def close_all(self):
+        """Fecha todas as conexões do pool"""
+        connections, self.connections = list(self.connections.values()), {}
+        self._connect_locks.clear()
+        for connection in connections:
+            await connection.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'connections': len(self.connections), **self.stats}
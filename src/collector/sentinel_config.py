@@ -15,23 +15,115 @@ class SentinelConfig:
     API_HOST = os.getenv('COLLECTOR_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('COLLECTOR_PORT', '5000'))
     ENABLE_HTTPS = os.getenv('ENABLE_HTTPS', 'false').lower() == 'true'
+    # Estado persistente (limites aprendidos, registro netwatch); padrão ao lado do código, não do CWD
+    DATA_DIR = os.getenv('SENTINEL_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
     
     # Configurações de Cache - Otimizado para muitas requisições por host
     CACHE_TTL = int(os.getenv('CACHE_TTL', '15'))  # Cache menor para resultados mais frescos
     MAX_CACHE_SIZE = int(os.getenv('MAX_CACHE_SIZE', '5000'))  # Cache maior para mais resultados
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # Orçamento de memória (0 desativa)
+    CACHE_COMPRESS_MIN_BYTES = int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '1024'))  # Comprime textos brutos maiores (0 desativa)
+    CACHE_CLEANUP_INTERVAL = float(os.getenv('CACHE_CLEANUP_INTERVAL', '5'))  # Varredura de expirados (0 desativa)
+    CACHE_WHEEL_RESOLUTION = float(os.getenv('CACHE_WHEEL_RESOLUTION', '1'))  # Tick da roda de expiração (segundos)
+    # Stale-while-revalidate: ping vencido é servido na hora e atualizado em background
+    CACHE_STALE_WHILE_REVALIDATE = os.getenv('CACHE_STALE_WHILE_REVALIDATE', 'false').lower() == 'true'
+    CACHE_MAX_STALENESS = float(os.getenv('CACHE_MAX_STALENESS', '60'))  # Tempo máximo após o TTL (segundos)
+    CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', '4'))  # Threads de atualização em background
+    # Política de TTL por tipo de teste/caminho de comando (ver cache_policy.py)
+    CACHE_TTL_POLICY_FILE = os.getenv('CACHE_TTL_POLICY_FILE', '')  # YAML/JSON; vazio usa os padrões
+    CACHE_TTL_POLICY = os.getenv('CACHE_TTL_POLICY', '')  # JSON inline aplicado sobre o arquivo
+    # Cache L2 compartilhado entre workers (arquivo mapeado em memória)
+    CACHE_SHARED_FILE = os.getenv('CACHE_SHARED_FILE', '')  # Ex: /dev/shm/tripleplay-sentinel-cache; vazio desativa
+    CACHE_SHARED_SLOTS = int(os.getenv('CACHE_SHARED_SLOTS', '16384'))  # Número de slots
+    CACHE_SHARED_SLOT_SIZE = int(os.getenv('CACHE_SHARED_SLOT_SIZE', '2048'))  # Bytes por slot (maiores ficam só no L1)
+    # Cache Redis compartilhado entre nós do collector (camada abaixo da memória compartilhada)
+    REDIS_ENABLED = os.getenv('REDIS_ENABLED', 'false').lower() == 'true'
+    REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+    REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+    REDIS_DB = int(os.getenv('REDIS_DB', '0'))
+    REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+    REDIS_KEY_PREFIX = os.getenv('REDIS_KEY_PREFIX', 'sentinel')  # Prefixo das chaves no Redis
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.25'))  # Timeout por comando (segundos)
+    REDIS_RETRY_INTERVAL = float(os.getenv('REDIS_RETRY_INTERVAL', '5'))  # Pausa após erro (segundos)
+    REDIS_LOCK_TTL = float(os.getenv('REDIS_LOCK_TTL', '15'))  # Lock de single-flight entre nós (segundos)
+    REDIS_LOCK_POLL_INTERVAL = float(os.getenv('REDIS_LOCK_POLL_INTERVAL', '0.1'))  # Espera pelo resultado de outro nó
+    REDIS_IO_WORKERS = int(os.getenv('REDIS_IO_WORKERS', '8'))  # Chamadas ao Redis fora do event loop
+    # Snapshots do cache em disco para reinícios aquecidos
+    CACHE_SNAPSHOT_FILE = os.getenv('CACHE_SNAPSHOT_FILE', '')  # Vazio desativa
+    CACHE_SNAPSHOT_INTERVAL = float(os.getenv('CACHE_SNAPSHOT_INTERVAL', '60'))  # Gravação periódica (segundos)
+    CACHE_SNAPSHOT_LOAD_TIMEOUT = float(os.getenv('CACHE_SNAPSHOT_LOAD_TIMEOUT', '2'))  # Tempo máximo de carga
+    # Cache negativo: falhas recentes respondidas sem novo probe (TTL 0 desativa a categoria)
+    NEGATIVE_CACHE_ENABLED = os.getenv('NEGATIVE_CACHE_ENABLED', 'true').lower() == 'true'
+    NEGATIVE_CACHE_ROUTER_TTL = float(os.getenv('NEGATIVE_CACHE_ROUTER_TTL', '5'))  # Roteador inacessível
+    NEGATIVE_CACHE_AUTH_TTL = float(os.getenv('NEGATIVE_CACHE_AUTH_TTL', '60'))  # Login recusado
+    NEGATIVE_CACHE_TARGET_TTL = float(os.getenv('NEGATIVE_CACHE_TARGET_TTL', '10'))  # Target sem resposta
     
     # Configurações MikroTik (valores padrão - porta especificada por request)
     MIKROTIK_API_TIMEOUT = int(os.getenv('MIKROTIK_API_TIMEOUT', '30'))
     MIKROTIK_MAX_RETRIES = int(os.getenv('MIKROTIK_MAX_RETRIES', '3'))
+    # Backend da API: 'librouteros' (thread pool) ou 'asyncio' (cliente nativo sem threads)
+    MIKROTIK_API_BACKEND = os.getenv('MIKROTIK_API_BACKEND', 'librouteros').lower()
+    # Execução do librouteros: 'threads', 'gevent' (greenlets, sem threads) ou 'auto' (gevent se patcheado)
+    MIKROTIK_EXECUTION_MODE = os.getenv('MIKROTIK_EXECUTION_MODE', 'auto').lower()
+    # API-SSL: porta que ativa TLS quando use_ssl não é informado
+    MIKROTIK_API_SSL_PORT = int(os.getenv('MIKROTIK_API_SSL_PORT', '8729'))
+    MIKROTIK_API_SSL_VERIFY = os.getenv('MIKROTIK_API_SSL_VERIFY', 'false').lower() == 'true'
+    MIKROTIK_API_SSL_CA_FILE = os.getenv('MIKROTIK_API_SSL_CA_FILE', '')
+    
+    # Circuit breaker por roteador (falha rápida quando o MikroTik está fora do ar)
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5'))  # Falhas seguidas para abrir
+    CIRCUIT_BREAKER_BASE_BACKOFF = float(os.getenv('CIRCUIT_BREAKER_BASE_BACKOFF', '1'))  # Primeiro backoff aberto (segundos)
+    CIRCUIT_BREAKER_MAX_BACKOFF = float(os.getenv('CIRCUIT_BREAKER_MAX_BACKOFF', '60'))  # Backoff máximo (segundos)
+    RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.2'))  # Retentativas permitidas por requisição
     
     # Configurações de Concorrência - Otimizado para poucos MikroTiks com muitas requisições cada
     MAX_CONCURRENT_HOSTS = int(os.getenv('MAX_CONCURRENT_HOSTS', '15'))  # Máximo 15 MikroTiks simultâneos
     MAX_CONCURRENT_COMMANDS = int(os.getenv('MAX_CONCURRENT_COMMANDS', '200'))  # 200 comandos por MikroTik
     MAX_CONNECTIONS_PER_HOST = int(os.getenv('MAX_CONNECTIONS_PER_HOST', '50'))  # 50 conexões por MikroTik
+    MAX_COMMANDS_PER_CONNECTION = int(os.getenv('MAX_COMMANDS_PER_CONNECTION', '100'))  # Comandos multiplexados (.tag) por conexão
+    # Micro-batching: pings do mesmo roteador que chegam na janela viram um único batch (0 = desativado)
+    PING_BATCH_WINDOW_MS = float(os.getenv('PING_BATCH_WINDOW_MS', '20'))
+    PING_BATCH_MAX_ITEMS = int(os.getenv('PING_BATCH_MAX_ITEMS', str(MAX_COMMANDS_PER_CONNECTION)))  # Despacha antes da janela
+    
+    # Limite adaptativo (AIMD) de comandos simultâneos por roteador, até MAX_CONCURRENT_COMMANDS
+    ADAPTIVE_INITIAL_LIMIT = int(os.getenv('ADAPTIVE_INITIAL_LIMIT', '100'))  # Limite inicial sem histórico
+    ADAPTIVE_MIN_LIMIT = int(os.getenv('ADAPTIVE_MIN_LIMIT', '2'))  # Piso do limite
+    ADAPTIVE_LIMITS_FILE = os.getenv('ADAPTIVE_LIMITS_FILE', os.path.join(DATA_DIR, 'adaptive_limits.json'))  # Persistência (vazio desativa)
+    ADAPTIVE_CPU_SAMPLE_INTERVAL = float(os.getenv('ADAPTIVE_CPU_SAMPLE_INTERVAL', '0'))  # Leitura de cpu-load (0 desativa)
+    ADAPTIVE_CPU_THRESHOLD = float(os.getenv('ADAPTIVE_CPU_THRESHOLD', '80'))  # cpu-load (%) que reduz o limite
+    API_POOL_ACQUIRE_TIMEOUT = float(os.getenv('API_POOL_ACQUIRE_TIMEOUT', '5'))  # Espera máxima na fila do pool (segundos)
+    API_CONNECTION_FRESHNESS = float(os.getenv('API_CONNECTION_FRESHNESS', '60'))  # Reuso sem is_alive se validada há menos de N s
+    API_KEEPALIVE_INTERVAL = float(os.getenv('API_KEEPALIVE_INTERVAL', '30'))  # Intervalo do health checker (0 desativa)
+    API_MAX_IDLE_TIME = float(os.getenv('API_MAX_IDLE_TIME', '300'))  # Conexões ociosas além disso são fechadas
+    
+    # Pré-aquecimento do pool a partir do inventário de roteadores
+    ROUTER_INVENTORY_FILE = os.getenv('ROUTER_INVENTORY_FILE', '')  # YAML/JSON; vazio desativa
+    PREWARM_MIN_SESSIONS = int(os.getenv('PREWARM_MIN_SESSIONS', '2'))  # Sessões autenticadas mínimas por roteador
+    PREWARM_HOT_SPARES = int(os.getenv('PREWARM_HOT_SPARES', '1'))  # Sessões ociosas de reserva por roteador
+    
+    # Sondas persistentes via /tool/netwatch (ping servido do snapshot coletado)
+    NETWATCH_MODE = os.getenv('NETWATCH_MODE', 'false').lower() == 'true'
+    NETWATCH_PROBE_INTERVAL = int(os.getenv('NETWATCH_PROBE_INTERVAL', '30'))  # Intervalo da sonda no roteador (segundos)
+    NETWATCH_COLLECT_INTERVAL = float(os.getenv('NETWATCH_COLLECT_INTERVAL', '30'))  # Um print por roteador a cada N s
+    NETWATCH_MAX_AGE = float(os.getenv('NETWATCH_MAX_AGE', '90'))  # Snapshot mais velho que isso não é usado
+    NETWATCH_RECONCILE_INTERVAL = float(os.getenv('NETWATCH_RECONCILE_INTERVAL', '300'))  # Correção de divergências
+    NETWATCH_TARGET_TTL = float(os.getenv('NETWATCH_TARGET_TTL', '3600'))  # Target não requisitado é removido
+    NETWATCH_OWNER_ID = os.getenv('NETWATCH_OWNER_ID', '')  # Dono das entradas deste nó (vazio = hostname)
+    NETWATCH_STATE_DIR = os.getenv('NETWATCH_STATE_DIR', os.path.join(DATA_DIR, 'netwatch'))  # Registro entre workers
+    
+    # Comandos genéricos (/api/v2/mikrotik/command e /batch)
+    COMMAND_ALLOW_WRITE = os.getenv('COMMAND_ALLOW_WRITE', 'false').lower() == 'true'  # Permite add/set/remove
+    COMMAND_MAX_ROWS = int(os.getenv('COMMAND_MAX_ROWS', '10000'))  # Linhas máximas por comando (0 desativa)
     
     # Configurações de Performance - Ajustado para alta carga por MikroTik
     MAX_WORKERS = int(os.getenv('MAX_WORKERS', '50'))  # Mais workers para processar requisições
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '120'))  # Timeout maior para traceroute
+    # Prazo das corrotinas enviadas ao event loop persistente (abaixo do timeout do gunicorn; 0 = sem prazo)
+    ASYNC_REQUEST_TIMEOUT = float(os.getenv('ASYNC_REQUEST_TIMEOUT', '110'))
+    # Broker de conexões: socket Unix do processo dono das sessões RouterOS e do cache (vazio = desativado)
+    BROKER_SOCKET = os.getenv('BROKER_SOCKET', '')
+    BROKER_AUTOSTART = os.getenv('BROKER_AUTOSTART', 'true').lower() == 'true'  # Master do gunicorn inicia o broker
+    BROKER_FALLBACK_LOCAL = os.getenv('BROKER_FALLBACK_LOCAL', 'true').lower() == 'true'  # Broker fora: conector do worker
     
     # Configurações de Segurança
     API_KEY = os.getenv('API_KEY')  # Opcional para autenticação
@@ -65,15 +157,78 @@ class SentinelConfig:
             'api_host': cls.API_HOST,
             'api_port': cls.API_PORT,
             'enable_https': cls.ENABLE_HTTPS,
+            'data_dir': cls.DATA_DIR,
             'cache_ttl': cls.CACHE_TTL,
             'max_cache_size': cls.MAX_CACHE_SIZE,
+            'cache_max_bytes': cls.CACHE_MAX_BYTES,
+            'cache_compress_min_bytes': cls.CACHE_COMPRESS_MIN_BYTES,
+            'cache_cleanup_interval': cls.CACHE_CLEANUP_INTERVAL,
+            'cache_wheel_resolution': cls.CACHE_WHEEL_RESOLUTION,
+            'cache_stale_while_revalidate': cls.CACHE_STALE_WHILE_REVALIDATE,
+            'cache_max_staleness': cls.CACHE_MAX_STALENESS,
+            'cache_refresh_workers': cls.CACHE_REFRESH_WORKERS,
+            'cache_ttl_policy_file': cls.CACHE_TTL_POLICY_FILE,
+            'cache_shared_file': cls.CACHE_SHARED_FILE,
+            'cache_shared_slots': cls.CACHE_SHARED_SLOTS,
+            'cache_shared_slot_size': cls.CACHE_SHARED_SLOT_SIZE,
+            'redis_enabled': cls.REDIS_ENABLED,
+            'redis_host': cls.REDIS_HOST,
+            'redis_port': cls.REDIS_PORT,
+            'redis_db': cls.REDIS_DB,
+            'redis_key_prefix': cls.REDIS_KEY_PREFIX,
+            'redis_lock_ttl': cls.REDIS_LOCK_TTL,
+            'redis_io_workers': cls.REDIS_IO_WORKERS,
+            'cache_snapshot_file': cls.CACHE_SNAPSHOT_FILE,
+            'cache_snapshot_interval': cls.CACHE_SNAPSHOT_INTERVAL,
+            'cache_snapshot_load_timeout': cls.CACHE_SNAPSHOT_LOAD_TIMEOUT,
+            'negative_cache_enabled': cls.NEGATIVE_CACHE_ENABLED,
+            'negative_cache_router_ttl': cls.NEGATIVE_CACHE_ROUTER_TTL,
+            'negative_cache_auth_ttl': cls.NEGATIVE_CACHE_AUTH_TTL,
+            'negative_cache_target_ttl': cls.NEGATIVE_CACHE_TARGET_TTL,
             'mikrotik_api_timeout': cls.MIKROTIK_API_TIMEOUT,
             'mikrotik_max_retries': cls.MIKROTIK_MAX_RETRIES,
+            'mikrotik_api_backend': cls.MIKROTIK_API_BACKEND,
+            'mikrotik_execution_mode': cls.MIKROTIK_EXECUTION_MODE,
+            'mikrotik_api_ssl_port': cls.MIKROTIK_API_SSL_PORT,
+            'mikrotik_api_ssl_verify': cls.MIKROTIK_API_SSL_VERIFY,
+            'circuit_breaker_failure_threshold': cls.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            'circuit_breaker_base_backoff': cls.CIRCUIT_BREAKER_BASE_BACKOFF,
+            'circuit_breaker_max_backoff': cls.CIRCUIT_BREAKER_MAX_BACKOFF,
+            'retry_budget_ratio': cls.RETRY_BUDGET_RATIO,
             'max_concurrent_hosts': cls.MAX_CONCURRENT_HOSTS,
             'max_concurrent_commands': cls.MAX_CONCURRENT_COMMANDS,
             'max_connections_per_host': cls.MAX_CONNECTIONS_PER_HOST,
+            'max_commands_per_connection': cls.MAX_COMMANDS_PER_CONNECTION,
+            'ping_batch_window_ms': cls.PING_BATCH_WINDOW_MS,
+            'ping_batch_max_items': cls.PING_BATCH_MAX_ITEMS,
+            'adaptive_initial_limit': cls.ADAPTIVE_INITIAL_LIMIT,
+            'adaptive_min_limit': cls.ADAPTIVE_MIN_LIMIT,
+            'adaptive_limits_file': cls.ADAPTIVE_LIMITS_FILE,
+            'adaptive_cpu_sample_interval': cls.ADAPTIVE_CPU_SAMPLE_INTERVAL,
+            'adaptive_cpu_threshold': cls.ADAPTIVE_CPU_THRESHOLD,
+            'api_pool_acquire_timeout': cls.API_POOL_ACQUIRE_TIMEOUT,
+            'api_connection_freshness': cls.API_CONNECTION_FRESHNESS,
+            'api_keepalive_interval': cls.API_KEEPALIVE_INTERVAL,
+            'api_max_idle_time': cls.API_MAX_IDLE_TIME,
+            'router_inventory_file': cls.ROUTER_INVENTORY_FILE,
+            'prewarm_min_sessions': cls.PREWARM_MIN_SESSIONS,
+            'prewarm_hot_spares': cls.PREWARM_HOT_SPARES,
+            'netwatch_mode': cls.NETWATCH_MODE,
+            'netwatch_probe_interval': cls.NETWATCH_PROBE_INTERVAL,
+            'netwatch_collect_interval': cls.NETWATCH_COLLECT_INTERVAL,
+            'netwatch_max_age': cls.NETWATCH_MAX_AGE,
+            'netwatch_reconcile_interval': cls.NETWATCH_RECONCILE_INTERVAL,
+            'netwatch_target_ttl': cls.NETWATCH_TARGET_TTL,
+            'netwatch_owner_id': cls.NETWATCH_OWNER_ID,
+            'netwatch_state_dir': cls.NETWATCH_STATE_DIR,
+            'command_allow_write': cls.COMMAND_ALLOW_WRITE,
+            'command_max_rows': cls.COMMAND_MAX_ROWS,
             'max_workers': cls.MAX_WORKERS,
             'request_timeout': cls.REQUEST_TIMEOUT,
+            'async_request_timeout': cls.ASYNC_REQUEST_TIMEOUT,
+            'broker_socket': cls.BROKER_SOCKET,
+            'broker_autostart': cls.BROKER_AUTOSTART,
+            'broker_fallback_local': cls.BROKER_FALLBACK_LOCAL,
             'enable_auth': cls.ENABLE_AUTH,
             'log_level': cls.LOG_LEVEL,
             'debug': cls.DEBUG,
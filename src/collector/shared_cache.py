@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Cache compartilhado entre workers (memória mapeada)
+Camada L2 do SentinelCache: um resultado obtido por um worker do gunicorn é
+servido pelos demais sem novo probe no roteador
+
+Layout do arquivo (CACHE_SHARED_FILE, de preferência em /dev/shm):
+    cabeçalho (64 bytes): magic 'STSM' | versão | slots | tamanho do slot
+    slots de tamanho fixo agrupados em conjuntos de SET_WAYS:
+        seq (u32) | hash (u64) | expires_at | stale_until | stored_at (f64, relógio
+        de parede) | tam. chave (u32) | tam. valor (u32, bit alto = zlib) | chave | valor
+
+Concorrência:
+    - escrita: lock por faixa (stripe) = threading.Lock no processo + fcntl.lockf
+      em um byte do arquivo entre processos
+    - leitura: seqlock sem lock (seq ímpar = escrita em andamento; seq diferente
+      antes/depois = releitura)
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from cache_backend import BackendRecord, CacheBackend, encode_key
+
+logger = logging.getLogger('sentinel-shared-cache')
+
+MAGIC = b'STSM'
+VERSION = 1
+HEADER_SIZE = 64
+SET_WAYS = 4  # Slots por conjunto (associatividade)
+
+_HEADER = struct.Struct('<4sHHII')
+_SLOT = struct.Struct('<IQdddII')
+_SEQ = struct.Struct('<I')
+_COMPRESSED = 0x80000000
+_COMPRESS_MIN = 512
+
+# Bytes de lock no arquivo: 0 = inicialização, 1..N = stripes
+_INIT_LOCK = 0
+
+
+class SharedMemoryCache(CacheBackend):
+    """Tabela hash de slots fixos em um arquivo mapeado em memória"""
+
+    name = 'shared'
+
+    def __init__(self, path: str, slots: int = 16384, slot_size: int = 2048, stripes: int = 64):
+        self.path = path
+        self.slot_size = max(slot_size, _SLOT.size + 64)
+        self.sets = max(1, slots // SET_WAYS)
+        self.slots = self.sets * SET_WAYS
+        self.stripes = max(1, min(stripes, self.sets))
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+        self._open_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._pid: Optional[int] = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'replaced': 0,
+            'too_large': 0,
+            'read_retries': 0
+        }
+
+    @property
+    def size_bytes(self) -> int:
+        return HEADER_SIZE + self.slots * self.slot_size
+
+    # ===== ARQUIVO E LOCKS =====
+
+    def _ensure_open(self) -> mmap.mmap:
+        """Mapeia o arquivo neste processo (inicializa se ausente ou com outro layout)"""
+        if self._pid == os.getpid() and self._mm is not None:
+            return self._mm
+
+        with self._open_lock:
+            if self._pid == os.getpid() and self._mm is not None:
+                return self._mm
+
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, _INIT_LOCK)
+            try:
+                header = os.pread(fd, _HEADER.size, 0)
+                expected = _HEADER.pack(MAGIC, VERSION, 0, self.slots, self.slot_size)
+                if header != expected or os.fstat(fd).st_size != self.size_bytes:
+                    # Arquivo novo ou de outra configuração: recria zerado
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size_bytes)
+                    os.pwrite(fd, expected, 0)
+                    logger.info(f"Cache compartilhado criado em {self.path} "
+                                f"({self.slots} slots x {self.slot_size} bytes)")
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, _INIT_LOCK)
+
+            self._mm = mmap.mmap(fd, self.size_bytes, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            self._fd = fd
+            # Locks de thread herdados do fork podem estar presos
+            self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+            self._pid = os.getpid()
+            return self._mm
+
+    def _lock_stripe(self, stripe: int):
+        self._thread_locks[stripe].acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 1 + stripe)
+        except BaseException:
+            self._thread_locks[stripe].release()
+            raise
+
+    def _unlock_stripe(self, stripe: int):
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 1 + stripe)
+        finally:
+            self._thread_locks[stripe].release()
+
+    def _locate(self, key: bytes) -> Tuple[int, int, int]:
+        """(hash, primeiro slot do conjunto, stripe)"""
+        digest = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+        set_index = digest % self.sets
+        return digest, set_index * SET_WAYS, set_index % self.stripes
+
+    def _offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * self.slot_size
+
+    # ===== LEITURA / ESCRITA =====
+
+    def get(self, cache_key: Hashable) -> Optional[BackendRecord]:
+        """
+        Lê uma entrada ainda servível (antes de stale_until)
+
+        Returns:
+            Tupla (resultado, expires_at, stale_until, stored_at) em relógio de parede, ou None
+        """
+        mm = self._ensure_open()
+        key = encode_key(cache_key)
+        digest, first, _ = self._locate(key)
+        now = time.time()
+
+        for slot in range(first, first + SET_WAYS):
+            offset = self._offset(slot)
+            for _ in range(4):
+                seq = _SEQ.unpack_from(mm, offset)[0]
+                if seq & 1:
+                    self._stats['read_retries'] += 1
+                    time.sleep(0)
+                    continue
+
+                _, slot_hash, expires_at, stale_until, stored_at, key_len, value_len = \
+                    _SLOT.unpack_from(mm, offset)
+                if slot_hash != digest or stale_until <= now:
+                    if _SEQ.unpack_from(mm, offset)[0] == seq:
+                        break
+                    self._stats['read_retries'] += 1
+                    continue
+
+                length = value_len & ~_COMPRESSED
+                start = offset + _SLOT.size
+                if key_len + length > self.slot_size - _SLOT.size:
+                    break
+                stored_key = mm[start:start + key_len]
+                value = mm[start + key_len:start + key_len + length]
+
+                if _SEQ.unpack_from(mm, offset)[0] != seq:
+                    self._stats['read_retries'] += 1
+                    continue
+                if stored_key != key:
+                    break  # Colisão de hash
+
+                if value_len & _COMPRESSED:
+                    value = zlib.decompress(value)
+                self._stats['hits'] += 1
+                return json.loads(value), expires_at, stale_until, stored_at
+
+        self._stats['misses'] += 1
+        return None
+
+    def set(self, cache_key: Hashable, result: Dict[str, Any], expires_at: float,
+            stale_until: float, stored_at: float) -> bool:
+        """
+        Grava uma entrada (instantes em relógio de parede)
+
+        Returns:
+            False se a entrada não cabe em um slot
+        """
+        mm = self._ensure_open()
+        key = encode_key(cache_key)
+        value = json.dumps(result, separators=(',', ':'), default=str).encode('utf-8')
+        flags = 0
+        if len(value) >= _COMPRESS_MIN:
+            compressed = zlib.compress(value, 1)
+            if len(compressed) < len(value):
+                value, flags = compressed, _COMPRESSED
+
+        if len(key) + len(value) > self.slot_size - _SLOT.size:
+            self._stats['too_large'] += 1
+            return False
+
+        digest, first, stripe = self._locate(key)
+        self._lock_stripe(stripe)
+        try:
+            slot = self._choose_slot(mm, first, digest, key)
+            offset = self._offset(slot)
+            seq = _SEQ.unpack_from(mm, offset)[0]
+
+            _SEQ.pack_into(mm, offset, (seq + 1) | 1)  # Escrita em andamento
+            _SLOT.pack_into(mm, offset, (seq + 1) | 1, digest, expires_at, stale_until, stored_at,
+                            len(key), len(value) | flags)
+            start = offset + _SLOT.size
+            mm[start:start + len(key)] = key
+            mm[start + len(key):start + len(key) + len(value)] = value
+            _SEQ.pack_into(mm, offset, ((seq + 1) | 1) + 1)  # Par: consistente
+        finally:
+            self._unlock_stripe(stripe)
+
+        self._stats['writes'] += 1
+        return True
+
+    def _choose_slot(self, mm: mmap.mmap, first: int, digest: int, key: bytes) -> int:
+        """Slot da mesma chave, senão vazio/vencido, senão o que vence primeiro (stripe travada)"""
+        now = time.time()
+        victim = first
+        victim_until = None
+
+        for slot in range(first, first + SET_WAYS):
+            offset = self._offset(slot)
+            _, slot_hash, _, stale_until, _, key_len, _ = _SLOT.unpack_from(mm, offset)
+            if slot_hash == digest:
+                start = offset + _SLOT.size
+                if mm[start:start + key_len] == key:
+                    return slot
+            if slot_hash == 0 or stale_until <= now:
+                return slot
+            if victim_until is None or stale_until < victim_until:
+                victim, victim_until = slot, stale_until
+
+        self._stats['replaced'] += 1
+        return victim
+
+    def delete(self, cache_key: Hashable):
+        """Remove a chave (se presente)"""
+        mm = self._ensure_open()
+        key = encode_key(cache_key)
+        digest, first, stripe = self._locate(key)
+
+        self._lock_stripe(stripe)
+        try:
+            for slot in range(first, first + SET_WAYS):
+                offset = self._offset(slot)
+                seq, slot_hash, _, _, _, key_len, _ = _SLOT.unpack_from(mm, offset)
+                start = offset + _SLOT.size
+                if slot_hash == digest and mm[start:start + key_len] == key:
+                    _SLOT.pack_into(mm, offset, seq + 2 if not seq & 1 else seq + 1, 0, 0.0, 0.0, 0.0, 0, 0)
+        finally:
+            self._unlock_stripe(stripe)
+
+    def clear(self) -> int:
+        """Zera todos os slots (afeta todos os workers)"""
+        mm = self._ensure_open()
+        now = time.time()
+        count = 0
+
+        for stripe in range(self.stripes):
+            self._lock_stripe(stripe)
+            try:
+                for set_index in range(stripe, self.sets, self.stripes):
+                    for slot in range(set_index * SET_WAYS, (set_index + 1) * SET_WAYS):
+                        offset = self._offset(slot)
+                        seq, slot_hash, _, stale_until, _, _, _ = _SLOT.unpack_from(mm, offset)
+                        if slot_hash:
+                            count += stale_until > now
+                            _SLOT.pack_into(mm, offset, seq + 2 if not seq & 1 else seq + 1,
+                                            0, 0.0, 0.0, 0.0, 0, 0)
+            finally:
+                self._unlock_stripe(stripe)
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores deste processo e ocupação do arquivo"""
+        stats = {
+            'path': self.path,
+            'slots': self.slots,
+            'slot_size': self.slot_size,
+            'size_bytes': self.size_bytes,
+            **self._stats
+        }
+        total = self._stats['hits'] + self._stats['misses']
+        stats['hit_rate_percent'] = round(self._stats['hits'] / total * 100, 2) if total else 0
+        return stats
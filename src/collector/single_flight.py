@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+TriplePlay-Sentinel - Single-flight (coalescência de requisições)
+Requisições simultâneas para a mesma chave aguardam a execução já em andamento
+
+Vários proxies Zabbix e o dashboard costumam consultar o mesmo target no mesmo
+instante: apenas o primeiro (líder) executa o teste no roteador, os demais
+recebem o mesmo resultado. O resultado é entregue por concurrent.futures.Future,
+então funciona entre threads e entre event loops diferentes (cada requisição
+Flask usa o seu).
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger('sentinel-single-flight')
+
+
+class SingleFlight:
+    """Registro das execuções em andamento por chave"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'leaders': 0,
+            'coalesced': 0
+        }
+
+    def begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Entra na execução da chave
+
+        Returns:
+            Tupla (future, líder) - o líder executa e chama finish(); os demais
+            aguardam o future
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                return future, False
+
+            future = Future()
+            self._calls[key] = future
+            self._stats['leaders'] += 1
+            return future, True
+
+    def finish(self, key: Hashable, result: Any = None, error: Optional[BaseException] = None):
+        """Publica o resultado (ou erro) do líder e libera a chave"""
+        with self._lock:
+            future = self._calls.pop(key, None)
+
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def wait(self, future: Future) -> Any:
+        """Aguarda o resultado do líder sem bloquear o event loop"""
+        return await asyncio.wrap_future(future)
+
+    def in_flight(self) -> int:
+        """Execuções em andamento"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Líderes vs requisições coalescidas"""
+        with self._lock:
+            total = self._stats['leaders'] + self._stats['coalesced']
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self._stats['leaders'],
+                'coalesced': self._stats['coalesced'],
+                'coalesced_percent': round(self._stats['coalesced'] / total * 100, 2) if total else 0
+            }
+
+
+# Instância global de coalescência
+single_flight = SingleFlight()
@@ -173,6 +173,35 @@ run_production() {
         sentinel_api_server:app
 }
 
+# Função para executar em modo ASGI (asyncio nativo, mesmas rotas)
+run_asgi() {
+    log "Executando em modo ASGI (Gunicorn + Uvicorn)..."
+    
+    if ! python3 -c "import uvicorn" &> /dev/null; then
+        error "Uvicorn não encontrado. Instale com: pip3 install uvicorn"
+        exit 1
+    fi
+    
+    cd "${SCRIPT_DIR}"
+    
+    exec gunicorn \
+        --config=${SCRIPT_DIR}/gunicorn.conf.py \
+        --worker-class=uvicorn.workers.UvicornWorker \
+        asgi_app:app
+}
+
+# Função para executar apenas o broker de conexões (BROKER_AUTOSTART=false)
+run_broker() {
+    if [ -z "${BROKER_SOCKET}" ]; then
+        error "Defina BROKER_SOCKET (ex.: /tmp/sentinel-broker.sock)"
+        exit 1
+    fi
+    
+    log "Executando broker de conexões em ${BROKER_SOCKET}..."
+    cd "${SCRIPT_DIR}"
+    exec python3 connection_broker.py
+}
+
 # Função para mostrar ajuda
 show_help() {
     cat << EOF
@@ -182,6 +211,8 @@ Comandos disponíveis:
     install     Instala dependências Python
     run         Executa o collector (desenvolvimento)
     start       Executa o collector (produção com Gunicorn)
+    asgi        Executa o collector em modo ASGI (Gunicorn + Uvicorn)
+    broker      Executa apenas o broker de conexões (BROKER_SOCKET)
     check       Verifica dependências e configurações
     help        Mostra esta ajuda
 
@@ -213,6 +244,13 @@ case "${1:-run}" in
         check_connectivity
         run_production
         ;;
+    "asgi")
+        check_connectivity
+        run_asgi
+        ;;
+    "broker")
+        run_broker
+        ;;
     "check")
         log "Verificando configurações..."
         check_connectivity
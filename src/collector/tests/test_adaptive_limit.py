@@ -0,0 +1,30 @@
+"""Amostras de latência do limite adaptativo"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adaptive_limit import AdaptiveLimiter
+from mikrotik_connector import ping_latency_sample
+
+
+def test_lossy_ping_gives_no_latency_sample():
+    assert abs(ping_latency_sample({'packet_loss_percent': 0.0}, 3.2, 4) - 0.2) < 1e-9
+    assert ping_latency_sample({'packet_loss_percent': 25.0}, 13.0, 4) is None
+    assert ping_latency_sample({}, 13.0, 4) is None
+
+
+def test_dead_target_does_not_shrink_limit():
+    limiter = AdaptiveLimiter('10.0.0.1:8728', initial_limit=50, min_limit=2, max_limit=200)
+    for _ in range(20):
+        limiter.acquire(1)
+        limiter.release(1, ping_latency_sample({'packet_loss_percent': 0.0}, 3.02, 4))
+    limit = limiter.limit
+
+    # Target morto: o ping espera o timeout de cada pacote, o roteador está ocioso
+    for _ in range(20):
+        limiter.acquire(1)
+        limiter.release(1, ping_latency_sample({'packet_loss_percent': 100.0}, 12.0, 4))
+
+    assert limiter.limit >= limit
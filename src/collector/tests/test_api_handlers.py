@@ -0,0 +1,51 @@
+"""Parâmetros do corpo das requisições repassados ao conector"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_handlers
+from mikrotik_connector import mikrotik_api_pool, mikrotik_connector
+
+BODY = {'host': '10.0.0.1', 'username': 'admin', 'password': 'senha', 'port': 8728, 'use_ssl': True}
+
+
+def test_ping_passes_use_ssl(monkeypatch):
+    calls = []
+
+    def execute_batch_ping(host, username, password, addresses, count=4, size=64, port=8728,
+                           use_ssl=None):
+        calls.append((port, use_ssl))
+        return {address: {'status': 'success', 'data': {'packet_loss_percent': 0.0}}
+                for address in addresses}
+
+    monkeypatch.setattr(mikrotik_connector, 'api_backend', 'threads')
+    monkeypatch.setattr(mikrotik_api_pool, 'execute_batch_ping', execute_batch_ping)
+    monkeypatch.setattr(mikrotik_api_pool, 'get_cpu_load', lambda *args: None)
+
+    body, status = asyncio.run(api_handlers.ping(dict(BODY, targets=['8.8.8.8'], count=1,
+                                                      use_cache=False)))
+
+    assert status == 200
+    assert body['results']['8.8.8.8']['status'] == 'success'
+    assert calls == [(8728, True)]
+
+
+def test_command_passes_use_ssl(monkeypatch):
+    calls = []
+
+    def execute_menu_command(host, username, password, path, proplist=None, query=None,
+                             params=None, port=8728, use_ssl=None, max_rows=0):
+        calls.append((path, port, use_ssl))
+        return {'rows': [], 'execution_time_seconds': 0}
+
+    monkeypatch.setattr(mikrotik_api_pool, 'execute_menu_command', execute_menu_command)
+
+    body, status = asyncio.run(api_handlers.command(dict(BODY, command='/system/identity/print',
+                                                         use_cache=False)))
+
+    assert status == 200
+    assert body['status'] == 'success'
+    assert calls == [('/system/identity/print', 8728, True)]
@@ -0,0 +1,179 @@
+"""Manutenção do pool de conexões API"""
+
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import RouterInventoryEntry
+from mikrotik_connector import MikroTikAPIConnection, MikroTikAPIPool
+
+
+class _FakeApi:
+    """Sessão librouteros que responde a qualquer comando"""
+
+    def __init__(self):
+        self.calls = 0
+        self.closed = False
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return iter([{'name': 'router'}])
+
+    def close(self):
+        self.closed = True
+
+
+def _idle_connection(pool: MikroTikAPIPool, idle_for: float) -> MikroTikAPIConnection:
+    conn = MikroTikAPIConnection('10.0.0.1', 'admin', 'senha', 8728)
+    conn.connection = _FakeApi()
+    conn.connected = True
+    conn.last_used = time.time() - idle_for
+    pool._get_host_pool(pool._get_pool_key('10.0.0.1', 'admin', 8728)).connections.append(conn)
+    return conn
+
+
+def test_idle_connection_reaped_after_keepalives():
+    pool = MikroTikAPIPool(keepalive_interval=30.0, max_idle_time=300.0)
+    conn = _idle_connection(pool, idle_for=400.0)
+    api = conn.connection
+    last_used = conn.last_used
+
+    for _ in range(3):
+        conn.last_validated = 0.0  # Força o keepalive em cada rodada
+        pool.check_idle_connections()
+
+    assert api.calls == 3
+    assert conn.last_used == last_used
+    assert conn.last_keepalive > last_used
+
+    pool.cleanup_idle_connections(300.0)
+
+    host_pool = pool._get_host_pool(pool._get_pool_key('10.0.0.1', 'admin', 8728))
+    assert conn not in host_pool.connections
+    assert api.closed
+
+
+def test_recently_used_connection_survives_cleanup():
+    pool = MikroTikAPIPool(keepalive_interval=30.0, max_idle_time=300.0)
+    conn = _idle_connection(pool, idle_for=10.0)
+
+    pool.check_idle_connections()
+    pool.cleanup_idle_connections(300.0)
+
+    host_pool = pool._get_host_pool(pool._get_pool_key('10.0.0.1', 'admin', 8728))
+    assert conn in host_pool.connections
+
+
+def test_unreachable_router_does_not_delay_warm_pools(monkeypatch):
+    release = threading.Event()
+    opened = []
+
+    def connect(conn):
+        if conn.host == '10.0.0.99':
+            release.wait(5)  # Timeout de conexão de um roteador inacessível
+            conn.last_error = 'timed out'
+            return False
+        conn.connection = _FakeApi()
+        conn.connected = True
+        opened.append(conn.host)
+        return True
+
+    monkeypatch.setattr(MikroTikAPIConnection, 'connect', connect)
+    pool = MikroTikAPIPool(keepalive_interval=0)
+    for host in ('10.0.0.99', '10.0.0.1', '10.0.0.2'):
+        entry = RouterInventoryEntry(host, 'admin', 'senha', min_sessions=1)
+        pool.warm_targets[pool._get_pool_key(host, 'admin', 8728)] = entry
+
+    try:
+        start = time.monotonic()
+        pool.maintain_warm_pools()
+        pool.maintain_warm_pools()  # Próximo ciclo com o roteador lento ainda em andamento
+        assert time.monotonic() - start < 1.0
+
+        deadline = time.monotonic() + 2.0
+        while len(opened) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(opened) == ['10.0.0.1', '10.0.0.2']
+
+        slow_pool = pool._get_host_pool(pool._get_pool_key('10.0.0.99', 'admin', 8728))
+        assert slow_pool.pending == 1  # Uma única abertura em andamento
+    finally:
+        release.set()
+
+
+def _p99(values: list) -> float:
+    return values[int(len(values) * 0.99)]
+
+
+def _acquire_latencies(pool: MikroTikAPIPool, host: str, rounds: int, threads: int = 4) -> list:
+    """Tempo de cada get_connection() de um roteador saudável (várias threads)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(rounds):
+            start = time.perf_counter()
+            with pool.get_connection(host, 'admin', 'senha', 8728):
+                elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sorted(latencies)
+
+
+def test_blackholed_router_does_not_delay_healthy_acquisitions():
+    # Aceita o TCP e nunca responde ao login (roteador em blackhole)
+    blackhole = socket.socket()
+    blackhole.bind(('127.0.0.1', 0))
+    blackhole.listen(16)
+    blackhole_port = blackhole.getsockname()[1]
+
+    pool = MikroTikAPIPool(max_connections_per_host=4, keepalive_interval=0)
+    healthy = pool._get_host_pool(pool._get_pool_key('10.0.0.1', 'admin', 8728))
+    for _ in range(4):
+        conn = MikroTikAPIConnection('10.0.0.1', 'admin', 'senha', 8728)
+        conn.connection = _FakeApi()
+        conn.connected = True
+        conn.last_validated = time.time()
+        healthy.connections.append(conn)
+
+    def acquire_blackholed():
+        try:
+            with pool.get_connection('127.0.0.1', 'admin', 'senha', blackhole_port):
+                pass
+        except Exception:
+            pass
+
+    baseline = _acquire_latencies(pool, '10.0.0.1', 200)
+
+    stuck = [threading.Thread(target=acquire_blackholed, daemon=True) for _ in range(3)]
+    for thread in stuck:
+        thread.start()
+    slow_pool = pool._get_host_pool(pool._get_pool_key('127.0.0.1', 'admin', blackhole_port))
+    deadline = time.monotonic() + 2.0
+    while slow_pool.pending < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    try:
+        assert slow_pool.pending == 3
+        during = _acquire_latencies(pool, '10.0.0.1', 200)
+        assert slow_pool.pending == 3  # Os connects continuaram pendentes durante a medição
+    finally:
+        blackhole.close()  # RST nas conexões da fila: os connects pendentes falham
+        for thread in stuck:
+            thread.join(5)
+
+    print(f"\naquisição saudável p50/p99: sem blackhole {statistics.median(baseline) * 1000:.2f}/"
+          f"{_p99(baseline) * 1000:.2f} ms | 3 connects em blackhole "
+          f"{statistics.median(during) * 1000:.2f}/{_p99(during) * 1000:.2f} ms")
+    assert _p99(during) < 0.05
@@ -0,0 +1,56 @@
+"""Event loop persistente por worker"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from background_loop import BackgroundLoop
+
+
+async def _answer() -> int:
+    await asyncio.sleep(0)
+    return 42
+
+
+def test_loop_thread_starts_outside_lock(monkeypatch):
+    # Worker gevent com preload_app: o lock é real e start() cede o greenlet
+    background = BackgroundLoop('test-loop')
+    lock_held = []
+    original_start = threading.Thread.start
+
+    def start(thread):
+        if thread.name == 'test-loop':
+            lock_held.append(background._lock.locked())
+        original_start(thread)
+
+    monkeypatch.setattr(threading.Thread, 'start', start)
+    try:
+        assert background.run(_answer(), timeout=5) == 42
+        assert background.run(_answer(), timeout=5) == 42
+    finally:
+        background.stop()
+
+    assert lock_held == [False]
+    assert background.get_stats()['loops_started'] == 1
+
+
+def test_coroutine_submitted_while_loop_starts():
+    background = BackgroundLoop('test-loop')
+    gate = threading.Event()
+    original_run = BackgroundLoop._run
+
+    def delayed_run(loop):
+        gate.wait(5)
+        original_run(loop)
+
+    background._run = delayed_run
+    try:
+        future = background.submit(_answer())
+        assert not future.done()
+        gate.set()
+        assert future.result(5) == 42
+    finally:
+        background.stop()
@@ -0,0 +1,103 @@
+"""Quadros do broker e multiplexação cliente/servidor em um socket Unix temporário"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import connection_broker
+from connection_broker import (_COMPRESSED, _FRAME, MAX_FRAME_SIZE, BrokerClient, BrokerError,
+                               BrokerServer, encode_frame, read_frame)
+
+
+def _read(data: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_frame(reader)
+    return asyncio.run(run())
+
+
+def test_frame_round_trip_and_compression():
+    small = {'m': 'get_stats', 'a': {}}
+    large = {'r': [{'target': f"10.0.{i // 256}.{i % 256}", 'status': 'success'} for i in range(500)]}
+
+    small_frame = encode_frame(7, small)
+    large_frame = encode_frame(8, large)
+
+    assert _FRAME.unpack_from(small_frame)[2] & _COMPRESSED == 0
+    length, request_id, flags = _FRAME.unpack_from(large_frame)
+    assert flags & _COMPRESSED and length == len(large_frame) - _FRAME.size
+    assert _read(small_frame) == (7, small)
+    assert _read(large_frame) == (8, large)
+
+
+def test_oversized_frame_is_rejected():
+    with pytest.raises(BrokerError):
+        _read(_FRAME.pack(MAX_FRAME_SIZE + 1, 1, 0))
+
+
+@pytest.fixture
+def socket_path():
+    # Caminho curto: sockets Unix têm limite de ~108 bytes
+    directory = tempfile.mkdtemp(prefix='broker-')
+    yield os.path.join(directory, 'broker.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+async def _fake_dispatch(method, kwargs):
+    if method == 'falha':
+        raise ValueError('operação falhou')
+    await asyncio.sleep(kwargs.get('delay', 0))
+    return kwargs.get('value')
+
+
+def test_client_multiplexes_requests_on_one_channel(socket_path, monkeypatch):
+    monkeypatch.setattr(connection_broker, 'dispatch', _fake_dispatch)
+
+    async def run():
+        server = BrokerServer(socket_path)
+        await server.start()
+        client = BrokerClient(socket_path, timeout=5, fallback_local=False)
+        try:
+            start = time.monotonic()
+            # A mais lenta primeiro: respostas chegam fora de ordem, cada uma ao seu id
+            results = await asyncio.gather(*[client.call('eco', value=i, delay=0.3 - i * 0.1)
+                                             for i in range(3)])
+            elapsed = time.monotonic() - start
+            with pytest.raises(BrokerError, match='operação falhou'):
+                await client.call('falha')
+            return results, elapsed, client.get_stats(), server.get_stats()
+        finally:
+            await server.close()
+
+    results, elapsed, client_stats, server_stats = asyncio.run(run())
+
+    assert results == [0, 1, 2]
+    assert elapsed < 0.5  # Simultâneas, não em sequência (0,6 s)
+    assert client_stats['connects'] == 1
+    assert server_stats['requests'] == 4 and server_stats['errors'] == 1
+
+
+def test_client_timeout_raises_broker_error(socket_path, monkeypatch):
+    monkeypatch.setattr(connection_broker, 'dispatch', _fake_dispatch)
+
+    async def run():
+        server = BrokerServer(socket_path)
+        await server.start()
+        client = BrokerClient(socket_path, timeout=0.05, fallback_local=False)
+        try:
+            with pytest.raises(BrokerError, match='timeout') as raised:
+                await client.call('eco', value=1, delay=1)
+            return str(raised.value)
+        finally:
+            await server.close()
+
+    assert asyncio.run(run())
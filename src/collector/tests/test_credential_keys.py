@@ -0,0 +1,100 @@
+"""Cache e single-flight de pings e comandos separados por credencial"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import cache
+from mikrotik_connector import mikrotik_connector
+from negative_cache import AUTH_FAILURE, classify_failure, negative_cache
+
+HOST = '10.0.0.42'
+
+
+def _fake_probe(calls: list, delay: float = 0.0):
+    async def probe(host, username, password, targets, count=4, port=8728, use_ssl=None):
+        calls.append(password)
+        await asyncio.sleep(delay)
+        if password != 'senha':
+            return [{'target': target, 'status': 'error', 'execution_time_seconds': 0, 'cached': False,
+                     'error': 'Login recusado: invalid user name or password (6)'} for target in targets]
+        return [{'target': target, 'status': 'success', 'execution_time_seconds': 0, 'cached': False,
+                 'data': {'status': 'reachable', 'packet_loss_percent': 0.0}} for target in targets]
+    return probe
+
+
+def _ping(password: str):
+    return mikrotik_connector.execute_batch_ping(HOST, 'admin', password, ['8.8.8.8'], count=1)
+
+
+def test_cached_ping_is_not_served_to_wrong_password(monkeypatch):
+    calls = []
+    monkeypatch.setattr(mikrotik_connector, '_probe_batch_ping', _fake_probe(calls))
+    cache.clear()
+    negative_cache.clear()
+
+    async def run():
+        return await _ping('senha'), await _ping('errada'), await _ping('senha')
+
+    try:
+        ok, refused, cached = asyncio.run(run())
+    finally:
+        cache.clear()
+        negative_cache.clear()
+
+    assert ok[0]['status'] == 'success'
+    assert refused[0]['status'] == 'error'
+    assert classify_failure(refused[0], is_ping=True) == AUTH_FAILURE
+    assert cached[0]['cached'] is True
+    assert calls == ['senha', 'errada']
+
+
+def test_in_flight_ping_is_not_shared_across_credentials(monkeypatch):
+    calls = []
+    monkeypatch.setattr(mikrotik_connector, '_probe_batch_ping', _fake_probe(calls, delay=0.1))
+    cache.clear()
+    negative_cache.clear()
+
+    async def run():
+        return await asyncio.gather(_ping('senha'), _ping('errada'))
+
+    try:
+        ok, refused = asyncio.run(run())
+    finally:
+        cache.clear()
+        negative_cache.clear()
+
+    assert sorted(calls) == ['errada', 'senha']
+    assert ok[0]['status'] == 'success' and not ok[0].get('coalesced')
+    assert refused[0]['status'] == 'error'
+
+
+def test_cached_command_is_not_served_to_wrong_password(monkeypatch):
+    calls = []
+
+    def execute_command(host, username, password, command, port=8728, parameters=None, use_ssl=None):
+        calls.append(password)
+        if password != 'senha':
+            return {'status': 'error', 'error': 'invalid user name or password (6)'}
+        return {'status': 'success', 'output': 'router'}
+
+    monkeypatch.setattr(mikrotik_connector, 'execute_command', execute_command)
+    cache.clear()
+    negative_cache.clear()
+
+    async def run():
+        command = '/system/identity/print'
+        return [await mikrotik_connector.execute_single_command(HOST, 'admin', password, command)
+                for password in ('senha', 'errada')]
+
+    try:
+        ok, refused = asyncio.run(run())
+    finally:
+        cache.clear()
+        negative_cache.clear()
+
+    assert ok['status'] == 'success'
+    assert refused['status'] == 'error'
+    assert calls == ['senha', 'errada']
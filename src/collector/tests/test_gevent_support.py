@@ -0,0 +1,37 @@
+"""Executor cooperativo do modo gevent"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+gevent = pytest.importorskip('gevent')
+
+from gevent_support import GreenletExecutor, greenlet_count
+
+
+def test_greenlet_count_follows_executor_greenlets():
+    executor = GreenletExecutor(2, 'test-pool')
+    before = greenlet_count()
+
+    futures = [executor.submit(gevent.sleep, 0.01) for _ in range(5)]
+    assert greenlet_count() == before + 5
+
+    gevent.wait(list(executor._group), timeout=5)
+    gevent.sleep(0)  # rawlink roda no próximo ciclo do hub
+    assert all(future.done() for future in futures)
+    assert greenlet_count() == before
+
+
+def test_killed_greenlets_leave_the_count():
+    executor = GreenletExecutor(1, 'test-pool')
+    before = greenlet_count()
+
+    for _ in range(3):
+        executor.submit(gevent.sleep, 10)
+    executor.shutdown(cancel_futures=True)
+    gevent.sleep(0.01)
+
+    assert greenlet_count() == before
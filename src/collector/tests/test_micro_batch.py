@@ -0,0 +1,91 @@
+"""Agrupamento de requisições por janela/tamanho e distribuição dos resultados"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from micro_batch import MicroBatcher
+
+
+class _Dispatcher:
+    """Registra cada despacho; omite os targets em 'omit'"""
+
+    def __init__(self, omit=(), error: Exception = None):
+        self.batches = []
+        self.omit = set(omit)
+        self.error = error
+
+    async def __call__(self, targets):
+        self.batches.append(list(targets))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return {target: {'target': target, 'status': 'success'} for target in targets
+                if target not in self.omit}
+
+
+def _submit_all(batcher: MicroBatcher, dispatch: _Dispatcher, requests, spread: float = 0.0):
+    async def one(index, targets):
+        await asyncio.sleep(spread * index)
+        return await batcher.submit('router', targets, dispatch)
+
+    async def run():
+        return await asyncio.gather(*[one(i, targets) for i, targets in enumerate(requests)])
+    return asyncio.run(run())
+
+
+def test_requests_within_window_share_one_dispatch():
+    batcher = MicroBatcher(window_ms=50, max_items=100)
+    dispatch = _Dispatcher()
+
+    requests = [['8.8.8.8'], ['1.1.1.1', '8.8.8.8'], ['9.9.9.9']]
+    results = _submit_all(batcher, dispatch, requests, spread=0.005)
+
+    assert dispatch.batches == [['8.8.8.8', '1.1.1.1', '9.9.9.9']]  # Target repetido vai uma vez
+    # Cada requisição recebe só os seus targets
+    assert [sorted(result) for result in results] == [['8.8.8.8'], ['1.1.1.1', '8.8.8.8'], ['9.9.9.9']]
+    assert results[1]['8.8.8.8'] is results[0]['8.8.8.8']
+    stats = batcher.get_stats()
+    assert stats['flushed_by_window'] == 1 and stats['avg_requests_per_batch'] == 3
+
+
+def test_full_batch_flushes_before_window():
+    batcher = MicroBatcher(window_ms=10000, max_items=3)
+    dispatch = _Dispatcher()
+
+    results = _submit_all(batcher, dispatch, [['a'], ['b'], ['c'], ['d', 'e', 'f']])
+
+    # 3 targets fecham o batch na hora; a requisição com max_items targets vai direto
+    assert sorted(map(sorted, dispatch.batches)) == [['a', 'b', 'c'], ['d', 'e', 'f']]
+    assert [list(result) for result in results] == [['a'], ['b'], ['c'], ['d', 'e', 'f']]
+    assert batcher.get_stats()['flushed_by_size'] == 1
+
+
+def test_omitted_targets_get_error_results():
+    batcher = MicroBatcher(window_ms=20, max_items=100)
+    dispatch = _Dispatcher(omit={'1.1.1.1'})
+
+    ok, missing = _submit_all(batcher, dispatch, [['8.8.8.8'], ['1.1.1.1']])
+
+    assert ok['8.8.8.8']['status'] == 'success'
+    assert missing['1.1.1.1']['status'] == 'error' and missing['1.1.1.1']['target'] == '1.1.1.1'
+
+    # Sem janela (despacho direto) vale o mesmo
+    direct = _submit_all(MicroBatcher(window_ms=0), dispatch, [['1.1.1.1']])[0]
+    assert direct['1.1.1.1']['status'] == 'error'
+
+
+def test_dispatch_error_reaches_every_request():
+    batcher = MicroBatcher(window_ms=20, max_items=100)
+    dispatch = _Dispatcher(error=ConnectionError('roteador caiu'))
+
+    async def run():
+        return await asyncio.gather(*[batcher.submit('router', [target], dispatch)
+                                      for target in ('a', 'b')], return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert len(dispatch.batches) == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
@@ -0,0 +1,126 @@
+"""Backend asyncio nativo contra um roteador RouterOS falso"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import CLOSED, circuit_breakers
+from mikrotik_connector import mikrotik_connector
+from negative_cache import AUTH_FAILURE, classify_failure
+from routeros_api import encode_sentence, parse_reply_words, read_sentence
+
+
+class FakeRouter:
+    """Servidor da API RouterOS com /login, /ping e /system/resource/print"""
+
+    def __init__(self, password: str = 'senha'):
+        self.password = password
+        self.connections = 0
+        self.logins = 0
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                words = await read_sentence(reader)
+                attributes, tag = parse_reply_words(words[1:])
+                suffix = [f".tag={tag}"] if tag else []
+
+                if words[0] == '/login':
+                    self.logins += 1
+                    if attributes.get('password') != self.password:
+                        writer.write(encode_sentence(['!trap', '=message=invalid user name or password (6)']))
+                    writer.write(encode_sentence(['!done']))
+                elif words[0] == '/ping':
+                    writer.write(encode_sentence(['!re', f"=host={attributes['address']}", '=time=1ms'] + suffix))
+                    writer.write(encode_sentence(['!done'] + suffix))
+                elif words[0] == '/system/resource/print':
+                    writer.write(encode_sentence(['!re', '=cpu-load=5'] + suffix))
+                    writer.write(encode_sentence(['!done'] + suffix))
+                else:
+                    writer.write(encode_sentence(['!done'] + suffix))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def test_login_trap_does_not_open_circuit():
+    async def run():
+        router = FakeRouter()
+        await router.start()
+        try:
+            return router, await mikrotik_connector._execute_native_batch_ping(
+                '127.0.0.1', 'admin', 'errada', ['8.8.8.8'], 1, router.port
+            )
+        finally:
+            await router.stop()
+
+    router, results = asyncio.run(run())
+    breaker = circuit_breakers.get('127.0.0.1', router.port)
+
+    assert router.logins == 1  # Sem retentativas
+    assert results[0]['status'] == 'error'
+    assert 'transport_error' not in results[0]
+    assert classify_failure(results[0], is_ping=True) == AUTH_FAILURE
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+
+
+def test_batches_reuse_pooled_connection():
+    async def run():
+        router = FakeRouter()
+        await router.start()
+        try:
+            batches = [await mikrotik_connector._execute_native_batch_ping(
+                '127.0.0.1', 'admin', 'senha', ['8.8.8.8', '1.1.1.1'], 1, router.port
+            )]
+            # Batches simultâneos esperam o mesmo login
+            batches += await asyncio.gather(*[mikrotik_connector._execute_native_batch_ping(
+                '127.0.0.1', 'admin', 'senha', [f"10.0.0.{i}"], 1, router.port
+            ) for i in range(5)])
+            return router, batches, mikrotik_connector._native_pool().get_stats()
+        finally:
+            await mikrotik_connector._close_native_pools()
+            await router.stop()
+
+    router, batches, stats = asyncio.run(run())
+
+    assert all(result['status'] == 'success' for batch in batches for result in batch)
+    assert router.connections == 1 and router.logins == 1
+    assert stats['connects'] == 1 and stats['reuses'] == 5
+
+
+def test_other_credential_does_not_reuse_session():
+    async def run():
+        router = FakeRouter()
+        await router.start()
+        try:
+            ok = await mikrotik_connector._execute_native_batch_ping(
+                '127.0.0.1', 'admin', 'senha', ['8.8.8.8'], 1, router.port
+            )
+            refused = await mikrotik_connector._execute_native_batch_ping(
+                '127.0.0.1', 'admin', 'errada', ['8.8.8.8'], 1, router.port
+            )
+            return router, ok, refused
+        finally:
+            await mikrotik_connector._close_native_pools()
+            await router.stop()
+
+    router, ok, refused = asyncio.run(run())
+
+    assert ok[0]['status'] == 'success'
+    assert refused[0]['status'] == 'error'
+    assert router.logins == 2
@@ -0,0 +1,87 @@
+"""Classificação de falhas do cache negativo"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from librouteros.exceptions import TrapError
+
+from mikrotik_connector import (MikroTikAPIConnection, PoolTimeoutError, RouterAuthError,
+                                RouterConnectError, failure_fields, mikrotik_connector)
+from negative_cache import (AUTH_FAILURE, ROUTER_UNREACHABLE, TARGET_UNREACHABLE,
+                            classify_failure, negative_cache)
+from routeros_api import RouterOSTimeoutError, RouterOSTrapError
+
+
+def _error_result(error: Exception, target: str = '8.8.8.8') -> dict:
+    return {'target': target, 'status': 'error', 'error': str(error), **failure_fields(error)}
+
+
+def test_pool_timeout_is_not_cached():
+    error = PoolTimeoutError("Timeout aguardando conexão do pool API para 10.0.0.1 (30s, max: 4)")
+    result = _error_result(error)
+
+    assert classify_failure(result) is None
+    assert classify_failure(result, is_ping=True) is None
+
+    negative_cache.clear()
+    try:
+        mikrotik_connector._store_ping_results('10.0.0.1', 'admin', 'senha', [result], 4, 8728)
+        assert negative_cache.get_router('10.0.0.1', 8728, 'admin', 'senha') is None
+        assert negative_cache.get_target('10.0.0.1', 8728, 'admin', 'senha', '8.8.8.8', 4) is None
+    finally:
+        negative_cache.clear()
+
+
+def test_command_timeout_is_not_router_unreachable():
+    result = _error_result(RouterOSTimeoutError("Timeout aguardando resposta de 10.0.0.1"))
+    assert classify_failure(result, is_ping=True) is None
+
+
+def test_connect_failure_is_router_unreachable():
+    result = _error_result(RouterConnectError("Falha ao conectar API 10.0.0.1:8728: timed out"))
+    assert classify_failure(result) == ROUTER_UNREACHABLE
+
+
+def test_login_failure_is_auth_failure():
+    result = _error_result(RouterConnectError(
+        "Falha ao conectar API 10.0.0.1:8728: invalid user name or password (6)"
+    ))
+    assert classify_failure(result) == AUTH_FAILURE
+
+
+def test_login_trap_is_auth_failure_not_target():
+    result = _error_result(RouterAuthError("Login recusado por 10.0.0.1:8728: not allowed (9)"))
+    assert 'transport_error' not in result
+    assert classify_failure(result, is_ping=True) == AUTH_FAILURE
+
+
+def test_ping_trap_is_target_unreachable():
+    result = _error_result(RouterOSTrapError("invalid value for argument address"))
+    assert classify_failure(result, is_ping=True) == TARGET_UNREACHABLE
+    assert classify_failure(result) is None
+
+
+def _failing_connection(error: Exception) -> MikroTikAPIConnection:
+    def call(*args, **kwargs):
+        raise error
+
+    conn = MikroTikAPIConnection('10.0.0.1', 'admin', 'senha')
+    conn.connection = call
+    conn.connected = True
+    return conn
+
+
+def test_ping_and_traceroute_keep_failure_type():
+    for method in ('execute_ping', 'execute_traceroute'):
+        for error, fields in ((TrapError("no route to host"), {'trap': True}),
+                              (ConnectionResetError("reset by peer"), {'transport_error': True})):
+            conn = _failing_connection(error)
+            try:
+                getattr(conn, method)('8.8.8.8')
+            except Exception as e:
+                assert failure_fields(e) == fields
+            else:
+                raise AssertionError(f"{method} não propagou {error!r}")
+        assert not conn.connected  # Erro de transporte derruba a sessão
@@ -0,0 +1,82 @@
+"""Registros netwatch por credencial"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from netwatch import NetwatchManager
+
+
+class _FakeRouterConnection:
+    """Sessão com /tool/netwatch em memória"""
+
+    def __init__(self, entries: list):
+        self.entries = entries
+        self.connected = True
+
+    def run_command(self, path: str, params: dict = None) -> list:
+        params = params or {}
+        if path == '/tool/netwatch/print':
+            return [dict(entry) for entry in self.entries]
+        if path == '/tool/netwatch/add':
+            self.entries.append({'.id': f"*{len(self.entries) + 1}", 'status': 'up', **params})
+        elif path == '/tool/netwatch/remove':
+            self.entries[:] = [entry for entry in self.entries if entry['.id'] != params['.id']]
+        return []
+
+
+class _FakePool:
+    """Pool que só aceita a senha 'senha'"""
+
+    def __init__(self):
+        self.entries = []
+        self.logins = {}
+
+    def _login(self, password: str) -> _FakeRouterConnection:
+        self.logins[password] = self.logins.get(password, 0) + 1
+        if password != 'senha':
+            raise Exception("invalid user name or password (6)")
+        return _FakeRouterConnection(self.entries)
+
+    @contextmanager
+    def get_connection(self, host, username, password, port=8728, use_ssl=None):
+        yield self._login(password)
+
+    def run_command(self, host, username, password, path, params=None, port=8728, use_ssl=None):
+        return self._login(password).run_command(path, params)
+
+
+def _manager() -> NetwatchManager:
+    manager = NetwatchManager(_FakePool(), enabled=True, owner_id='teste')
+    manager._ensure_collector = lambda: None  # Ciclos executados pelo teste
+    return manager
+
+
+def test_wrong_password_does_not_replace_working_credential():
+    manager = _manager()
+    manager.register_targets('10.0.0.1', 'admin', 'senha', ['8.8.8.8'])
+    manager.run_cycle()
+    manager.register_targets('10.0.0.1', 'admin', 'errada', ['8.8.8.8', '1.1.1.1'])
+    manager.run_cycle()
+
+    assert list(manager.get_ping_results('10.0.0.1', 'admin', 'senha', ['8.8.8.8'])) == ['8.8.8.8']
+    # Snapshot da outra credencial não é servido a quem erra a senha
+    assert manager.get_ping_results('10.0.0.1', 'admin', 'errada', ['8.8.8.8']) == {}
+    # Targets de uma credencial recusada não viram entradas no roteador
+    assert [entry['host'] for entry in manager.pool.entries] == ['8.8.8.8']
+
+
+def test_refused_credential_is_dropped_when_its_targets_expire():
+    manager = _manager()
+    manager.register_targets('10.0.0.1', 'admin', 'senha', ['8.8.8.8'])
+    manager.register_targets('10.0.0.1', 'admin', 'errada', ['8.8.8.8'])
+    manager.run_cycle()
+
+    manager.target_ttl = -1
+    manager.reconcile_interval = -1  # Próxima reconciliação periódica
+    manager.run_cycle()
+
+    assert len(manager.routers) == 1
+    assert manager.pool.entries == []  # A credencial válida removeu a entrada expirada
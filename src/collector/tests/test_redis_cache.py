@@ -0,0 +1,173 @@
+"""Backend Redis do SentinelCache e seu uso no caminho assíncrono do conector"""
+
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mikrotik_connector as connector_module
+from cache import SentinelCache
+from redis_cache import RedisCacheBackend
+
+
+class _SlowRedis:
+    """Cliente redis síncrono com latência de rede (MGET e pipeline)"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def register_script(self, script):
+        return lambda keys, args, client=None: None
+
+    def mget(self, keys):
+        time.sleep(self.delay)
+        return [None] * len(keys)
+
+    def pipeline(self, transaction=False):
+        client = self
+
+        class _Pipeline:
+            def __init__(self):
+                self.commands = 0
+
+            def set(self, *args, **kwargs):
+                self.commands += 1
+
+            def execute(self):
+                time.sleep(client.delay)
+                return [True] * self.commands
+
+        return _Pipeline()
+
+
+def test_redis_calls_do_not_block_event_loop(monkeypatch):
+    backend = RedisCacheBackend(client=_SlowRedis(0.2))
+    monkeypatch.setattr(connector_module, 'cache', SentinelCache(backends=[backend]))
+    connector = connector_module.mikrotik_connector
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0)
+        locks, remote = await connector._claim_remote('10.0.0.1', 'ping', ['8.8.8.8'], port=8728, count=4)
+        found = await connector._cache_io(connector._cache_get_many, '10.0.0.1', 'ping', ['8.8.8.8'],
+                                          port=8728, count=4)
+        task.cancel()
+        return ticks, locks, remote, found
+
+    ticks, locks, remote, found = asyncio.run(scenario())
+
+    assert set(locks) == {'8.8.8.8'}
+    assert remote == {} and found == {}
+    # 0,4 s de chamadas ao Redis: o loop continuou atendendo outras tasks
+    assert ticks >= 20
+
+
+@pytest.fixture(scope='module')
+def redis_client():
+    """redis-server local em porta livre; sem o binário usa fakeredis; sem ambos, pula"""
+    binary = shutil.which('redis-server')
+    if binary is None:
+        fakeredis = pytest.importorskip('fakeredis')
+        yield fakeredis.FakeRedis()
+        return
+
+    import redis
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = subprocess.Popen([binary, '--port', str(port), '--bind', '127.0.0.1', '--save', '',
+                               '--appendonly', 'no'], stdout=subprocess.DEVNULL)
+    client = redis.Redis(port=port)
+    try:
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        yield client
+    finally:
+        server.terminate()
+        server.wait(5)
+
+
+def _backend(client) -> RedisCacheBackend:
+    # Prefixo próprio por teste: o servidor é compartilhado pelo módulo
+    return RedisCacheBackend(client=client, prefix=f"teste-{uuid.uuid4().hex[:8]}")
+
+
+def test_pipelined_set_and_mget_round_trip(redis_client):
+    backend = _backend(redis_client)
+    now = time.time()
+    items = [(('10.0.0.1', 'ping', target), {'target': target, 'payload': 'x' * size},
+              now + 30, now + 60, now) for target, size in (('8.8.8.8', 10), ('1.1.1.1', 2000))]
+
+    assert backend.set_many(items) == 2
+    found = backend.get_many([item[0] for item in items] + [('10.0.0.1', 'ping', '9.9.9.9')])
+
+    assert {key: record[0] for key, record in found.items()} == {item[0]: item[1] for item in items}
+    assert found[items[0][0]][1:] == (now + 30, now + 60, now)
+    stats = backend.get_stats()
+    assert stats['round_trips'] == 2  # Um pipeline e um MGET
+    assert stats['hits'] == 2 and stats['misses'] == 1
+
+
+def test_entries_expire_on_server_at_stale_until(redis_client):
+    backend = _backend(redis_client)
+    key = ('10.0.0.1', 'ping', '8.8.8.8')
+    now = time.time()
+    backend.set(key, {'status': 'success'}, now + 0.1, now + 0.3, now)
+
+    assert 0 < redis_client.pttl(backend._key('c', key)) <= 300
+    time.sleep(0.4)
+    assert backend.get(key) is None
+    assert redis_client.exists(backend._key('c', key)) == 0
+
+
+def test_locks_contend_between_backends(redis_client):
+    first = _backend(redis_client)
+    second = RedisCacheBackend(client=redis_client, prefix=first.prefix)  # Outro nó
+    keys = [('10.0.0.1', 'ping', '8.8.8.8'), ('10.0.0.1', 'ping', '1.1.1.1')]
+
+    owned = first.acquire_locks(keys, ttl=5)
+    assert set(owned) == set(keys)
+    assert 0 < redis_client.pttl(first._key('l', keys[0])) <= 5000  # Lock de nó morto expira sozinho
+    assert second.acquire_locks(keys, ttl=5) == {}
+    assert second.get_stats()['locks_contended'] == 2
+
+    first.release_locks({keys[0]: owned[keys[0]]})
+    assert set(second.acquire_locks(keys, ttl=5)) == {keys[0]}
+
+
+def test_release_ignores_foreign_token(redis_client):
+    owner = _backend(redis_client)
+    other = RedisCacheBackend(client=redis_client, prefix=owner.prefix)
+    key = ('10.0.0.1', 'ping', '8.8.8.8')
+
+    token = owner.acquire_locks([key], ttl=5)[key]
+    other.release_locks({key: uuid.uuid4().hex})  # Token de quem perdeu o lock por expiração
+
+    assert redis_client.get(owner._key('l', key)) == token.encode()
+    assert other.acquire_locks([key], ttl=5) == {}
+
+    owner.release_locks({key: token})
+    assert redis_client.exists(owner._key('l', key)) == 0